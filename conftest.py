@@ -0,0 +1,10 @@
+import pytest
+
+
+@pytest.fixture(autouse=True, scope='session')
+def test_caches():
+    """Тесты не делят общий кеш с сайтом, как и в ``core.testing``."""
+    from core.testing import test_caches
+
+    with test_caches():
+        yield
@@ -0,0 +1,246 @@
+"""
+Кеш с защитой от лавины пересчётов.
+
+Когда популярное значение истекает, все процессы, запросившие его в этот
+момент, пошли бы считать его заново. ``get_or_compute``:
+
+* пересчитывает значение в одном процессе (single-flight): блокировка
+  ключа берётся через ``cache.add``, остальные ждут результата до
+  ``CACHING_LOCK_TIMEOUT`` секунд;
+* обновляет значение заранее с вероятностью, растущей к концу срока
+  жизни (XFetch): чем дольше оно считалось, тем раньше начинается
+  обновление;
+* ещё ``stale`` секунд после истечения срока отдаёт прежнее значение,
+  пока его пересчитывает владелец блокировки;
+* запоминает исключения ``negative`` (например, ``Http404``) на
+  ``CACHING_NEGATIVE_TIMEOUT`` секунд и повторяет их без пересчёта.
+
+Счётчики попаданий и пересчётов возвращает ``get_stats``; процесс копит
+их у себя и переносит в общий кеш раз в ``CACHING_STATS_FLUSH_INTERVAL``
+секунд.
+"""
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from collections import Counter, namedtuple
+
+from django import shortcuts
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+
+from .replicas import reading_replica
+
+LOCK_KEY = 'single-flight:{}'
+STATS_KEY = 'caching-stats:{}'
+STATS_FIELDS = ('hits', 'stale_hits', 'early_refreshes', 'recomputes',
+                'lock_waits', 'negative_hits')
+POLL_INTERVAL = 0.05
+
+# expires - мягкий срок жизни, delta - время пересчёта в секундах.
+Entry = namedtuple('Entry', 'value expires delta')
+Negative = namedtuple('Negative', 'error')
+
+_counters = []
+
+
+class Counters:
+    """Счётчики в общем кеше, приращения которых процесс копит у себя.
+
+    Увеличивать общий ключ на каждое обращение значило бы ждать
+    блокировку кеша на каждом запросе. Приращения переносятся в кеш
+    не чаще раза в ``CACHING_STATS_FLUSH_INTERVAL`` секунд и перед
+    чтением счётчиков (``get``).
+    """
+
+    def __init__(self, key, fields):
+        self.key = key
+        self.fields = fields
+        self.lock = threading.Lock()
+        self.pending = Counter()
+        self.flushed = time.monotonic()
+        _counters.append(self)
+
+    def incr(self, field, delta=1):
+        with self.lock:
+            self.pending[field] += delta
+            if (time.monotonic() - self.flushed
+                    < settings.CACHING_STATS_FLUSH_INTERVAL):
+                return
+        self.flush()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, Counter()
+            self.flushed = time.monotonic()
+        for field, delta in pending.items():
+            key = self.key.format(field)
+            if not cache.add(key, delta, None):
+                try:
+                    cache.incr(key, delta)
+                except ValueError:
+                    cache.set(key, delta, None)
+
+    def get(self):
+        self.flush()
+        keys = [self.key.format(field) for field in self.fields]
+        values = cache.get_many(keys)
+        return {
+            field: values.get(key, 0) for field, key in zip(self.fields, keys)
+        }
+
+    def reset(self):
+        with self.lock:
+            self.pending.clear()
+            self.flushed = time.monotonic()
+        cache.delete_many([self.key.format(field) for field in self.fields])
+
+
+def _reset_counters():
+    # Приращения мастера уже учтены им самим, а блокировку мог держать
+    # поток, которого нет в потомке.
+    for counters in _counters:
+        counters.lock = threading.Lock()
+        counters.pending = Counter()
+
+
+os.register_at_fork(after_in_child=_reset_counters)
+
+_stats = Counters(STATS_KEY, STATS_FIELDS)
+
+
+def get_or_compute(key, compute, timeout, *, stale=0, beta=None,
+                   negative=(), lock_timeout=None):
+    """Значение ``key`` из кеша или результат ``compute()``.
+
+    ``None`` не кешируется: так ``compute`` отказывается от кеширования
+    результата.
+    """
+    entry = cache.get(key)
+    if isinstance(entry, Negative):
+        _incr('negative_hits')
+        raise entry.error
+    now = time.time()
+    lock_timeout = lock_timeout or settings.CACHING_LOCK_TIMEOUT
+    if entry is not None:
+        if not _should_refresh(entry, now, beta):
+            _incr('hits')
+            return entry.value
+        token = _acquire(key, lock_timeout)
+        if token is None:
+            # Значение уже пересчитывает другой процесс.
+            _incr('stale_hits' if now >= entry.expires else 'hits')
+            return entry.value
+        if now < entry.expires:
+            _incr('early_refreshes')
+    else:
+        token = _acquire(key, lock_timeout)
+        if token is None:
+            entry = _wait(key, lock_timeout)
+            if isinstance(entry, Negative):
+                _incr('negative_hits')
+                raise entry.error
+            if entry is not None:
+                _incr('hits')
+                return entry.value
+            # Владелец блокировки не сохранил значение: считаем сами.
+            token = _acquire(key, lock_timeout)
+    return _recompute(key, compute, token, timeout, stale, negative)
+
+
+def get_object_or_404(queryset, key, **lookup):
+    """``get_object_or_404``, запоминающий отсутствие объекта под ``key``.
+
+    Найденный объект не кешируется; ключ отсутствующего нужно удалить
+    (``forget``), когда объект появится. Отсутствие на реплике не
+    запоминается: объект мог просто ещё не дойти до неё.
+    """
+    if is_missing(key):
+        _incr('negative_hits')
+        raise Http404('Объект не найден')
+    try:
+        return shortcuts.get_object_or_404(queryset, **lookup)
+    except Http404 as error:
+        if not reading_replica():
+            remember_missing(key, error)
+        raise
+
+
+def is_missing(key):
+    return isinstance(cache.get(key), Negative)
+
+
+def remember_missing(key, error):
+    cache.set(key, Negative(error), settings.CACHING_NEGATIVE_TIMEOUT)
+
+
+def forget(keys):
+    cache.delete_many(list(keys))
+
+
+def _should_refresh(entry, now, beta):
+    """XFetch: истёкшее значение или случайное обновление до срока."""
+    beta = settings.CACHING_EARLY_REFRESH_BETA if beta is None else beta
+    early = -entry.delta * beta * math.log(1 - random.random())
+    return now + early >= entry.expires
+
+
+def _acquire(key, lock_timeout):
+    token = uuid.uuid4().hex
+    if cache.add(LOCK_KEY.format(key), token, lock_timeout):
+        return token
+    return None
+
+
+def _release(key, token):
+    # Между get и delete блокировка может истечь и достаться другому
+    # процессу; тогда он лишь пересчитает значение ещё раз.
+    lock_key = LOCK_KEY.format(key)
+    if token is not None and cache.get(lock_key) == token:
+        cache.delete(lock_key)
+
+
+def _wait(key, lock_timeout):
+    """Ждёт значение, которое считает владелец блокировки."""
+    _incr('lock_waits')
+    deadline = time.time() + lock_timeout
+    while time.time() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+        if cache.get(LOCK_KEY.format(key)) is None:
+            return None
+    return None
+
+
+def _recompute(key, compute, token, timeout, stale, negative):
+    _incr('recomputes')
+    started = time.time()
+    try:
+        value = compute()
+        now = time.time()
+        if value is not None:
+            cache.set(key, Entry(value, now + timeout, now - started),
+                      timeout + stale)
+        return value
+    except negative as error:
+        remember_missing(key, error)
+        raise
+    finally:
+        _release(key, token)
+
+
+def _incr(field, delta=1):
+    _stats.incr(field, delta)
+
+
+def get_stats():
+    return _stats.get()
+
+
+def reset_stats():
+    _stats.reset()
@@ -0,0 +1,89 @@
+"""
+Отправка почты через очередь задач.
+
+``QueuedEmailBackend`` не пишет письма сам: ``send_messages`` только
+сохраняет их в очередь ``email`` (см. core/tasks.py) и сразу
+возвращается. Worker отправляет накопившиеся письма пачкой через одно
+соединение настоящего бэкенда ``QUEUED_EMAIL_BACKEND``, по одному, и при
+ошибках позже повторяет только неотправленные письма.
+"""
+import base64
+
+from django.conf import settings
+from django.core.mail import (EmailMessage, EmailMultiAlternatives,
+                              get_connection)
+from django.core.mail.backends.base import BaseEmailBackend
+
+from .tasks import PartialFailure, task
+
+FIELDS = ('subject', 'body', 'from_email', 'to', 'cc', 'bcc', 'reply_to',
+          'extra_headers')
+
+
+def serialize_message(message):
+    """Письмо в виде словаря, пригодного для JSON."""
+    data = {field: getattr(message, field) for field in FIELDS}
+    data['alternatives'] = getattr(message, 'alternatives', [])
+    attachments = []
+    for attachment in message.attachments:
+        if not isinstance(attachment, tuple):
+            raise ValueError('Вложения MIMEBase в очередь не сохраняются')
+        filename, content, mimetype = attachment
+        if isinstance(content, bytes):
+            content = {'base64': base64.b64encode(content).decode()}
+        attachments.append([filename, content, mimetype])
+    data['attachments'] = attachments
+    return data
+
+
+def deserialize_message(data):
+    message = EmailMultiAlternatives(
+        alternatives=[tuple(item) for item in data['alternatives']],
+        headers=data['extra_headers'],
+        **{field: data[field] for field in FIELDS[:-1]}
+    )
+    for filename, content, mimetype in data['attachments']:
+        if isinstance(content, dict):
+            content = base64.b64decode(content['base64'])
+        message.attach(filename, content, mimetype)
+    return message
+
+
+@task(queue='email', batch=True)
+def deliver(payloads):
+    """Отправляет письма всех захваченных задач одним соединением.
+
+    Письма отправляются по одному: иначе по ошибке бэкенда не понять,
+    какие из них уже ушли, и повтор отправил бы их ещё раз.
+    """
+    retry = {}
+    error = None
+    connection = get_connection(settings.QUEUED_EMAIL_BACKEND,
+                                fail_silently=False)
+    with connection:
+        for index, payload in enumerate(payloads):
+            unsent = []
+            for data in payload['messages']:
+                try:
+                    connection.send_messages([deserialize_message(data)])
+                except Exception as exc:
+                    unsent.append(data)
+                    error = exc
+            if unsent:
+                retry[index] = {**payload, 'messages': unsent}
+    if retry:
+        raise PartialFailure(retry) from error
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Почтовый бэкенд, откладывающий отправку в очередь задач."""
+
+    def send_messages(self, email_messages):
+        messages = [
+            serialize_message(message) for message in email_messages
+            if isinstance(message, EmailMessage) and message.recipients()
+        ]
+        if not messages:
+            return 0
+        deliver.delay(messages=messages)
+        return len(messages)
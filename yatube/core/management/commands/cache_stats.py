@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from core.caching import get_stats, reset_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает, сколько значений кеша пересчитано, отдано устаревшими '
+        'и дождано у другого процесса.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Обнулить счётчики после вывода.'
+        )
+
+    def handle(self, *args, **options):
+        stats = get_stats()
+        self.stdout.write(
+            f'Попаданий: {stats["hits"]}, пересчётов: {stats["recomputes"]} '
+            f'(из них заранее: {stats["early_refreshes"]})\n'
+            f'Устаревших ответов: {stats["stale_hits"]}, ожиданий '
+            f'пересчёта: {stats["lock_waits"]}, запомненных 404: '
+            f'{stats["negative_hits"]}'
+        )
+        if options['reset']:
+            reset_stats()
@@ -0,0 +1,47 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.tasks import run_pending
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет фоновые задачи из очереди в пуле потоков. Без --once '
+        'работает до остановки, проверяя очередь каждые --poll-interval '
+        'секунд.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queue', action='append', dest='queues',
+            help='Очередь, задачи которой выполнять; можно указать '
+                 'несколько раз. По умолчанию - все очереди.'
+        )
+        parser.add_argument('--threads', type=int,
+                            default=settings.TASKS_THREADS)
+        parser.add_argument('--poll-interval', type=float,
+                            default=settings.TASKS_POLL_INTERVAL)
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить всё, что созрело, и выйти.'
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        with ThreadPoolExecutor(options['threads']) as executor:
+            try:
+                while True:
+                    done = run_pending(options['queues'], executor=executor)
+                    total += done
+                    if done and options['verbosity'] > 1:
+                        self.stdout.write(f'Выполнено задач: {done}')
+                    if not done:
+                        if options['once']:
+                            break
+                        time.sleep(options['poll_interval'])
+            except KeyboardInterrupt:
+                pass
+        self.stdout.write(self.style.SUCCESS(f'Всего задач: {total}'))
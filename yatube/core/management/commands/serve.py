@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+
+from yatube.prefork import PreforkServer, preload
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает prefork WSGI-сервер: Django загружается один раз в '
+        'мастере, worker-процессы делят его память copy-on-write.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8000)
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument(
+            '--report-interval', type=float, default=None,
+            help='Как часто печатать RSS и общую память процессов, в '
+                 'секундах. Отчёт по запросу - сигнал SIGUSR1 мастеру.'
+        )
+        parser.add_argument('--no-access-log', action='store_true')
+
+    def handle(self, *args, **options):
+        application = preload(get_wsgi_application())
+        server = PreforkServer(
+            application,
+            host=options['host'],
+            port=options['port'],
+            workers=options['workers'],
+            access_log=not options['no_access_log'],
+            stdout=self.stdout,
+        )
+        self.stdout.write(
+            f'Слушаю {server.address[0]}:{server.address[1]}, '
+            f'процессов: {options["workers"]}'
+        )
+        server.run(report_interval=options['report_interval'])
@@ -0,0 +1,105 @@
+"""
+Быстрый путь для анонимных GET-запросов к публичным страницам.
+
+Представления, помеченные ``public_page``, для посетителя без сессионной
+куки вызываются прямо из этой middleware, в обход ``SessionMiddleware``,
+``CsrfViewMiddleware``, ``AuthenticationMiddleware`` и
+``MessageMiddleware``: сессия не загружается, ``request.user`` -
+``AnonymousUser``, ответ не ставит кук и не получает ``Vary: Cookie``.
+Вместо этого ему выставляется ``Cache-Control: public`` с
+``stale-while-revalidate``, и внешний прокси может отдавать его всем
+анонимным посетителям.
+
+Та же страница для пользователя с сессией проходит обычную цепочку и
+помечается ``Cache-Control: private``. Прокси не должен брать из кеша
+ответы на запросы с кукой ``SESSION_COOKIE_NAME``.
+
+Запрос с ``Host`` не из ``ALLOWED_HOSTS`` проходит обычную цепочку,
+где ``CommonMiddleware`` отвечает на него 400.
+
+Шаблоны публичных страниц не должны выводить ``{% csrf_token %}``
+анонимам: токену нужна кука. Если это всё же случилось, запрос
+повторяется по обычной цепочке.
+"""
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import DisallowedHost, MiddlewareNotUsed
+from django.middleware.clickjacking import XFrameOptionsMiddleware
+from django.urls import Resolver404, resolve
+from django.utils.cache import patch_cache_control
+
+from .server_timing import mark_view_started
+
+SAFE_METHODS = ('GET', 'HEAD')
+CACHEABLE_STATUSES = (200, 304)
+
+
+def public_page(view_func):
+    """Помечает представление как публичное для быстрого пути."""
+    view_func.public_page = True
+    return view_func
+
+
+def resolve_public(request):
+    """Результат разбора адреса, если запрос - GET публичной страницы."""
+    if request.method not in SAFE_METHODS:
+        return None
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return None
+    return match if getattr(match.func, 'public_page', False) else None
+
+
+class AnonymousFastPathMiddleware:
+    """Отдаёт публичные страницы анонимам без сессий и кук.
+
+    Ставится после ``SecurityMiddleware`` и до ``SessionMiddleware``.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'ANONYMOUS_FAST_PATH', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.xframe = XFrameOptionsMiddleware()
+
+    def __call__(self, request):
+        match = resolve_public(request)
+        if match is None:
+            return self.get_response(request)
+        if settings.SESSION_COOKIE_NAME in request.COOKIES:
+            response = self.get_response(request)
+            patch_cache_control(response, private=True)
+            return response
+        try:
+            request.get_host()
+        except DisallowedHost:
+            return self.get_response(request)
+
+        request.resolver_match = match
+        request.user = AnonymousUser()
+        # process_view других middleware здесь не вызывается.
+        mark_view_started(request, match.func)
+        response = match.func(request, *match.args, **match.kwargs)
+        if callable(getattr(response, 'render', None)):
+            response = response.render()
+        if request.META.get('CSRF_COOKIE_USED'):
+            return self.get_response(request)
+        return self.finalize(request, response)
+
+    def finalize(self, request, response):
+        # Заголовки, которые поставили бы пропущенные middleware.
+        response = self.xframe.process_response(request, response)
+        if not response.streaming and not response.has_header(
+                'Content-Length'):
+            response['Content-Length'] = str(len(response.content))
+        if response.status_code in CACHEABLE_STATUSES and not response.cookies:
+            patch_cache_control(
+                response,
+                public=True,
+                max_age=settings.ANONYMOUS_CACHE_MAX_AGE,
+                stale_while_revalidate=(
+                    settings.ANONYMOUS_CACHE_STALE_WHILE_REVALIDATE
+                ),
+            )
+        return response
@@ -0,0 +1,142 @@
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import ExitStack
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import Template
+
+logger = logging.getLogger('yatube.timing')
+
+_state = threading.local()
+
+
+class Timings:
+    """Замеры одного запроса, в секундах."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db = 0.0
+        self.queries = 0
+        self.template = 0.0
+        self.template_depth = 0
+        self.view = 0.0
+        self.view_started = None
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - started
+            self.queries += 1
+
+    def as_dict(self):
+        return {
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 2),
+            'view_ms': round(self.view * 1000, 2),
+            'db_ms': round(self.db * 1000, 2),
+            'db_queries': self.queries,
+            'template_ms': round(self.template * 1000, 2),
+        }
+
+
+def timed_render(render):
+    """Учитывает время отрисовки шаблона в замерах текущего запроса.
+
+    Вложенные вызовы (шаблон, отрисованный изнутри другого шаблона) не
+    суммируются повторно.
+    """
+    @wraps(render)
+    def wrapper(self, context=None, request=None):
+        timings = getattr(_state, 'timings', None)
+        if timings is None or timings.template_depth:
+            return render(self, context, request)
+        timings.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context, request)
+        finally:
+            timings.template += time.perf_counter() - started
+            timings.template_depth -= 1
+    wrapper.server_timing = True
+    return wrapper
+
+
+def install_template_timing():
+    if not getattr(Template.render, 'server_timing', False):
+        Template.render = timed_render(Template.render)
+
+
+def mark_view_started(request, view_func):
+    """Начало замера ``view``; зовётся и в обход цепочки middleware."""
+    request.timing_view_name = '.'.join([
+        view_func.__module__,
+        getattr(view_func, '__qualname__', type(view_func).__name__),
+    ])
+    timings = getattr(_state, 'timings', None)
+    if timings is not None:
+        timings.view_started = time.perf_counter()
+
+
+class ServerTimingMiddleware:
+    """Отдаёт замеры запроса в заголовке ``Server-Timing``.
+
+    В заголовке: время ответа целиком (``total``), время от вызова
+    представления до готового ответа (``view``, включает запросы к базе и
+    шаблоны), суммарное время и число
+    SQL-запросов (``db``) и время отрисовки шаблонов (``tpl``). Доля
+    ``SERVER_TIMING_LOG_SAMPLE_RATE`` запросов дополнительно пишется в
+    лог ``yatube.timing`` одной строкой JSON.
+
+    При ``SERVER_TIMING_ENABLED = False`` (по умолчанию вне ``DEBUG``)
+    Django исключает middleware из цепочки, и она ничего не стоит:
+    ``Template.render`` подменяется только включённой middleware.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SERVER_TIMING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'SERVER_TIMING_LOG_SAMPLE_RATE',
+                                   0.0)
+        install_template_timing()
+
+    def __call__(self, request):
+        timings = Timings()
+        _state.timings = timings
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(timings.db_wrapper)
+                    )
+                response = self.get_response(request)
+            if timings.view_started is not None:
+                timings.view = time.perf_counter() - timings.view_started
+        finally:
+            _state.timings = None
+        data = timings.as_dict()
+        response['Server-Timing'] = ', '.join([
+            f'total;dur={data["total_ms"]}',
+            f'view;dur={data["view_ms"]}',
+            f'db;dur={data["db_ms"]};desc="{data["db_queries"]} queries"',
+            f'tpl;dur={data["template_ms"]}',
+        ])
+        if self.sample_rate and random.random() < self.sample_rate:
+            data.update(
+                method=request.method,
+                path=request.path,
+                status=response.status_code,
+                view=getattr(request, 'timing_view_name', None),
+            )
+            logger.info(json.dumps(data), extra={'timing': data})
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        mark_view_started(request, view_func)
@@ -0,0 +1,49 @@
+from django.db import models
+
+
+class ReplicationHeartbeat(models.Model):
+    """Время последней записи на основной базе.
+
+    Строка обновляется в той же транзакции, что и данные, и попадает на
+    реплики вместе с ними; по её значению на реплике видно отставание.
+    """
+    updated = models.DateTimeField()
+
+
+class Task(models.Model):
+    """Отложенный вызов функции, см. core/tasks.py.
+
+    Выполненные задачи удаляются, в таблице остаются ожидающие,
+    выполняющиеся и исчерпавшие попытки.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'ожидает'),
+        (RUNNING, 'выполняется'),
+        (FAILED, 'ошибка'),
+    )
+
+    name = models.CharField(max_length=200)
+    queue = models.CharField(max_length=50, default='default')
+    payload = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUSES,
+                              default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    run_at = models.DateTimeField()
+    locked_until = models.DateTimeField(null=True, blank=True)
+    lock_token = models.CharField(max_length=32, blank=True)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['queue', 'status', 'run_at'],
+                name='task_due_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.status})'
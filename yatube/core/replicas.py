@@ -0,0 +1,177 @@
+"""
+Чтение лент с реплик базы.
+
+Представления, обёрнутые в ``read_from_replica``, читают с одной из баз
+``DATABASE_REPLICAS``; запись и всё остальное идут в ``default``. Реплики
+- копии основной базы, которые поддерживаются снаружи (например,
+потоковым копированием файла SQLite), поэтому миграции на них не
+применяются.
+
+Автор, только что сохранивший пост, ``REPLICA_PIN_SECONDS`` секунд
+читает с основной базы (cookie ``REPLICA_PIN_COOKIE``) и видит свою
+запись. Реплика, отставшая больше чем на ``REPLICA_MAX_LAG`` секунд,
+временно не используется.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils import timezone
+
+from .models import ReplicationHeartbeat
+
+LAST_WRITE_KEY = 'replication:last-write'
+# Сессии и пользователи для входа на сайт всегда читаются с основной
+# базы: иначе только что вошедший пользователь мог бы оказаться анонимом.
+PRIMARY_ONLY_APPS = {'sessions', 'auth'}
+SAFE_METHODS = ('GET', 'HEAD')
+
+_state = threading.local()
+# Отметки реплик, прочитанные этим процессом: alias -> (время проверки,
+# время последней записи, которую реплика уже получила).
+_heartbeats = {}
+
+
+def record_write(using=DEFAULT_DB_ALIAS):
+    """Отмечает запись на основной базе в текущей транзакции."""
+    if not settings.DATABASE_REPLICAS:
+        return
+    now = timezone.now()
+    updated = ReplicationHeartbeat.objects.using(using).filter(pk=1).update(
+        updated=now
+    )
+    if not updated:
+        ReplicationHeartbeat.objects.using(using).create(pk=1, updated=now)
+    transaction.on_commit(
+        lambda: cache.set(LAST_WRITE_KEY, now.timestamp(), None),
+        using=using,
+    )
+
+
+def replica_heartbeat(alias):
+    checked, heartbeat = _heartbeats.get(alias, (0, None))
+    if time.monotonic() - checked > settings.REPLICA_LAG_CHECK_INTERVAL:
+        updated = (
+            ReplicationHeartbeat.objects.using(alias)
+            .values_list('updated', flat=True).first()
+        )
+        heartbeat = updated.timestamp() if updated else None
+        _heartbeats[alias] = (time.monotonic(), heartbeat)
+    return heartbeat
+
+
+def replica_lag(alias):
+    """Насколько реплика отстаёт от последней записи, в секундах."""
+    last_write = cache.get(LAST_WRITE_KEY)
+    if last_write is None:
+        return 0
+    heartbeat = replica_heartbeat(alias)
+    if heartbeat is None:
+        return float('inf')
+    return max(0, last_write - heartbeat)
+
+
+def is_pinned(request):
+    try:
+        until = float(request.COOKIES.get(settings.REPLICA_PIN_COOKIE, 0))
+    except ValueError:
+        return False
+    return until > time.time()
+
+
+def choose_replica(request):
+    """Реплика для запроса или ``None``, если читать нужно с основной."""
+    if request.method not in SAFE_METHODS or is_pinned(request):
+        return None
+    fresh = [
+        alias for alias in settings.DATABASE_REPLICAS
+        if replica_lag(alias) <= settings.REPLICA_MAX_LAG
+    ]
+    return random.choice(fresh) if fresh else None
+
+
+def get_read_alias():
+    return getattr(_state, 'alias', None)
+
+
+def reading_replica():
+    return get_read_alias() is not None
+
+
+@contextmanager
+def read_from_primary():
+    """Чтения внутри блока идут на основную базу.
+
+    Страницы и фрагменты, которые кешируются под текущей версией ленты,
+    рисуются с основной базы: отставшая реплика ещё не видит изменения,
+    которое эту версию создало, и устаревшая страница жила бы в кеше до
+    конца таймаута.
+    """
+    previous = get_read_alias()
+    _state.alias = None
+    try:
+        yield
+    finally:
+        _state.alias = previous
+
+
+def read_from_replica(view_func):
+    """Выполняет чтения представления на реплике, если она доступна."""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not settings.DATABASE_REPLICAS:
+            return view_func(request, *args, **kwargs)
+        previous = get_read_alias()
+        _state.alias = choose_replica(request)
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            _state.alias = previous
+    return wrapper
+
+
+def pin_primary_after_write(view_func):
+    """После изменяющего запроса автор какое-то время читает с основной
+    базы, чтобы увидеть собственную запись до того, как она дойдёт до
+    реплик.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        response = view_func(request, *args, **kwargs)
+        if request.method not in SAFE_METHODS and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE,
+                str(time.time() + settings.REPLICA_PIN_SECONDS),
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+            )
+        return response
+    return wrapper
+
+
+class ReplicaRouter:
+    """Направляет чтения в реплику, выбранную ``read_from_replica``."""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return None
+        return get_read_alias()
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,336 @@
+"""
+Кеш в общей памяти для процессов одной машины.
+
+``LocMemCache`` живёт в памяти одного процесса: при нескольких
+worker-процессах каждый заново ищет группы и авторов, рисует фрагменты
+лент и не видит новых версий лент, отмеченных другими процессами. Этот
+backend хранит значения в файле, отображённом в память (mmap), - его
+видят все процессы::
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.shared_cache.SharedMemoryCache',
+            'LOCATION': '/dev/shm/yatube/yatube.cache',
+            'OPTIONS': {'MAX_ENTRIES': 2048, 'MAX_VALUE_SIZE': 64 * 1024},
+        }
+    }
+
+Путь к файлу открывает общий кеш для всех процессов машины: worker'ов,
+``run_tasks``, ``runserver`` и команд; ``OPTIONS`` у всех процессов
+должны совпадать. Значения читаются через pickle, поэтому файл лежит в
+закрытом каталоге: каталог создаётся с правами 0700, а чужой или
+доступный другим каталог и файл, как и символическая ссылка вместо
+них, отвергаются с ``ImproperlyConfigured``.
+
+Пустой ``LOCATION`` - безымянный файл в /dev/shm: его видят только сам
+процесс и процессы, созданные fork после первого обращения к кешу
+(``preload`` в yatube/prefork.py открывает кеши до запуска worker'ов),
+и он исчезает вместе с ними - так кеш получают тесты (``TEST_CACHES``).
+
+Размер ограничен: ``MAX_ENTRIES`` ячеек по ``MAX_VALUE_SIZE`` байт, а
+значение больше ячейки не кешируется. Ключ попадает в один из наборов
+по ``WAYS`` ячеек (как в кеше процессора), и при нехватке места
+вытесняется давнее всех прочитанное значение набора. Каждый набор
+защищён своей блокировкой ``fcntl.lockf`` на участок файла и своей
+блокировкой потоков, поэтому процессы и потоки ждут друг друга только на
+одном наборе.
+"""
+import errno
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import pickle
+import stat
+import struct
+import tempfile
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.exceptions import ImproperlyConfigured
+
+MAGIC = b'YTC1'
+# magic, число ячеек, ячеек в наборе, размер ячейки.
+HEADER = struct.Struct('<4sIII')
+HEADER_SIZE = 64
+# Хеш ключа, срок годности, время последнего чтения, длина значения
+# (0 - ячейка свободна).
+SLOT = struct.Struct('<16sddI')
+SHM_DIR = '/dev/shm'
+
+_memories = {}
+_memories_lock = threading.Lock()
+
+
+def is_private(info, mode):
+    return info.st_uid == os.getuid() and stat.S_IMODE(info.st_mode) == mode
+
+
+def open_private(path):
+    """Открывает файл кеша, если его и каталог видит только владелец."""
+    directory = os.path.dirname(path)
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode) or not is_private(info, 0o700):
+        raise ImproperlyConfigured(
+            f'Каталог кеша {directory} должен принадлежать текущему '
+            f'пользователю и иметь права 0700.'
+        )
+    message = (
+        f'Файл кеша {path} должен принадлежать текущему пользователю '
+        f'и иметь права 0600.'
+    )
+    try:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+    except OSError as error:
+        if error.errno == errno.ELOOP:
+            raise ImproperlyConfigured(message) from error
+        raise
+    info = os.fstat(fd)
+    if not stat.S_ISREG(info.st_mode) or not is_private(info, 0o600):
+        os.close(fd)
+        raise ImproperlyConfigured(message)
+    return fd
+
+
+class SharedMemory:
+    """Таблица ячеек и их значения в одном отображённом файле."""
+
+    def __init__(self, path, slots, ways, value_size):
+        self.slots = slots
+        self.ways = ways
+        self.sets = slots // ways
+        self.value_size = value_size
+        self.data_start = HEADER_SIZE + slots * SLOT.size
+        size = self.data_start + slots * value_size
+        if path:
+            self.fd = open_private(path)
+        else:
+            # Ссылка на файл держит дескриптор открытым.
+            self.file = tempfile.TemporaryFile(
+                dir=SHM_DIR if os.path.isdir(SHM_DIR) else None
+            )
+            self.fd = self.file.fileno()
+        self.set_locks = [threading.Lock() for _ in range(self.sets)]
+        header = HEADER.pack(MAGIC, slots, ways, value_size)
+        with self.locked(0, 0, self.set_locks):
+            if (os.pread(self.fd, HEADER.size, 0) != header
+                    or os.fstat(self.fd).st_size != size):
+                # Новый файл или другие настройки: начинаем с пустого.
+                os.ftruncate(self.fd, 0)
+                os.ftruncate(self.fd, size)
+                os.pwrite(self.fd, header, 0)
+        self.map = mmap.mmap(self.fd, size)
+
+    @contextmanager
+    def locked(self, start, length, thread_locks):
+        """Блокирует участок файла от других процессов и потоков.
+
+        Блокировки ``lockf`` принадлежат процессу, поэтому потоки одного
+        процесса дополнительно ждут друг друга на ``thread_locks`` -
+        блокировках затронутых наборов. Снятие блокировки с участка
+        снимает её и для других потоков процесса, поэтому весь файл
+        блокируется только вместе со всеми наборами.
+        """
+        with ExitStack() as stack:
+            for lock in thread_locks:
+                stack.enter_context(lock)
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, length, start)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN, length, start)
+
+    def locked_set(self, digest):
+        """Блокирует набор ячеек ключа и возвращает номер первой ячейки."""
+        first = int.from_bytes(digest[:8], 'little') % self.sets * self.ways
+        return first, self.locked(
+            HEADER_SIZE + first * SLOT.size, self.ways * SLOT.size,
+            [self.set_locks[first // self.ways]]
+        )
+
+    def read_slot(self, index):
+        return SLOT.unpack_from(self.map, HEADER_SIZE + index * SLOT.size)
+
+    def write_slot(self, index, digest, expires, used, length):
+        SLOT.pack_into(self.map, HEADER_SIZE + index * SLOT.size,
+                       digest, expires, used, length)
+
+    def find(self, first, digest, now):
+        """Ячейка с живым значением ключа или ``None``."""
+        for index in range(first, first + self.ways):
+            slot_digest, expires, _, length = self.read_slot(index)
+            if length and slot_digest == digest:
+                if expires > now:
+                    return index
+                self.write_slot(index, bytes(16), 0, 0, 0)
+                return None
+        return None
+
+    def choose(self, first, digest, now):
+        """Ячейка для записи: ячейка ключа, свободная или самая давняя."""
+        victim, victim_used = first, math.inf
+        for index in range(first, first + self.ways):
+            slot_digest, expires, used, length = self.read_slot(index)
+            if length and slot_digest == digest:
+                return index
+            if not length or expires <= now:
+                used = -math.inf
+            if used < victim_used:
+                victim, victim_used = index, used
+        return victim
+
+    def read_value(self, index, length):
+        start = self.data_start + index * self.value_size
+        return self.map[start:start + length]
+
+    def write_value(self, index, data):
+        start = self.data_start + index * self.value_size
+        self.map[start:start + len(data)] = data
+
+    def clear(self):
+        with self.locked(0, 0, self.set_locks):
+            self.map[HEADER_SIZE:self.data_start] = bytes(
+                self.data_start - HEADER_SIZE
+            )
+
+
+def get_memory(location, slots, ways, value_size):
+    """Общая память для ``location``, одна на процесс и его потомков."""
+    key = (location, slots, ways, value_size)
+    with _memories_lock:
+        if key not in _memories:
+            _memories[key] = SharedMemory(location, slots, ways, value_size)
+        return _memories[key]
+
+
+def _reset_thread_locks():
+    # Блокировку мог держать поток мастера, которого нет в потомке.
+    global _memories_lock
+    _memories_lock = threading.Lock()
+    for memory in _memories.values():
+        memory.set_locks = [threading.Lock() for _ in range(memory.sets)]
+
+
+os.register_at_fork(after_in_child=_reset_thread_locks)
+
+
+class SharedMemoryCache(BaseCache):
+    """Backend кеша Django поверх ``SharedMemory``."""
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        ways = options.get('WAYS', 8)
+        slots = max(1, math.ceil(self._max_entries / ways)) * ways
+        self._memory = get_memory(
+            location, slots, ways, options.get('MAX_VALUE_SIZE', 64 * 1024)
+        )
+
+    def _digest(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return hashlib.md5(key.encode()).digest()
+
+    def _expires(self, timeout):
+        expires = self.get_backend_timeout(timeout)
+        return math.inf if expires is None else expires
+
+    def _store(self, memory, first, digest, data, expires, now):
+        index = memory.choose(first, digest, now)
+        memory.write_value(index, data)
+        memory.write_slot(index, digest, expires, now, len(data))
+
+    def _write(self, key, value, timeout, version, only_new):
+        memory = self._memory
+        digest = self._digest(key, version)
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        first, lock = memory.locked_set(digest)
+        with lock:
+            now = time.time()
+            index = memory.find(first, digest, now)
+            if index is not None and only_new:
+                return False
+            if len(data) > memory.value_size:
+                # Не помещается: прежнее значение не должно остаться.
+                if index is not None:
+                    memory.write_slot(index, bytes(16), 0, 0, 0)
+                return False
+            self._store(memory, first, digest, data,
+                        self._expires(timeout), now)
+            return True
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._write(key, value, timeout, version, only_new=True)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._write(key, value, timeout, version, only_new=False)
+
+    def get(self, key, default=None, version=None):
+        memory = self._memory
+        digest = self._digest(key, version)
+        first, lock = memory.locked_set(digest)
+        with lock:
+            now = time.time()
+            index = memory.find(first, digest, now)
+            if index is None:
+                return default
+            _, expires, _, length = memory.read_slot(index)
+            memory.write_slot(index, digest, expires, now, length)
+            data = memory.read_value(index, length)
+        return pickle.loads(data)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        memory = self._memory
+        digest = self._digest(key, version)
+        first, lock = memory.locked_set(digest)
+        with lock:
+            index = memory.find(first, digest, time.time())
+            if index is None:
+                return False
+            _, _, used, length = memory.read_slot(index)
+            memory.write_slot(index, digest, self._expires(timeout), used,
+                              length)
+            return True
+
+    def incr(self, key, delta=1, version=None):
+        """Атомарное увеличение: чтение и запись под блокировкой набора."""
+        memory = self._memory
+        digest = self._digest(key, version)
+        first, lock = memory.locked_set(digest)
+        with lock:
+            now = time.time()
+            index = memory.find(first, digest, now)
+            if index is None:
+                raise ValueError(f"Key '{key}' not found")
+            _, expires, _, length = memory.read_slot(index)
+            value = pickle.loads(memory.read_value(index, length)) + delta
+            data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            memory.write_value(index, data)
+            memory.write_slot(index, digest, expires, now, len(data))
+        return value
+
+    def has_key(self, key, version=None):
+        memory = self._memory
+        digest = self._digest(key, version)
+        first, lock = memory.locked_set(digest)
+        with lock:
+            return memory.find(first, digest, time.time()) is not None
+
+    def delete(self, key, version=None):
+        memory = self._memory
+        digest = self._digest(key, version)
+        first, lock = memory.locked_set(digest)
+        with lock:
+            index = memory.find(first, digest, time.time())
+            if index is not None:
+                memory.write_slot(index, bytes(16), 0, 0, 0)
+
+    def clear(self):
+        self._memory.clear()
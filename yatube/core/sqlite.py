@@ -0,0 +1,120 @@
+"""
+Боевой режим SQLite.
+
+При ``SQLITE_PRODUCTION_MODE`` каждое новое соединение получает прагмы
+из ``SQLITE_PRAGMAS``: журнал WAL позволяет читателям не ждать писателя,
+``busy_timeout`` заставляет писателя подождать занятую базу вместо
+немедленной ошибки "database is locked".
+
+SQLite допускает только одного писателя, поэтому изменяющие запросы
+процесса выстраиваются в короткую очередь (``serialized_writes``) и не
+соревнуются друг с другом за блокировку базы. Конфликты с другими
+процессами повторяются с экспоненциальной задержкой.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.http import HttpResponse
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    """Обработчик ``connection_created``: настраивает соединение SQLite."""
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PRODUCTION_MODE:
+        return
+    if connection.is_in_memory_db():
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def is_locked_error(error):
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+
+class WriteQueueFull(Exception):
+    pass
+
+
+class WriteQueue:
+    """Пропускает к базе одного писателя процесса за раз.
+
+    Ожидающих не больше ``max_waiting``; остальные, как и не дождавшиеся
+    очереди за ``timeout`` секунд, получают ``WriteQueueFull``.
+    """
+
+    def __init__(self, max_waiting):
+        self.max_waiting = max_waiting
+        self.waiting = 0
+        self._lock = threading.Lock()
+        self._counter_lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, timeout):
+        with self._counter_lock:
+            if self.waiting >= self.max_waiting:
+                raise WriteQueueFull('Очередь записи переполнена')
+            self.waiting += 1
+        try:
+            acquired = self._lock.acquire(timeout=timeout)
+        finally:
+            with self._counter_lock:
+                self.waiting -= 1
+        if not acquired:
+            raise WriteQueueFull('Очередь записи не освободилась вовремя')
+        try:
+            yield
+        finally:
+            self._lock.release()
+
+
+write_queue = WriteQueue(getattr(settings, 'SQLITE_WRITE_QUEUE_SIZE', 32))
+
+
+def run_with_retries(func, retries):
+    """Выполняет ``func`` в транзакции, повторяя её при занятой базе."""
+    for attempt in range(retries + 1):
+        try:
+            with transaction.atomic():
+                return func()
+        except OperationalError as error:
+            if not is_locked_error(error) or attempt == retries:
+                raise
+        time.sleep(0.01 * 2 ** attempt * (1 + random.random()))
+
+
+def serialized_writes(view_func):
+    """Проводит изменяющие запросы к представлению через очередь записи.
+
+    Представление выполняется целиком в транзакции и повторяется, если
+    база оказалась занята другим процессом. Если очередь переполнена,
+    клиент получает 503 с ``Retry-After``. Чтение и режим разработки
+    обходят очередь.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if (request.method in SAFE_METHODS
+                or not settings.SQLITE_PRODUCTION_MODE
+                or connection.vendor != 'sqlite'):
+            return view_func(request, *args, **kwargs)
+        try:
+            with write_queue.slot(settings.SQLITE_WRITE_QUEUE_TIMEOUT):
+                return run_with_retries(
+                    lambda: view_func(request, *args, **kwargs),
+                    settings.SQLITE_WRITE_RETRIES,
+                )
+        except WriteQueueFull:
+            response = HttpResponse(
+                'Сервер перегружен, повторите попытку.', status=503
+            )
+            response['Retry-After'] = '1'
+            return response
+    return wrapper
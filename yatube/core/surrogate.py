@@ -0,0 +1,64 @@
+"""
+Суррогатные ключи для внешнего кеширующего прокси.
+
+Ответ помечается заголовком ``Surrogate-Key`` со списком ключей через
+пробел: прокси запоминает, какие страницы зависят от какого ключа, и по
+запросу очистки удаляет сразу все страницы с ним.
+
+Очистка идёт через очередь задач (core/tasks.py) после коммита
+изменения: worker объединяет ключи всех накопившихся задач, убирает
+повторы и отправляет их пачками по ``SURROGATE_PURGE_BATCH_SIZE``
+POST-запросом с телом ``{"surrogate_keys": [...]}`` на
+``SURROGATE_PURGE_URL``. Неудачная пачка повторяется вместе с задачами.
+Пустой ``SURROGATE_PURGE_URL`` отключает очистку.
+"""
+import json
+import urllib.request
+
+from django.conf import settings
+from django.db import transaction
+
+from .tasks import task
+
+HEADER = 'Surrogate-Key'
+
+
+def add_surrogate_keys(response, keys):
+    """Добавляет ключи к заголовку ``Surrogate-Key`` ответа."""
+    current = set(response.get(HEADER, '').split())
+    response[HEADER] = ' '.join(sorted(current | set(keys)))
+    return response
+
+
+def send_purge(keys):
+    request = urllib.request.Request(
+        settings.SURROGATE_PURGE_URL,
+        data=json.dumps({'surrogate_keys': keys}).encode(),
+        headers={
+            'Content-Type': 'application/json',
+            **settings.SURROGATE_PURGE_HEADERS,
+        },
+        method='POST',
+    )
+    with urllib.request.urlopen(
+            request, timeout=settings.SURROGATE_PURGE_TIMEOUT) as response:
+        response.read()
+
+
+@task(queue='purge', batch=True)
+def purge(payloads):
+    """Отправляет объединённые ключи всех захваченных задач пачками."""
+    keys = sorted({key for payload in payloads for key in payload['keys']})
+    size = settings.SURROGATE_PURGE_BATCH_SIZE
+    for start in range(0, len(keys), size):
+        send_purge(keys[start:start + size])
+
+
+def request_purge(keys, using=None):
+    """Ставит очистку ``keys`` в очередь после коммита транзакции
+    базы ``using``.
+    """
+    keys = sorted(set(keys))
+    if not keys or not settings.SURROGATE_PURGE_URL:
+        return
+    transaction.on_commit(lambda: purge.delay(keys=keys), using=using)
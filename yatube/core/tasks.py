@@ -0,0 +1,219 @@
+"""
+Локальная очередь фоновых задач в базе данных.
+
+Медленные побочные действия (отправка почты, уведомления) не выполняются
+в потоке запроса: ``enqueue`` записывает вызов в таблицу ``Task`` в той же
+транзакции, что и данные запроса, а команда ``run_tasks`` забирает
+созревшие задачи пачками и выполняет их в пуле потоков.
+
+Функции задач регистрируются декоратором ``task``::
+
+    @task(queue='email', batch=True)
+    def deliver(payloads):
+        ...
+
+    deliver.delay(message=...)
+
+Пакетная задача, выполненная лишь для части аргументов, сообщает об этом
+исключением ``PartialFailure``: выполненные задачи удаляются, а остальные
+повторяются с аргументами, которые в нём переданы.
+
+Упавшая задача повторяется с экспоненциальной задержкой
+``TASKS_RETRY_DELAY * 2 ** (попытка - 1)``; после ``TASKS_MAX_ATTEMPTS``
+неудач она остаётся в таблице со статусом ``failed``. Захват задачи
+ограничен сроком ``TASKS_LEASE``: задачи упавшего worker'а возвращаются
+в очередь, когда срок истекает. Итог выполнения записывается только
+пока у задачи прежняя метка захвата, иначе ею уже владеет другой worker.
+"""
+import datetime
+import json
+import logging
+import traceback
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger('yatube.tasks')
+
+_registry = {}
+
+
+class PartialFailure(Exception):
+    """Пакетная задача выполнена не для всех аргументов пачки.
+
+    ``retry`` - номер аргументов в пачке -> аргументы для повтора только
+    невыполненной части. Исходную ошибку передают через ``raise ... from``.
+    """
+
+    def __init__(self, retry):
+        super().__init__(f'Не выполнено задач пачки: {len(retry)}')
+        self.retry = retry
+
+
+def task(func=None, *, queue='default', batch=False):
+    """Регистрирует функцию как задачу и добавляет ей метод ``delay``.
+
+    Функция пакетной задачи (``batch=True``) получает список аргументов
+    всех захваченных задач и выполняется для них одним вызовом.
+    """
+    def decorator(func):
+        name = f'{func.__module__}.{func.__qualname__}'
+        func.task_name = name
+        func.task_queue = queue
+        func.task_batch = batch
+        func.delay = lambda **kwargs: enqueue(func, **kwargs)
+        _registry[name] = func
+        return func
+    return decorator(func) if func is not None else decorator
+
+
+def get_task(name):
+    if name not in _registry:
+        # Модуль задачи мог ещё не импортироваться в этом процессе.
+        import_string(name)
+    return _registry[name]
+
+
+def enqueue(func, run_at=None, **kwargs):
+    """Ставит вызов ``func(**kwargs)`` в очередь; аргументы - JSON."""
+    return Task.objects.create(
+        name=func.task_name,
+        queue=func.task_queue,
+        payload=json.dumps(kwargs),
+        run_at=run_at or timezone.now(),
+    )
+
+
+def claim(queues=None, limit=None):
+    """Захватывает до ``limit`` созревших задач и возвращает их.
+
+    Захват - условный UPDATE по ещё свободным строкам с уникальной
+    меткой, поэтому несколько worker'ов не получат одну задачу и без
+    SELECT ... FOR UPDATE, которого нет в SQLite.
+    """
+    now = timezone.now()
+    due = Task.objects.filter(
+        Q(status=Task.PENDING, run_at__lte=now)
+        | Q(status=Task.RUNNING, locked_until__lt=now)
+    )
+    if queues:
+        due = due.filter(queue__in=queues)
+    ids = list(
+        due.order_by('run_at', 'pk')
+        .values_list('pk', flat=True)[:limit or settings.TASKS_BATCH_SIZE]
+    )
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    due.filter(pk__in=ids).update(
+        status=Task.RUNNING,
+        lock_token=token,
+        locked_until=now + datetime.timedelta(seconds=settings.TASKS_LEASE),
+    )
+    return list(Task.objects.filter(lock_token=token).order_by('run_at', 'pk'))
+
+
+def execute(func, tasks):
+    """Выполняет задачи одной функции; запускается в потоке пула."""
+    try:
+        payloads = [json.loads(item.payload) for item in tasks]
+        if func.task_batch:
+            func(payloads)
+        else:
+            for payload in payloads:
+                func(**payload)
+    finally:
+        # У каждого потока пула своё соединение с базой.
+        connections.close_all()
+
+
+def finish(tasks, error=None):
+    """Удаляет выполненные задачи или откладывает их повтор."""
+    if isinstance(error, PartialFailure):
+        finish([
+            item for index, item in enumerate(tasks)
+            if index not in error.retry
+        ])
+        failed = []
+        for index, payload in error.retry.items():
+            tasks[index].payload = json.dumps(payload)
+            failed.append(tasks[index])
+        finish(failed, error.__cause__ or error)
+        return
+    if error is None:
+        deleted, _ = Task.objects.filter(
+            pk__in=[item.pk for item in tasks],
+            lock_token__in={item.lock_token for item in tasks},
+        ).delete()
+        if deleted < len(tasks):
+            logger.warning('Срок захвата истёк у %s задач из %s',
+                           len(tasks) - deleted, len(tasks))
+        return
+    message = ''.join(traceback.format_exception(
+        type(error), error, error.__traceback__
+    ))
+    for item in tasks:
+        item.attempts += 1
+        if item.attempts >= settings.TASKS_MAX_ATTEMPTS:
+            item.status = Task.FAILED
+        else:
+            item.status = Task.PENDING
+            delay = settings.TASKS_RETRY_DELAY * 2 ** (item.attempts - 1)
+            item.run_at = timezone.now() + datetime.timedelta(seconds=delay)
+        updated = Task.objects.filter(
+            pk=item.pk, lock_token=item.lock_token
+        ).update(
+            attempts=item.attempts, last_error=message, lock_token='',
+            locked_until=None, status=item.status, run_at=item.run_at,
+            payload=item.payload,
+        )
+        if not updated:
+            logger.warning('Срок захвата задачи %s #%s истёк',
+                           item.name, item.pk)
+        elif item.status == Task.FAILED:
+            logger.error('Задача %s #%s не выполнена: %s',
+                         item.name, item.pk, error)
+
+
+def run_pending(queues=None, threads=None, executor=None):
+    """Захватывает одну пачку задач, выполняет её и возвращает размер.
+
+    Функции задач работают в потоках пула, а статусы задач обновляет
+    вызывающий поток, чтобы SQLite не разбирал блокировку между ними.
+    """
+    tasks = claim(queues)
+    if not tasks:
+        return 0
+    groups = defaultdict(list)
+    for item in tasks:
+        try:
+            func = get_task(item.name)
+        except (ImportError, KeyError) as error:
+            finish([item], error)
+            continue
+        # Пакетная задача выполняется одним вызовом на всю пачку.
+        key = item.name if func.task_batch else item.pk
+        groups[func, key].append(item)
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(threads or settings.TASKS_THREADS)
+    try:
+        futures = {
+            executor.submit(execute, func, group): group
+            for (func, _), group in groups.items()
+        }
+        for future, group in futures.items():
+            finish(group, future.exception())
+    finally:
+        if own_executor:
+            executor.shutdown()
+    return len(tasks)
@@ -0,0 +1,27 @@
+"""
+Запуск тестов с отдельным кешем.
+
+Тесты не должны делить общий кеш с запущенным сайтом и прошлыми
+прогонами, поэтому на время прогона ``CACHES`` подменяется на
+``TEST_CACHES`` из настроек.
+"""
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+def test_caches():
+    return override_settings(CACHES=settings.TEST_CACHES)
+
+
+class TestRunner(DiscoverRunner):
+    """``DiscoverRunner`` с ``TEST_CACHES`` вместо ``CACHES``."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.caches = test_caches()
+        self.caches.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.caches.disable()
+        super().teardown_test_environment(**kwargs)
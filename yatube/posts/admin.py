@@ -1,20 +1,114 @@
 from django.contrib import admin
-from .models import Post, Group
+from django.core.exceptions import ValidationError
+
+from .models import Follow, GroupFollow, Post, Group
+from .search import filter_posts
+from .sharding import get_shards, is_sharded
+
+
+def selected_shard(request):
+    shard = request.GET.get(ShardFilter.parameter_name)
+    return shard if shard in get_shards() else get_shards()[0]
+
+
+class ShardFilter(admin.SimpleListFilter):
+    """Выбор шарда: список постов читает одну базу за раз."""
+    title = 'шард'
+    parameter_name = 'shard'
+
+    def lookups(self, request, model_admin):
+        return [(alias, alias) for alias in get_shards()]
+
+    def value(self):
+        return super().value() or get_shards()[0]
+
+    def choices(self, changelist):
+        # Пункта «Все» нет: queryset админки не умеет читать все шарды.
+        for lookup, title in self.lookup_choices:
+            yield {
+                'selected': self.value() == lookup,
+                'query_string': changelist.get_query_string(
+                    {self.parameter_name: lookup}
+                ),
+                'display': title,
+            }
+
+    def queryset(self, request, queryset):
+        # Шард уже выбран в PostAdmin.get_queryset.
+        return queryset
 
 
 class PostAdmin(admin.ModelAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
+    # Автор и группа подгружаются в get_queryset: в шардах их таблицы пусты.
+    list_select_related = ()
     search_fields = ('text',)
     list_filter = ('pub_date',)
     list_editable = ('group',)
     empty_value_display = '-пусто-'
 
+    def get_list_filter(self, request):
+        if is_sharded():
+            return (ShardFilter, *self.list_filter)
+        return self.list_filter
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if not is_sharded():
+            return queryset.select_related('author', 'group')
+        return queryset.using(selected_shard(request)).prefetch_related(
+            'author', 'group'
+        )
+
+    def get_object(self, request, object_id, from_field=None):
+        if not is_sharded():
+            return super().get_object(request, object_id, from_field)
+        queryset = self.get_queryset(request)
+        field = (
+            Post._meta.pk if from_field is None
+            else Post._meta.get_field(from_field)
+        )
+        try:
+            object_id = field.to_python(object_id)
+        except ValidationError:
+            return None
+        for alias in get_shards():
+            post = queryset.using(alias).filter(
+                **{field.name: object_id}
+            ).first()
+            if post is not None:
+                return post
+        return None
+
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по тексту идёт через индекс FTS5, а не LIKE '%...%'.
+        if not search_term:
+            return queryset, False
+        return filter_posts(queryset, search_term), False
+
 
 admin.site.register(Post, PostAdmin)
 
 
 class GroupAdmin(admin.ModelAdmin):
+    list_display = ('title', 'slug', 'posts_count')
     prepopulated_fields = {'slug': ('title',)}
 
 
 admin.site.register(Group, GroupAdmin)
+
+
+class FollowAdmin(admin.ModelAdmin):
+    list_display = ('user', 'author')
+    search_fields = ('user__username', 'author__username')
+
+
+admin.site.register(Follow, FollowAdmin)
+
+
+class GroupFollowAdmin(admin.ModelAdmin):
+    list_display = ('user', 'group')
+    search_fields = ('user__username', 'group__slug')
+
+
+admin.site.register(GroupFollow, GroupFollowAdmin)
@@ -0,0 +1,161 @@
+from functools import wraps
+
+from django.http import JsonResponse
+from django.utils.http import urlencode
+
+from core.middleware.anonymous import public_page
+
+from . import sharding
+from .models import Group, Post, User
+from .page_cache import (conditional_on_feeds, group_list_feeds, index_feeds,
+                         post_detail_feeds, profile_feeds)
+from .paginators import CursorPaginator, InvalidCursor
+from .utils import POSTS_PER_PAGE
+
+MAX_LIMIT = 100
+
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+}
+
+
+class ApiError(Exception):
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def api_view(view_func):
+    """Только GET, ошибки ``ApiError`` превращаются в JSON-ответ.
+
+    Все методы API публичные и идут быстрым путём для анонимов.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return JsonResponse(
+                {'error': 'Метод не поддерживается'}, status=405
+            )
+        try:
+            return view_func(request, *args, **kwargs)
+        except ApiError as error:
+            return JsonResponse({'error': str(error)}, status=error.status)
+    return public_page(wrapper)
+
+
+def get_fields(request):
+    """Поля постов из ``?fields=id,text``; по умолчанию - все."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(POST_FIELDS)
+    fields = [field.strip() for field in raw.split(',') if field.strip()]
+    unknown = set(fields) - set(POST_FIELDS)
+    if unknown or not fields:
+        raise ApiError(
+            f'Неизвестные поля: {", ".join(sorted(unknown))}. '
+            f'Доступны: {", ".join(POST_FIELDS)}'
+        )
+    return fields
+
+
+def get_limit(request):
+    try:
+        limit = int(request.GET.get('limit', POSTS_PER_PAGE))
+    except ValueError:
+        raise ApiError('limit должен быть числом')
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def serialize(row, fields):
+    return {field: row[POST_FIELDS[field]] for field in fields}
+
+
+def feed_response(request, queryset):
+    """Страница ленты по курсору, выбирающая только запрошенные поля."""
+    fields = get_fields(request)
+    columns = {POST_FIELDS[field] for field in fields} | {'id', 'pub_date'}
+    paginator = CursorPaginator(queryset.values(*columns), get_limit(request))
+    try:
+        page = paginator.cursor_page(
+            after=request.GET.get('after'), before=request.GET.get('before')
+        )
+    except InvalidCursor as error:
+        raise ApiError(str(error))
+
+    params = {
+        key: value for key, value in request.GET.items()
+        if key not in ('after', 'before')
+    }
+
+    def link(direction, cursor):
+        if cursor is None:
+            return None
+        return f'{request.path}?{urlencode({**params, direction: cursor})}'
+
+    return JsonResponse({
+        'results': [serialize(row, fields) for row in page],
+        'next': link('after', page.next_cursor),
+        'previous': link('before', page.previous_cursor),
+    })
+
+
+@api_view
+@conditional_on_feeds(index_feeds)
+def index(request):
+    return feed_response(request, sharding.feed(Post.objects.all()))
+
+
+@api_view
+@conditional_on_feeds(group_list_feeds)
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).values_list('pk').first()
+    if group is None:
+        raise ApiError('Группа не найдена', status=404)
+    return feed_response(
+        request, sharding.feed(Post.objects.filter(group_id=group[0]))
+    )
+
+
+@api_view
+@conditional_on_feeds(profile_feeds)
+def profile(request, username):
+    author = User.objects.filter(username=username).values(
+        'pk', 'username', 'first_name', 'last_name',
+        'post_stats__posts_count'
+    ).first()
+    if author is None:
+        raise ApiError('Автор не найден', status=404)
+    return JsonResponse({
+        'username': author['username'],
+        'first_name': author['first_name'],
+        'last_name': author['last_name'],
+        'posts_count': author['post_stats__posts_count'] or 0,
+    })
+
+
+@api_view
+@conditional_on_feeds(profile_feeds)
+def profile_posts(request, username):
+    author = User.objects.filter(username=username).values_list('pk').first()
+    if author is None:
+        raise ApiError('Автор не найден', status=404)
+    return feed_response(request, sharding.feed(
+        Post.objects.filter(author_id=author[0]), author_id=author[0]
+    ))
+
+
+@api_view
+@conditional_on_feeds(post_detail_feeds)
+def post_detail(request, post_id):
+    fields = get_fields(request)
+    post = sharding.feed(Post.objects.filter(pk=post_id)).values(
+        *{POST_FIELDS[field] for field in fields}
+    ).first()
+    if post is None:
+        raise ApiError('Пост не найден', status=404)
+    return JsonResponse(serialize(post, fields))
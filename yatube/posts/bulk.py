@@ -0,0 +1,161 @@
+import time
+from collections import Counter, defaultdict
+
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+from django.utils import timezone
+
+from core.surrogate import request_purge
+
+from .counters import change_author_count, change_group_count
+from .feeds import INDEX_FEED, author_feed, group_feed, touch
+from .models import Post
+from .sharding import allocate_ids, is_sharded, shard_for
+from .surrogate_keys import feed_purge_keys
+from .timeline import fan_out_many
+
+
+def fetch_ids(posts, using):
+    """Проставляет id вставленным постам, если база их не вернула.
+
+    Вызывается в транзакции вставки: SQLite держит блокировку записи с
+    первого INSERT, поэтому последние ``len(posts)`` id - наши, в порядке
+    вставки.
+    """
+    ids = Post.objects.using(using).order_by('-id').values_list(
+        'id', flat=True
+    )[:len(posts)]
+    for post, pk in zip(posts, reversed(list(ids))):
+        post.pk = pk
+
+
+def bulk_insert(posts, using, batch_size, ignore_conflicts=False):
+    """``bulk_create`` без ``pre_save`` полей, как у ``loaddata``.
+
+    Иначе ``auto_now_add`` заменил бы ``pub_date`` из источника текущим
+    временем. Новым постам проставляются id; с ``ignore_conflicts`` посты
+    должны быть с id.
+    """
+    new = posts[0].pk is None
+    fields = [
+        field for field in Post._meta.concrete_fields
+        if not (new and field.primary_key)
+    ]
+    return_ids = (
+        new and connections[using].features.can_return_ids_from_bulk_insert
+    )
+    for start in range(0, len(posts), batch_size):
+        batch = posts[start:start + batch_size]
+        ids = Post.objects._insert(
+            batch, fields=fields, using=using, return_id=return_ids,
+            raw=True, ignore_conflicts=ignore_conflicts
+        )
+        if return_ids:
+            for post, pk in zip(batch, ids):
+                post.pk = pk
+    if new and not return_ids:
+        fetch_ids(posts, using)
+    for post in posts:
+        post._state.adding = False
+        post._state.db = using
+
+
+class PostImporter:
+    """Вставляет посты пачками через ``bulk_create``.
+
+    ``bulk_create`` не отправляет сигналы, поэтому счётчики постов, версии
+    лент и очистка их страниц в прокси обновляются один раз на транзакцию
+    по накопленным итогам, а посты раскладываются по лентам подписчиков
+    после её коммита. При
+    шардировании посты получают id из общего счётчика и раскладываются по
+    шардам авторов.
+    Индекс поиска обновляется триггерами базы.
+    """
+
+    def __init__(self, batch_size=1000, transaction_size=10000,
+                 on_progress=None):
+        self.batch_size = batch_size
+        self.transaction_size = max(transaction_size, batch_size)
+        self.on_progress = on_progress
+        self.total = 0
+        self.started = time.monotonic()
+        self._pending = []
+
+    @property
+    def rate(self):
+        elapsed = time.monotonic() - self.started
+        return self.total / elapsed if elapsed else 0
+
+    def add(self, author_id, text, group_id=None, pub_date=None):
+        self._pending.append(Post(
+            author_id=author_id,
+            group_id=group_id,
+            text=text,
+            pub_date=pub_date or timezone.now(),
+        ))
+        if len(self._pending) >= self.transaction_size:
+            self.flush()
+
+    def get_batch_size(self, using):
+        """Размер пачки с учётом ограничений базы.
+
+        Django 2.2 не урезает явно заданный ``batch_size``, а SQLite не
+        принимает больше 500 строк в одном составном INSERT.
+        """
+        fields = [
+            field for field in Post._meta.concrete_fields
+            if not field.primary_key
+        ]
+        limit = connections[using].ops.bulk_batch_size(
+            fields, [None] * self.batch_size
+        )
+        return max(1, min(self.batch_size, limit))
+
+    def insert(self, posts):
+        """Вставляет посты, раскладывая их по шардам авторов."""
+        if not is_sharded():
+            using = router.db_for_write(Post)
+            with transaction.atomic(using=using):
+                bulk_insert(posts, using, self.get_batch_size(using))
+            return
+        for post, pk in zip(posts, allocate_ids(len(posts))):
+            post.pk = pk
+        by_shard = defaultdict(list)
+        for post in posts:
+            by_shard[shard_for(post.author_id)].append(post)
+        for using, shard_posts in by_shard.items():
+            with transaction.atomic(using=using):
+                bulk_insert(shard_posts, using,
+                            self.get_batch_size(using))
+
+    def flush(self):
+        if not self._pending:
+            return
+        posts, self._pending = self._pending, []
+        authors = Counter(post.author_id for post in posts)
+        groups = Counter(
+            post.group_id for post in posts if post.group_id is not None
+        )
+        with transaction.atomic():
+            self.insert(posts)
+            for author_id, delta in authors.items():
+                change_author_count(author_id, delta)
+            for group_id, delta in groups.items():
+                change_group_count(group_id, delta)
+        touch(
+            {INDEX_FEED}
+            | {author_feed(pk) for pk in authors}
+            | {group_feed(pk) for pk in groups}
+        )
+        request_purge(feed_purge_keys(authors, groups),
+                      using=DEFAULT_DB_ALIAS)
+        fan_out_many(posts)
+        self.total += len(posts)
+        if self.on_progress is not None:
+            self.on_progress(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.flush()
@@ -0,0 +1,80 @@
+from collections import Counter
+
+from django.db.models import Count, F
+
+from .models import AuthorStats, Group, Post
+from .sharding import get_shards
+
+
+def change_group_count(group_id, delta):
+    if group_id is None:
+        return
+    groups = Group.objects.filter(pk=group_id)
+    if delta < 0:
+        groups = groups.filter(posts_count__gte=-delta)
+    groups.update(posts_count=F('posts_count') + delta)
+
+
+def change_author_count(author_id, delta):
+    stats = AuthorStats.objects.filter(pk=author_id)
+    if delta < 0:
+        stats.filter(posts_count__gte=-delta).update(
+            posts_count=F('posts_count') + delta
+        )
+        return
+    if not stats.update(posts_count=F('posts_count') + delta):
+        stats, created = AuthorStats.objects.get_or_create(
+            user_id=author_id, defaults={'posts_count': delta}
+        )
+        if not created:
+            change_author_count(author_id, delta)
+
+
+def get_posts_count(user):
+    """Число постов автора без запроса COUNT(*).
+
+    Для пользователя, у которого ещё нет строки со счётчиками, возвращает 0.
+    """
+    stats = getattr(user, 'post_stats', None)
+    return stats.posts_count if stats is not None else 0
+
+
+def recount(dry_run=False):
+    """Пересчитывает счётчики по таблицам постов всех шардов.
+
+    Возвращает число исправленных авторов и групп.
+    """
+    fixed_authors = fixed_groups = 0
+
+    actual_authors, actual_groups = Counter(), Counter()
+    for alias in get_shards():
+        posts = Post.objects.using(alias).order_by()
+        actual_authors.update(dict(
+            posts.values_list('author').annotate(total=Count('id'))
+        ))
+        actual_groups.update(dict(
+            posts.exclude(group=None).values_list('group')
+            .annotate(total=Count('id'))
+        ))
+
+    stored = dict(AuthorStats.objects.values_list('user_id', 'posts_count'))
+    for author_id in actual_authors.keys() | stored.keys():
+        total = actual_authors.get(author_id, 0)
+        if stored.get(author_id) == total:
+            continue
+        fixed_authors += 1
+        if not dry_run:
+            AuthorStats.objects.update_or_create(
+                user_id=author_id, defaults={'posts_count': total}
+            )
+
+    for group_id, posts_count in Group.objects.values_list(
+            'id', 'posts_count'):
+        total = actual_groups.get(group_id, 0)
+        if posts_count == total:
+            continue
+        fixed_groups += 1
+        if not dry_run:
+            Group.objects.filter(pk=group_id).update(posts_count=total)
+
+    return fixed_authors, fixed_groups
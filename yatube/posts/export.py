@@ -0,0 +1,126 @@
+import csv
+import heapq
+import json
+import re
+from itertools import islice
+from urllib.parse import quote
+
+from django.contrib.auth import get_user_model
+
+from . import sharding
+from .models import Group, Post
+
+User = get_user_model()
+
+EXPORT_FIELDS = ('id', 'text', 'pub_date', 'author', 'group')
+EXPORT_COLUMNS = (
+    'id', 'text', 'pub_date', 'author__username', 'group__slug'
+)
+# В шардах нет таблиц пользователей и групп, имена подставляются отдельно.
+SHARD_COLUMNS = ('id', 'text', 'pub_date', 'author_id', 'group_id')
+CHUNK_SIZE = 2000
+BUFFER_SIZE = 64 * 1024
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+
+class Echo:
+    """Файлоподобный объект, который возвращает записанное, а не хранит."""
+
+    def write(self, value):
+        return value
+
+
+def content_disposition(filename):
+    """Заголовок вложения: имя в ASCII для старых клиентов и точное имя в
+    ``filename*`` (RFC 6266). Имена авторов бывают не ASCII, а заголовок
+    передаётся в latin-1.
+    """
+    fallback = re.sub(r'[^\x20-\x7e]|["\\]', '_', filename)
+    return (f'attachment; filename="{fallback}"; '
+            f"filename*=UTF-8''{quote(filename)}")
+
+
+def owner_posts(owner):
+    """Посты автора или группы со всех шардов."""
+    if isinstance(owner, Group):
+        return sharding.feed(Post.objects.filter(group=owner))
+    return sharding.feed(
+        Post.objects.filter(author=owner), author_id=owner.pk
+    )
+
+
+def sharded_export_rows(feed, chunk_size):
+    """Строки шардов, слитые по (pub_date, id); имена авторов и slug
+    групп подставляются пачками из основной базы.
+    """
+    streams = [
+        feed.queryset.using(alias).order_by('pub_date', 'id')
+        .values_list(*SHARD_COLUMNS).iterator(chunk_size=chunk_size)
+        for alias in feed.shards
+    ]
+    merged = heapq.merge(*streams, key=lambda row: (row[2], row[0]))
+    while True:
+        chunk = list(islice(merged, chunk_size))
+        if not chunk:
+            return
+        authors = dict(User.objects.filter(
+            pk__in={row[3] for row in chunk}
+        ).values_list('pk', 'username'))
+        groups = dict(Group.objects.filter(
+            pk__in={row[4] for row in chunk} - {None}
+        ).values_list('pk', 'slug'))
+        for post_id, text, pub_date, author_id, group_id in chunk:
+            yield (post_id, text, pub_date.isoformat(),
+                   authors.get(author_id, ''), groups.get(group_id, ''))
+
+
+def export_rows(queryset, chunk_size=CHUNK_SIZE):
+    """Строки постов в порядке публикации, без создания моделей."""
+    if isinstance(queryset, sharding.ShardedFeed):
+        yield from sharded_export_rows(queryset, chunk_size)
+        return
+    rows = queryset.order_by('pub_date', 'id').values_list(*EXPORT_COLUMNS)
+    for post_id, text, pub_date, author, group in rows.iterator(
+        chunk_size=chunk_size
+    ):
+        yield post_id, text, pub_date.isoformat(), author, group or ''
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def jsonl_lines(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(EXPORT_FIELDS, row)),
+                         ensure_ascii=False) + '\n'
+
+
+def buffered(lines, size=BUFFER_SIZE):
+    """Склеивает строки в куски примерно по ``size`` символов."""
+    chunk = []
+    length = 0
+    for line in lines:
+        chunk.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(chunk)
+            chunk = []
+            length = 0
+    if chunk:
+        yield ''.join(chunk)
+
+
+def export_lines(queryset, export_format, chunk_size=CHUNK_SIZE):
+    """Генератор выгрузки постов в CSV или JSONL с постоянной памятью."""
+    rows = export_rows(queryset, chunk_size)
+    if export_format == 'csv':
+        return buffered(csv_lines(rows))
+    return buffered(jsonl_lines(rows))
@@ -0,0 +1,151 @@
+import datetime
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from core import caching
+from core.replicas import reading_replica
+
+INDEX_FEED = 'index'
+# Меняется при любом изменении групп: их названия видны на странице поста.
+GROUPS_FEED = 'groups'
+
+VERSION_KEY = 'feed-version:{}'
+FRAGMENT_KEY = 'feed-fragment:{}'
+COUNT_KEY = 'feed-count:v2:{}'
+STATS_KEY = 'feed-cache-stats:{}'
+STATS_FIELDS = ('hits', 'misses', 'hit_time_us', 'miss_time_us')
+
+
+def group_feed(group_id):
+    return f'group:{group_id}'
+
+
+def author_feed(author_id):
+    return f'author:{author_id}'
+
+
+def post_feed(post_id):
+    return f'post:{post_id}'
+
+
+def feeds_for_post(post, old_group_id=None):
+    """Ленты, в которых показывается пост (и показывался до смены группы)."""
+    feeds = {INDEX_FEED, author_feed(post.author_id), post_feed(post.pk)}
+    for group_id in (post.group_id, old_group_id):
+        if group_id is not None:
+            feeds.add(group_feed(group_id))
+    return feeds
+
+
+def _now_version():
+    return int(time.time() * 1_000_000)
+
+
+def get_versions(feeds):
+    """Версии лент - время их последнего изменения в микросекундах.
+
+    Если версия вытеснена из кеша, лента считается изменённой сейчас:
+    старые фрагменты с прежней версией больше не будут прочитаны.
+    """
+    keys = {feed: VERSION_KEY.format(feed) for feed in feeds}
+    stored = cache.get_many(keys.values())
+    versions = {}
+    for feed, key in keys.items():
+        if key not in stored:
+            cache.add(key, _now_version(), None)
+            stored[key] = cache.get(key)
+        versions[feed] = stored[key]
+    return versions
+
+
+def get_version(feed):
+    return get_versions([feed])[feed]
+
+
+def version_to_datetime(version):
+    return datetime.datetime.fromtimestamp(
+        version / 1_000_000, tz=timezone.utc
+    )
+
+
+def touch(feeds):
+    """Помечает ленты изменёнными, инвалидируя все их фрагменты."""
+    version = _now_version()
+    cache.set_many(
+        {VERSION_KEY.format(feed): version for feed in feeds}, None
+    )
+
+
+def fragment_key(name, feed, page):
+    """Ключ фрагмента: лента, её версия и границы страницы."""
+    rows = list(page)
+    if rows:
+        bounds = (f'{rows[0].pk}-{rows[0].pub_date.timestamp()}:'
+                  f'{rows[-1].pk}-{rows[-1].pub_date.timestamp()}')
+    else:
+        bounds = 'empty'
+    raw = f'{name}:{feed}:{get_version(feed)}:{len(rows)}:{bounds}'
+    return FRAGMENT_KEY.format(hashlib.md5(raw.encode()).hexdigest())
+
+
+def get_fragment(key):
+    return cache.get(key)
+
+
+def set_fragment(key, content):
+    # Фрагмент с отставшей реплики остался бы под новой версией ленты.
+    if reading_replica():
+        return
+    cache.set(key, content, settings.FEED_CACHE_TIMEOUT)
+
+
+def get_count(feed, count):
+    """Число постов ленты из кеша; ``count`` считает его при промахе.
+
+    В точном режиме ключ содержит версию ленты, поэтому создание и
+    удаление постов сразу сбрасывают счётчик. В приближённом режиме
+    (``FEED_COUNT_MODE = 'approximate'``) число живёт в кеше
+    ``FEED_COUNT_TIMEOUT`` секунд независимо от изменений: для огромных
+    таблиц это избавляет от COUNT(*) после каждого нового поста.
+    """
+    if settings.FEED_COUNT_MODE == 'approximate':
+        key = COUNT_KEY.format(feed)
+        timeout = settings.FEED_COUNT_TIMEOUT
+    elif reading_replica():
+        # Число с отставшей реплики осталось бы под новой версией ленты.
+        return count()
+    else:
+        key = COUNT_KEY.format(f'{feed}:{get_version(feed)}')
+        timeout = settings.FEED_CACHE_TIMEOUT
+    return caching.get_or_compute(key, count, timeout)
+
+
+_stats = caching.Counters(STATS_KEY, STATS_FIELDS)
+
+
+def record(hit, elapsed):
+    """Учитывает попадание или промах и время отрисовки фрагмента."""
+    count, time_us = ('hits', 'hit_time_us') if hit else (
+        'misses', 'miss_time_us'
+    )
+    _stats.incr(count)
+    _stats.incr(time_us, int(elapsed * 1_000_000))
+
+
+def get_stats():
+    """Счётчики попаданий и среднее время отрисовки ленты в мс."""
+    stats = _stats.get()
+    for kind, count in (('hit', 'hits'), ('miss', 'misses')):
+        total = stats[f'{kind}_time_us']
+        stats[f'{kind}_avg_ms'] = (
+            total / stats[count] / 1000 if stats[count] else 0
+        )
+    return stats
+
+
+def reset_stats():
+    _stats.reset()
@@ -0,0 +1,273 @@
+import io
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+from importlib import import_module
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth import (BACKEND_SESSION_KEY, HASH_SESSION_KEY,
+                                 SESSION_KEY)
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connections
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from .models import Group, Post, User
+
+SAMPLE_SIZE = 1000
+
+# Доли маршрутов в смеси по умолчанию: чтение лент преобладает.
+DEFAULT_MIX = {
+    'posts:index': 30,
+    'posts:index_deep': 5,
+    'posts:group_list': 15,
+    'posts:profile': 15,
+    'posts:post_detail': 20,
+    'posts:search': 3,
+    'posts:api_index': 5,
+    'users:login': 4,
+    'users:signup': 3,
+}
+
+
+def parse_mix(raw):
+    """Разбирает ``posts:index=10,users:login=1`` в словарь весов."""
+    mix = {}
+    for item in raw.split(','):
+        name, _, weight = item.strip().partition('=')
+        if name not in DEFAULT_MIX:
+            raise ValueError(
+                f'Неизвестный маршрут {name}. '
+                f'Доступны: {", ".join(DEFAULT_MIX)}'
+            )
+        try:
+            mix[name] = int(weight) if weight else 1
+        except ValueError:
+            raise ValueError(f'Вес маршрута {name} должен быть числом')
+    return mix
+
+
+def percentile(values, fraction):
+    """Перцентиль по ближайшему рангу; ``values`` отсортированы."""
+    if not values:
+        return 0
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+class Sample:
+    """Реальные slug, имена и id постов, из которых строятся адреса."""
+
+    def __init__(self, size=SAMPLE_SIZE, rng=None):
+        self.random = rng or random.Random()
+        self.slugs = list(
+            Group.objects.order_by('-pk').values_list('slug', flat=True)[:size]
+        )
+        self.usernames = list(
+            User.objects.order_by('-pk')
+            .values_list('username', flat=True)[:size]
+        )
+        self.post_ids = list(
+            Post.objects.order_by('-pk').values_list('pk', flat=True)[:size]
+        )
+        self.words = [
+            word
+            for text in Post.objects.order_by('-pk')
+            .values_list('text', flat=True)[:50]
+            for word in text.split()
+            if len(word) > 3
+        ] or ['пост']
+
+    def url(self, name):
+        choice = self.random.choice
+        if name == 'posts:index_deep':
+            return reverse('posts:index'), f'page={self.random.randint(2, 5)}'
+        if name == 'posts:group_list':
+            if not self.slugs:
+                return None
+            return reverse(name, kwargs={'slug': choice(self.slugs)}), ''
+        if name == 'posts:profile':
+            if not self.usernames:
+                return None
+            username = choice(self.usernames)
+            return reverse(name, kwargs={'username': username}), ''
+        if name == 'posts:post_detail':
+            if not self.post_ids:
+                return None
+            return reverse(name, kwargs={'post_id': choice(self.post_ids)}), ''
+        if name == 'posts:search':
+            return reverse(name), urlencode({
+                'q': choice(self.words).strip('.,!?')
+            })
+        return reverse(name), ''
+
+
+def login_cookie(user):
+    """Создаёт сессию пользователя в обход формы входа."""
+    engine = import_module(settings.SESSION_ENGINE)
+    session = engine.SessionStore()
+    session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.save()
+    return f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+
+
+def wsgi_request(handler, path, query_string='', cookie=''):
+    """Выполняет GET через WSGI-обработчик без сети и возвращает статус и
+    тело ответа.
+    """
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': query_string,
+        'wsgi.input': io.BytesIO(),
+    }
+    if cookie:
+        environ['HTTP_COOKIE'] = cookie
+    setup_testing_defaults(environ)
+    status = []
+
+    def start_response(status_line, headers, exc_info=None):
+        status.append(int(status_line.split()[0]))
+
+    response = handler(environ, start_response)
+    try:
+        body = b''.join(response)
+    finally:
+        if hasattr(response, 'close'):
+            response.close()
+    return status[0], body
+
+
+def wsgi_get(handler, path, query_string='', cookie=''):
+    """Выполняет GET через WSGI-обработчик без сети и возвращает статус."""
+    return wsgi_request(handler, path, query_string, cookie)[0]
+
+
+class RouteStats:
+
+    def __init__(self):
+        self.latencies = []
+        self.statuses = defaultdict(int)
+        self.errors = 0
+
+    def add(self, elapsed, status):
+        self.latencies.append(elapsed)
+        self.statuses[status] += 1
+        if status >= 500:
+            self.errors += 1
+
+    def summary(self, duration):
+        latencies = sorted(self.latencies)
+        return {
+            'requests': len(latencies),
+            'errors': self.errors,
+            'rps': len(latencies) / duration if duration else 0,
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p95_ms': percentile(latencies, 0.95) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'statuses': dict(self.statuses),
+        }
+
+
+class LoadDriver:
+    """Прогоняет взвешенную смесь запросов через WSGI-приложение.
+
+    Запросы не уходят в сеть: окружение WSGI собирается вручную и
+    передаётся обработчику Django напрямую, поэтому измеряется только
+    стоимость самого приложения.
+    """
+
+    def __init__(self, mix=None, authenticated_share=0.0, seed=None,
+                 handler=None):
+        self.mix = mix or DEFAULT_MIX
+        self.random = random.Random(seed)
+        self.handler = handler or WSGIHandler()
+        self.sample = Sample(rng=self.random)
+        self.cookies = []
+        self.authenticated_share = authenticated_share
+        if authenticated_share > 0:
+            self.cookies = [
+                login_cookie(user)
+                for user in User.objects.order_by('-pk')[:10]
+            ]
+        self.lock = threading.Lock()
+
+    def plan(self, requests):
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+        plan = []
+        for name in self.random.choices(names, weights, k=requests):
+            url = self.sample.url(name)
+            if url is None:
+                continue
+            cookie = ''
+            share = self.authenticated_share
+            if self.cookies and self.random.random() < share:
+                cookie = self.random.choice(self.cookies)
+            plan.append((name, url[0], url[1], cookie))
+        return plan
+
+    def request(self, path, query_string='', cookie=''):
+        return wsgi_get(self.handler, path, query_string, cookie)
+
+    def measure(self, stats, item):
+        name, path, query_string, cookie = item
+        started = time.perf_counter()
+        status = self.request(path, query_string, cookie)
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            stats[name].add(elapsed, status)
+
+    def execute(self, plan, stats, concurrency):
+        if concurrency <= 1:
+            # Соединение главного потока закрывать нельзя, поэтому без
+            # отдельных потоков прогон выполняется прямо здесь.
+            for item in plan:
+                self.measure(stats, item)
+            return
+        position = iter(plan)
+
+        def worker():
+            try:
+                while True:
+                    with self.lock:
+                        item = next(position, None)
+                    if item is None:
+                        return
+                    self.measure(stats, item)
+            finally:
+                # У каждого потока своё соединение с базой.
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def run(self, requests=1000, concurrency=1):
+        """Выполняет ``requests`` запросов и возвращает отчёт по маршрутам."""
+        plan = self.plan(requests)
+        stats = defaultdict(RouteStats)
+        started = time.perf_counter()
+        self.execute(plan, stats, concurrency)
+        duration = time.perf_counter() - started
+
+        total = RouteStats()
+        for route in stats.values():
+            total.latencies.extend(route.latencies)
+            for status, count in route.statuses.items():
+                total.statuses[status] += count
+            total.errors += route.errors
+        return {
+            'duration': duration,
+            'routes': {
+                name: route.summary(duration)
+                for name, route in sorted(stats.items())
+            },
+            'total': total.summary(duration),
+        }
@@ -0,0 +1,100 @@
+import gc
+import json
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.template import Context, Template
+
+from posts.models import Post
+from posts.rows import FEED_FIELDS, build_rows
+
+# Цикл ленты из posts/index.html без кеша фрагментов.
+FEED_TEMPLATE = '''{% for post in posts %}
+Автор: {{ post.author.get_full_name }}
+Дата публикации: {{ post.pub_date_display }}
+<p>{{ post.text }}</p>
+<a href="{{ post.get_absolute_url }}">подробная информация</a>
+{% if post.group %}
+<a href="{{ post.group.get_absolute_url }}">все записи группы</a>
+{% endif %}
+{% endfor %}'''
+
+
+def model_page(queryset, offset, per_page):
+    return list(
+        queryset.select_related('author', 'group')[offset:offset + per_page]
+    )
+
+
+def row_page(queryset, offset, per_page):
+    return build_rows(
+        queryset.values(*FEED_FIELDS)[offset:offset + per_page]
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает построение страницы главной ленты из моделей и из '
+        'лёгких строк posts.rows: время выборки, время отрисовки и память '
+        'объектов страницы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=50,
+                            help='Сколько первых страниц ленты выбрать.')
+        parser.add_argument('--per-page', type=int, default=10)
+        parser.add_argument('--json', action='store_true',
+                            help='Вывести отчёт в JSON.')
+
+    def measure(self, fetch, pages, per_page):
+        queryset = Post.objects.order_by('-pub_date', '-id')
+        template = Template(FEED_TEMPLATE)
+        fetch_time = render_time = 0.0
+        for number in range(pages):
+            started = time.perf_counter()
+            posts = fetch(queryset, number * per_page, per_page)
+            fetched = time.perf_counter()
+            template.render(Context({'posts': posts}))
+            fetch_time += fetched - started
+            render_time += time.perf_counter() - fetched
+
+        gc.collect()
+        tracemalloc.start()
+        try:
+            posts = fetch(queryset, 0, per_page)
+            retained, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return {
+            'fetch_ms': fetch_time / pages * 1000,
+            'render_ms': render_time / pages * 1000,
+            'retained_kb': retained / 1024,
+            'peak_kb': peak / 1024,
+            'rows': len(posts),
+        }
+
+    def handle(self, *args, **options):
+        pages = max(1, options['pages'])
+        report = {
+            name: self.measure(fetch, pages, options['per_page'])
+            for name, fetch in (('models', model_page), ('rows', row_page))
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(
+            f'{"путь":<10}{"выборка, мс":>14}{"отрисовка, мс":>16}'
+            f'{"память, КБ":>13}{"пик, КБ":>10}'
+        )
+        for name, row in report.items():
+            self.stdout.write(
+                f'{name:<10}{row["fetch_ms"]:>14.3f}'
+                f'{row["render_ms"]:>16.3f}{row["retained_kb"]:>13.1f}'
+                f'{row["peak_kb"]:>10.1f}'
+            )
+        self.stdout.write(
+            f'Страниц: {pages} по {options["per_page"]} постов; '
+            'время - среднее на страницу, память - объекты одной страницы.'
+        )
@@ -0,0 +1,46 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import (CHUNK_SIZE, CONTENT_TYPES, export_lines,
+                          owner_posts)
+from posts.models import Group
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты автора или группы в CSV или JSONL.'
+
+    def add_arguments(self, parser):
+        source = parser.add_mutually_exclusive_group(required=True)
+        source.add_argument('--author', help='username автора.')
+        source.add_argument('--group', help='slug группы.')
+        parser.add_argument(
+            '--format', choices=tuple(CONTENT_TYPES), default='csv'
+        )
+        parser.add_argument(
+            '--output', default='-',
+            help='Путь к файлу или "-" для вывода в stdout.'
+        )
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if options['author']:
+            owner = User.objects.filter(username=options['author']).first()
+        else:
+            owner = Group.objects.filter(slug=options['group']).first()
+        if owner is None:
+            raise CommandError('Автор или группа не найдены')
+
+        lines = export_lines(
+            owner_posts(owner), options['format'], options['chunk_size']
+        )
+        if options['output'] == '-':
+            for chunk in lines:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8',
+                  newline='') as output:
+            for chunk in lines:
+                output.write(chunk)
+        self.stderr.write(f'Выгрузка сохранена в {options["output"]}')
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from posts.feeds import get_stats, reset_stats
+
+
+class Command(BaseCommand):
+    help = 'Показывает попадания в кеш лент и время их отрисовки.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Обнулить счётчики после вывода.'
+        )
+
+    def handle(self, *args, **options):
+        stats = get_stats()
+        total = stats['hits'] + stats['misses']
+        ratio = stats['hits'] / total * 100 if total else 0
+        self.stdout.write(
+            f'Попаданий: {stats["hits"]}, промахов: {stats["misses"]} '
+            f'({ratio:.1f}% попаданий)\n'
+            f'Среднее время фрагмента: попадание - '
+            f'{stats["hit_avg_ms"]:.2f} мс, промах - '
+            f'{stats["miss_avg_ms"]:.2f} мс'
+        )
+        if options['reset']:
+            reset_stats()
@@ -0,0 +1,136 @@
+import csv
+import io
+import json
+import sys
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+from django.utils import timezone
+
+from posts.bulk import PostImporter
+from posts.models import Group
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует посты из JSONL или CSV (файл или stdin). '
+        'Поля строки: text, author (username), group (slug), pub_date.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'source', help='Путь к файлу или "-" для чтения из stdin.'
+        )
+        parser.add_argument(
+            '--format', choices=('jsonl', 'csv'),
+            help='Формат данных; по умолчанию - по расширению файла.'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--transaction-size', type=int, default=10000,
+            help='Сколько постов вставлять в одной транзакции.'
+        )
+        parser.add_argument(
+            '--create-authors', action='store_true',
+            help='Создавать неизвестных авторов без пароля.'
+        )
+
+    def handle(self, *args, **options):
+        source = options['source']
+        data_format = options['format'] or (
+            'csv' if source.lower().endswith('.csv') else 'jsonl'
+        )
+        self.create_authors = options['create_authors']
+        self.authors = dict(User.objects.values_list('username', 'pk'))
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.skipped = 0
+        self.unknown_groups = 0
+
+        if source == '-':
+            stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8')
+        else:
+            try:
+                stream = open(source, encoding='utf-8', newline='')
+            except OSError as error:
+                raise CommandError(f'Не удалось открыть {source}: {error}')
+
+        importer = PostImporter(
+            batch_size=options['batch_size'],
+            transaction_size=options['transaction_size'],
+            on_progress=self.report_progress,
+        )
+        with stream, importer:
+            for line_number, row in enumerate(self.read(stream, data_format),
+                                              start=1):
+                self.import_row(importer, line_number, row)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано постов: {importer.total} '
+            f'({importer.rate:.0f} в секунду), пропущено: {self.skipped}, '
+            f'без группы из-за неизвестного slug: {self.unknown_groups}'
+        ))
+
+    def read(self, stream, data_format):
+        if data_format == 'csv':
+            yield from csv.DictReader(stream)
+            return
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+
+    def import_row(self, importer, line_number, row):
+        if not isinstance(row, dict):
+            self.skip(line_number, 'ожидался объект JSON')
+            return
+        if not row.get('text') or not row.get('author'):
+            self.skip(line_number, 'нет текста или автора')
+            return
+        author_id = self.get_author_id(row['author'])
+        if author_id is None:
+            self.skip(line_number, f'неизвестный автор {row["author"]}')
+            return
+
+        group_id = None
+        if row.get('group'):
+            group_id = self.groups.get(row['group'])
+            if group_id is None:
+                self.unknown_groups += 1
+
+        pub_date = None
+        if row.get('pub_date'):
+            pub_date = parse_datetime(row['pub_date'])
+            if pub_date is None:
+                self.skip(line_number, 'некорректная дата публикации')
+                return
+            if timezone.is_naive(pub_date):
+                pub_date = timezone.make_aware(pub_date, timezone.utc)
+
+        importer.add(author_id, row['text'], group_id, pub_date)
+
+    def get_author_id(self, username):
+        author_id = self.authors.get(username)
+        if author_id is None and self.create_authors:
+            author = User.objects.create(
+                username=username, password=make_password(None)
+            )
+            author_id = self.authors[username] = author.pk
+        return author_id
+
+    def skip(self, line_number, reason):
+        self.skipped += 1
+        self.stderr.write(f'Строка {line_number} пропущена: {reason}')
+
+    def report_progress(self, importer):
+        self.stderr.write(
+            f'Импортировано {importer.total} постов, '
+            f'{importer.rate:.0f} в секунду'
+        )
@@ -0,0 +1,65 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.loadtest import DEFAULT_MIX, LoadDriver, parse_mix
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет взвешенную смесь запросов к posts/ и users/ через '
+        'WSGI-приложение и печатает пропускную способность и задержки '
+        'p50/p95/p99 по маршрутам.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=1)
+        parser.add_argument(
+            '--mix',
+            help=(
+                'Веса маршрутов, например "posts:index=10,users:login=1". '
+                f'Маршруты: {", ".join(DEFAULT_MIX)}.'
+            )
+        )
+        parser.add_argument(
+            '--authenticated', type=float, default=0.0,
+            help='Доля запросов от авторизованных пользователей (0..1).'
+        )
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument(
+            '--json', action='store_true',
+            help='Вывести отчёт в JSON.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            mix = parse_mix(options['mix']) if options['mix'] else None
+        except ValueError as error:
+            raise CommandError(error)
+        driver = LoadDriver(
+            mix=mix,
+            authenticated_share=options['authenticated'],
+            seed=options['seed'],
+        )
+        report = driver.run(
+            requests=options['requests'],
+            concurrency=options['concurrency'],
+        )
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+            return
+
+        header = (
+            f'{"маршрут":<20}{"запросов":>10}{"ошибок":>8}{"rps":>9}'
+            f'{"p50, мс":>10}{"p95, мс":>10}{"p99, мс":>10}'
+        )
+        self.stdout.write(header)
+        rows = list(report['routes'].items()) + [('итого', report['total'])]
+        for name, row in rows:
+            self.stdout.write(
+                f'{name:<20}{row["requests"]:>10}{row["errors"]:>8}'
+                f'{row["rps"]:>9.1f}{row["p50_ms"]:>10.2f}'
+                f'{row["p95_ms"]:>10.2f}{row["p99_ms"]:>10.2f}'
+            )
+        self.stdout.write(f'Длительность: {report["duration"]:.2f} с')
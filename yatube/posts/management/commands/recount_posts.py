@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import recount
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов у авторов и групп.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, сколько счётчиков расходится.'
+        )
+
+    def handle(self, *args, **options):
+        authors, groups = recount(dry_run=options['dry_run'])
+        verb = 'Расходится' if options['dry_run'] else 'Исправлено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} счётчиков: авторов - {authors}, групп - {groups}'
+        ))
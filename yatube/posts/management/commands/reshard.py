@@ -0,0 +1,105 @@
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from posts.bulk import bulk_insert
+from posts.feeds import INDEX_FEED, author_feed, touch
+from posts.models import Post
+from posts.sharding import shard_for
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит посты в шарды их авторов после изменения POST_SHARDS. '
+        'Повторный запуск безопасен: уже перенесённые посты пропускаются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--shards',
+            help='Новый список шардов через запятую; по умолчанию - '
+                 'POST_SHARDS.'
+        )
+        parser.add_argument(
+            '--from', dest='sources',
+            help='Базы, из которых забрать посты, кроме новых шардов '
+                 '(например, выводимый из работы шард).'
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        shards = self.parse_aliases(options['shards']) or list(
+            settings.POST_SHARDS
+        )
+        if not shards:
+            raise CommandError('Не задан ни один шард.')
+        sources = list(dict.fromkeys(
+            shards + self.parse_aliases(options['sources'])
+        ))
+        # SQLite принимает не больше 500 строк в составном INSERT.
+        batch_size = max(1, min(options['batch_size'], 500))
+
+        moved = Counter()
+        authors = set()
+        for source in sources:
+            for target, posts in self.scan(source, shards, batch_size):
+                moved[source, target] += len(posts)
+                authors.update(post.author_id for post in posts)
+                if not options['dry_run']:
+                    self.move(posts, source, target, batch_size)
+
+        if authors and not options['dry_run']:
+            touch({INDEX_FEED} | {author_feed(pk) for pk in authors})
+        verb = 'Нужно перенести' if options['dry_run'] else 'Перенесено'
+        for (source, target), count in sorted(moved.items()):
+            self.stdout.write(f'{verb} {source} -> {target}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} постов: {sum(moved.values())}'
+        ))
+
+    def parse_aliases(self, raw):
+        aliases = [alias.strip() for alias in (raw or '').split(',')
+                   if alias.strip()]
+        unknown = set(aliases) - set(connections.databases)
+        if unknown:
+            raise CommandError(
+                f'Неизвестные базы: {", ".join(sorted(unknown))}'
+            )
+        return aliases
+
+    def scan(self, source, shards, batch_size):
+        """Пачки постов базы ``source``, которым место в другом шарде."""
+        last_id = 0
+        while True:
+            batch = list(
+                Post.objects.using(source).filter(pk__gt=last_id)
+                .order_by('pk')[:batch_size]
+            )
+            if not batch:
+                return
+            last_id = batch[-1].pk
+            moving = defaultdict(list)
+            for post in batch:
+                target = shard_for(post.author_id, shards)
+                if target != source:
+                    moving[target].append(post)
+            yield from moving.items()
+
+    def move(self, posts, source, target, batch_size):
+        # Сначала копия, потом удаление: при сбое пост окажется в двух
+        # шардах, и повторный запуск просто удалит лишнюю копию.
+        with transaction.atomic(using=target):
+            bulk_insert(posts, target, batch_size, ignore_conflicts=True)
+        # Удаление в обход сигналов: счётчики постов не меняются.
+        ids = [post.pk for post in posts]
+        placeholders = ', '.join(['%s'] * len(ids))
+        with transaction.atomic(using=source), \
+                connections[source].cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {Post._meta.db_table} '
+                f'WHERE id IN ({placeholders})',
+                ids
+            )
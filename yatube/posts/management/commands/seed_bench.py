@@ -0,0 +1,123 @@
+import datetime
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from faker import Faker
+
+from posts.bulk import PostImporter
+from posts.models import Group
+
+User = get_user_model()
+
+TEXT_POOL_SIZE = 2000
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами и постами '
+        'для нагрузочного тестирования.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько последних дней распределить даты постов.'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--transaction-size', type=int, default=50000)
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument(
+            '--password', default='bench-password',
+            help='Общий пароль синтетических пользователей.'
+        )
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.fake = Faker('ru_RU')
+        if options['seed'] is not None:
+            self.fake.seed_instance(options['seed'])
+        self.prefix = f'bench{int(time.time())}'
+
+        started = time.monotonic()
+        author_ids = self.create_users(options)
+        group_ids = self.create_groups(options)
+        self.create_posts(options, author_ids, group_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.monotonic() - started:.1f} с'
+        ))
+
+    def create_users(self, options):
+        # Хешировать пароль миллион раз слишком долго: хеш общий.
+        password = make_password(options['password'])
+        users = []
+        for i in range(options['users']):
+            users.append(User(
+                username=f'{self.prefix}-user-{i}',
+                first_name=self.fake.first_name(),
+                last_name=self.fake.last_name(),
+                password=password,
+            ))
+        User.objects.bulk_create(users)
+        self.stdout.write(f'Пользователей: {len(users)}')
+        return list(
+            User.objects.filter(username__startswith=f'{self.prefix}-user-')
+            .values_list('pk', flat=True)
+        )
+
+    def create_groups(self, options):
+        groups = [
+            Group(
+                title=self.fake.catch_phrase()[:200],
+                slug=f'{self.prefix}-group-{i}',
+                description=self.fake.paragraph(),
+            )
+            for i in range(options['groups'])
+        ]
+        Group.objects.bulk_create(groups)
+        self.stdout.write(f'Групп: {len(groups)}')
+        return list(
+            Group.objects.filter(slug__startswith=f'{self.prefix}-group-')
+            .values_list('pk', flat=True)
+        )
+
+    def create_posts(self, options, author_ids, group_ids):
+        if not author_ids:
+            return
+        # Faker медленный, поэтому тексты берутся из заранее собранного пула.
+        texts = [
+            self.fake.paragraph(nb_sentences=self.random.randint(1, 6))
+            for _ in range(min(TEXT_POOL_SIZE, options['posts']))
+        ]
+        now = timezone.now()
+        span = datetime.timedelta(days=options['days']).total_seconds()
+        choice = self.random.choice
+        uniform = self.random.uniform
+
+        importer = PostImporter(
+            batch_size=options['batch_size'],
+            transaction_size=options['transaction_size'],
+            on_progress=lambda importer: self.stderr.write(
+                f'Постов: {importer.total}, {importer.rate:.0f} в секунду'
+            ),
+        )
+        with importer:
+            for _ in range(options['posts']):
+                importer.add(
+                    author_id=choice(author_ids),
+                    text=choice(texts),
+                    group_id=(
+                        choice(group_ids)
+                        if group_ids and self.random.random() < 0.7 else None
+                    ),
+                    pub_date=now - datetime.timedelta(
+                        seconds=uniform(0, span)
+                    ),
+                )
+        self.stdout.write(f'Постов: {importer.total}')
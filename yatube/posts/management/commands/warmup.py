@@ -0,0 +1,57 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.warmup import compile_templates, reverse_urls, warm_feeds
+
+
+class Command(BaseCommand):
+    """Команда работает в своём процессе: скомпилированные шаблоны и
+    адреса остаются в нём, и серверу от них только проверка. Процессы
+    сервера прогревает ``preload`` (yatube/prefork.py) перед fork, а
+    ленты, запрошенные командой, попадают в общий кеш и видны всем.
+    """
+
+    help = (
+        'Проверяет шаблоны и адреса после выкладки и прогревает общий '
+        'кеш популярных лент. Worker\'ы сервера прогревает preload.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=3,
+                            help='Сколько страниц главной прогреть.')
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--authors', type=int, default=20)
+        parser.add_argument('--no-feeds', action='store_true',
+                            help='Не запрашивать ленты.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        if settings.DEBUG:
+            self.stderr.write(
+                'DEBUG включён: кеширующий загрузчик шаблонов не '
+                'используется, шаблоны только проверяются.'
+            )
+
+        compiled, errors = compile_templates()
+        self.stdout.write(f'Шаблонов скомпилировано: {compiled}')
+        for error in errors:
+            self.stderr.write(f'Ошибка шаблона {error}')
+
+        reversed_count, skipped = reverse_urls()
+        self.stdout.write(f'Адресов построено: {reversed_count}')
+        if skipped:
+            self.stdout.write(f'Пропущены: {", ".join(skipped)}')
+
+        if not options['no_feeds']:
+            warmed, failed = warm_feeds(
+                options['pages'], options['groups'], options['authors']
+            )
+            self.stdout.write(f'Лент прогрето: {warmed - len(failed)}')
+            for url in failed:
+                self.stderr.write(f'Не удалось прогреть {url}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Прогрев завершён за {time.monotonic() - started:.2f} с'
+        ))
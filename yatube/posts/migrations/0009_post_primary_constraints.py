@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, migrations, models
+import django.db.models.deletion
+
+from posts import search
+
+
+def install_search_index(apps, schema_editor):
+    # Изменение полей пересоздаёт таблицу постов вместе с триггерами.
+    search.install(schema_editor)
+
+
+class AlterFieldOnPrimary(migrations.AlterField):
+    """Меняет поле только в основной базе.
+
+    В шардах нет строк пользователей и групп, поэтому посты там остаются
+    без ограничений внешних ключей, снятых в 0007.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        if schema_editor.connection.alias == DEFAULT_DB_ALIAS:
+            super().database_forwards(app_label, schema_editor, from_state,
+                                      to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        if schema_editor.connection.alias == DEFAULT_DB_ALIAS:
+            super().database_backwards(app_label, schema_editor, from_state,
+                                       to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0008_follow_timeline'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, install_search_index),
+        AlterFieldOnPrimary(
+            model_name='post',
+            name='author',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='posts', to=settings.AUTH_USER_MODEL),
+        ),
+        AlterFieldOnPrimary(
+            model_name='post',
+            name='group',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='posts', to='posts.Group'),
+        ),
+        migrations.RunPython(install_search_index, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,8 @@
-from django.db import models
+from django.db import models, router, transaction
 from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from .rows import format_pub_date
 
 User = get_user_model()
 
@@ -8,6 +11,8 @@ class Post(models.Model):
 
     text = models.TextField()
     pub_date = models.DateTimeField(auto_now_add=True)
+    # Ограничения внешних ключей есть только в основной базе: в шардах
+    # нет строк групп и пользователей (см. миграцию 0009).
     group = models.ForeignKey(
         'Group',
         blank=True, null=True,
@@ -23,8 +28,54 @@ class Post(models.Model):
     def __str__(self):
         return self.text[:15]
 
+    def get_absolute_url(self):
+        return reverse('posts:post_detail', kwargs={'post_id': self.pk})
+
+    @property
+    def pub_date_display(self):
+        return format_pub_date(self.pub_date)
+
+    def save(self, *args, **kwargs):
+        from .sharding import allocate_ids, is_sharded, shard_for
+
+        if self._state.adding and is_sharded():
+            # Новый пост всегда пишется в шард автора, даже если менеджер
+            # выбрал другую базу; id общий для всех шардов,
+            # см. posts/sharding.py.
+            kwargs['using'] = shard_for(self.author_id)
+            if self.pk is None:
+                self.pk = allocate_ids(1)[0]
+                kwargs['force_insert'] = True
+        using = kwargs.get('using') or router.db_for_write(
+            Post, instance=self
+        )
+        # Счётчики постов обновляются сигналами в той же транзакции.
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(
+            Post, instance=self
+        )
+        with transaction.atomic(using=using):
+            return super().delete(*args, **kwargs)
+
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['pub_date', 'id'],
+                name='post_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', 'pub_date', 'id'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', 'pub_date', 'id'],
+                name='post_group_pub_date_idx'
+            ),
+        ]
 
 
 class Group(models.Model):
@@ -32,6 +83,112 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.title
+
+    def get_absolute_url(self):
+        return reverse('posts:group_list', kwargs={'slug': self.slug})
+
+
+class AuthorStats(models.Model):
+    """Денормализованные счётчики автора."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='post_stats'
+    )
+    posts_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.user}: {self.posts_count}'
+
+
+class PostIdSequence(models.Model):
+    """Последний выданный id поста, общий для всех шардов."""
+
+    last_id = models.BigIntegerField(default=0)
+
+
+class Follow(models.Model):
+    """Подписка пользователя на автора."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follower'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='following'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique_follow'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user} -> {self.author}'
+
+
+class GroupFollow(models.Model):
+    """Подписка пользователя на группу."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='group_follows'
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        related_name='followers'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'group'], name='unique_group_follow'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user} -> {self.group}'
+
+
+class TimelineEntry(models.Model):
+    """Пост в домашней ленте подписчика, см. posts/timeline.py.
+
+    Ссылка на пост хранится числом: посты могут лежать в других шардах.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post_id = models.IntegerField()
+    pub_date = models.DateTimeField()
+    author_id = models.IntegerField()
+    group_id = models.IntegerField(null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post_id'], name='unique_timeline_post'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'pub_date', 'post_id'],
+                name='timeline_user_pub_date_idx'
+            ),
+            models.Index(fields=['post_id'], name='timeline_post_idx'),
+        ]
@@ -0,0 +1,205 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from core import caching
+from core.replicas import read_from_primary
+
+from . import sharding
+from .feeds import (GROUPS_FEED, INDEX_FEED, author_feed, get_versions,
+                    group_feed, post_feed)
+from .models import Group, Post, User
+
+PAGE_KEY = 'page:v3:{}'
+# Заголовки, которые хранятся в кеше вместе со страницей.
+CACHED_HEADERS = ('Content-Type', 'Surrogate-Key')
+MISSING_KEY = 'missing:{}:{}'
+LOOKUP_KEY = 'lookup:{}:{}'
+
+
+def is_anonymous_get(request):
+    """Анонимный GET-запрос: без сессионной куки, сессию не читаем."""
+    return (
+        request.method in ('GET', 'HEAD')
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+    )
+
+
+def missing_key(kind, value):
+    """Ключ, под которым запоминается отсутствие группы, автора или поста.
+
+    Slug и имя пользователя могут быть не ASCII, поэтому хешируются.
+    """
+    return MISSING_KEY.format(
+        kind, hashlib.md5(str(value).encode()).hexdigest()
+    )
+
+
+def lookup_key(kind, value):
+    """Ключ id группы по slug или автора по имени."""
+    return LOOKUP_KEY.format(
+        kind, hashlib.md5(str(value).encode()).hexdigest()
+    )
+
+
+def lookup_pk(kind, value, queryset):
+    """id объекта из общего кеша; ``queryset`` выбирает его при промахе."""
+    return caching.get_or_compute(
+        lookup_key(kind, value),
+        lambda: queryset.values_list('pk', flat=True).first(),
+        settings.LOOKUP_CACHE_TIMEOUT
+    )
+
+
+def index_feeds():
+    return [INDEX_FEED]
+
+
+def group_list_feeds(slug):
+    if caching.is_missing(missing_key('group', slug)):
+        return None
+    pk = lookup_pk('group', slug, Group.objects.filter(slug=slug))
+    return None if pk is None else [group_feed(pk)]
+
+
+def profile_feeds(username):
+    if caching.is_missing(missing_key('author', username)):
+        return None
+    pk = lookup_pk('author', username,
+                   User.objects.filter(username=username))
+    return None if pk is None else [author_feed(pk)]
+
+
+def post_author_id(post_id):
+    """id автора поста из общего кеша; автор поста не меняется."""
+    def author_id():
+        post = sharding.feed(Post.objects.filter(pk=post_id)).values(
+            'author_id'
+        ).first()
+        return None if post is None else post['author_id']
+
+    return caching.get_or_compute(
+        lookup_key('post', post_id), author_id, settings.LOOKUP_CACHE_TIMEOUT
+    )
+
+
+def post_detail_feeds(post_id):
+    if caching.is_missing(missing_key('post', post_id)):
+        return None
+    author_id = post_author_id(post_id)
+    if author_id is None:
+        return None
+    return [post_feed(post_id), author_feed(author_id), GROUPS_FEED]
+
+
+class FeedValidators:
+    """ETag и Last-Modified ответа, построенные по версиям его лент."""
+
+    def __init__(self, request, feeds):
+        versions = get_versions(feeds)
+        self.fingerprint = hashlib.md5(
+            f'{request.get_full_path()}|{sorted(versions.items())}'.encode()
+        ).hexdigest()
+        self.etag = f'"{self.fingerprint}"'
+        self.last_modified = max(versions.values()) // 1_000_000
+
+    def not_modified(self, request):
+        """Ответ 304 (или 412), если у клиента актуальная версия."""
+        return get_conditional_response(
+            request, etag=self.etag, last_modified=self.last_modified
+        )
+
+    def apply(self, response):
+        response['ETag'] = self.etag
+        response['Last-Modified'] = http_date(self.last_modified)
+        return response
+
+
+def conditional_on_feeds(get_feeds):
+    """Отвечает 304 на условные запросы, не вызывая представление.
+
+    id групп, авторов и авторов постов для лент берутся из общего кеша:
+    после первого запроса к объекту 304 обходится без запросов к базе.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            feeds = get_feeds(*args, **kwargs)
+            if request.method not in ('GET', 'HEAD') or feeds is None:
+                return view_func(request, *args, **kwargs)
+            validators = FeedValidators(request, feeds)
+            response = validators.not_modified(request)
+            if response is not None:
+                return response
+            response = view_func(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            return validators.apply(response)
+        return wrapper
+    return decorator
+
+
+def cache_entry(response):
+    """Содержимое и заголовки страницы для кеша; ``None`` - не кешировать."""
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return None
+    headers = {
+        name: response[name] for name in CACHED_HEADERS
+        if response.has_header(name)
+    }
+    return response.content, headers
+
+
+def cache_anonymous_page(get_feeds):
+    """Кеширует страницу целиком для анонимных посетителей.
+
+    ``get_feeds`` по аргументам представления возвращает ленты, от
+    которых зависит страница, или ``None``, если кешировать нечего.
+    ETag и Last-Modified вычисляются по версиям лент из кеша, поэтому
+    условный запрос получает 304 без отрисовки шаблонов и выборки постов,
+    а когда id объекта уже в кеше - без запросов к базе.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not is_anonymous_get(request):
+                return view_func(request, *args, **kwargs)
+            feeds = get_feeds(*args, **kwargs)
+            if feeds is None:
+                return view_func(request, *args, **kwargs)
+
+            validators = FeedValidators(request, feeds)
+            response = validators.not_modified(request)
+            if response is not None:
+                return response
+
+            rendered = []
+
+            def render_page():
+                with read_from_primary():
+                    response = view_func(request, *args, **kwargs)
+                rendered.append(response)
+                return cache_entry(response)
+
+            # Новая версия ленты - новый ключ: страницу отрисует один
+            # процесс, остальные дождутся её в кеше.
+            cached = caching.get_or_compute(
+                PAGE_KEY.format(validators.fingerprint), render_page,
+                settings.PAGE_CACHE_TIMEOUT, stale=settings.PAGE_CACHE_STALE
+            )
+            if rendered:
+                response = rendered[0]
+                if cached is None:
+                    return response
+            else:
+                content, headers = cached
+                response = HttpResponse(content)
+                for name, value in headers.items():
+                    response[name] = value
+            return validators.apply(response)
+        return wrapper
+    return decorator
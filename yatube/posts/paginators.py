@@ -0,0 +1,163 @@
+import base64
+import binascii
+import datetime
+
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from .feeds import get_count
+
+ELLIPSIS = '…'
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+def encode_cursor(pub_date, pk):
+    """Упаковывает ключ (pub_date, id) в непрозрачный токен для URL."""
+    raw = f'{pub_date.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковывает токен курсора обратно в (pub_date, id)."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        stamp, pk = raw.rsplit('|', 1)
+        return datetime.datetime.fromisoformat(stamp), int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise InvalidCursor('Некорректный курсор страницы')
+
+
+def row_key(row):
+    """Ключ (pub_date, id) для модели или словаря из ``values()``."""
+    if isinstance(row, dict):
+        return row['pub_date'], row['id']
+    return row.pub_date, row.pk
+
+
+def elided_page_range(paginator, number, on_each_side=3, on_ends=2):
+    """Номера страниц вокруг текущей и по краям, пропуски - ``ELLIPSIS``.
+
+    Повторяет ``Paginator.get_elided_page_range`` из новых версий Django.
+    """
+    num_pages = paginator.num_pages
+    if num_pages <= (on_each_side + on_ends) * 2:
+        yield from paginator.page_range
+        return
+    if number > 1 + on_each_side + on_ends + 1:
+        yield from range(1, on_ends + 1)
+        yield ELLIPSIS
+        yield from range(number - on_each_side, number + 1)
+    else:
+        yield from range(1, number + 1)
+    if number < num_pages - on_each_side - on_ends - 1:
+        yield from range(number + 1, number + on_each_side + 1)
+        yield ELLIPSIS
+        yield from range(num_pages - on_ends + 1, num_pages + 1)
+    else:
+        yield from range(number + 1, num_pages + 1)
+
+
+class CursorPage(Page):
+    """Страница ленты, ограниченная курсорами соседних страниц."""
+
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} objects>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return encode_cursor(*row_key(self.object_list[-1]))
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        return encode_cursor(*row_key(self.object_list[0]))
+
+
+class CursorPaginator(Paginator):
+    """Паджинатор с поиском по ключу (pub_date, id).
+
+    Страница выбирается условием по ключу последней показанной записи,
+    поэтому стоимость запроса не зависит от глубины страницы и не требует
+    COUNT(*). Избыточное условие по ``pub_date`` позволяет СУБД начать
+    чтение индекса сразу с нужной позиции. Обычный ``get_page`` по номеру
+    страницы продолжает работать.
+
+    Если передана лента ``feed``, число постов для номерной паджинации
+    берётся из кеша счётчиков лент, а не из COUNT(*) на каждый запрос.
+    ``count_source`` - queryset для подсчёта, когда ``object_list`` -
+    проекция ``values()`` с полями связанных таблиц: её COUNT(*)
+    соединял бы эти таблицы.
+    """
+
+    ordering = ('-pub_date', '-id')
+
+    def __init__(self, object_list, per_page, feed=None, count_source=None,
+                 **kwargs):
+        super().__init__(
+            object_list.order_by(*self.ordering), per_page, **kwargs
+        )
+        self.feed = feed
+        self.count_source = count_source
+
+    @cached_property
+    def count(self):
+        source = self.count_source
+        if source is None:
+            source = self.object_list
+        if self.feed is None:
+            return source.count()
+        return get_count(self.feed, source.count)
+
+    def get_elided_page_range(self, number=1, on_each_side=3, on_ends=2):
+        number = self.validate_number(number)
+        return elided_page_range(self, number, on_each_side, on_ends)
+
+    def cursor_page(self, after=None, before=None):
+        queryset = self.object_list
+        if before:
+            pub_date, pk = decode_cursor(before)
+            queryset = queryset.filter(
+                Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk),
+                pub_date__gte=pub_date
+            ).order_by('pub_date', 'id')
+        elif after:
+            pub_date, pk = decode_cursor(after)
+            queryset = queryset.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk),
+                pub_date__lte=pub_date
+            )
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if before:
+            if not has_more:
+                # Новее ничего не осталось - это первая страница ленты.
+                return self.cursor_page()
+            rows.reverse()
+            return CursorPage(rows, self, has_next=True, has_previous=True)
+        return CursorPage(
+            rows, self, has_next=has_more, has_previous=bool(after)
+        )
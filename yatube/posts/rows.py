@@ -0,0 +1,144 @@
+"""
+Лёгкие строки лент для отрисовки.
+
+Лентам нужны только текст, дата, имя автора и slug группы поста, а
+модели ``Post``, ``User`` и ``Group`` тянут все колонки (пароль, даты
+входа, описание группы) и несут ``_state`` и кеши связей. В режиме
+``FEED_PROJECTION`` лента выбирается через ``values()`` только с полями
+``FEED_FIELDS``, и каждая строка страницы превращается в объект со
+``__slots__``: адрес поста, адрес группы и дата публикации вычисляются
+один раз при построении страницы.
+
+Шаблоны обращаются к строкам так же, как к моделям:
+``post.get_absolute_url``, ``post.pub_date_display``,
+``post.author.get_full_name``, ``post.group.slug``.
+"""
+from django.urls import reverse
+from django.utils import formats
+from django.utils.timezone import template_localtime
+
+FEED_FIELDS = (
+    'id', 'text', 'pub_date',
+    'author_id', 'author__username', 'author__first_name',
+    'author__last_name',
+    'group_id', 'group__slug', 'group__title',
+)
+PUB_DATE_FORMAT = 'd E Y'
+
+# Подставляется в reverse() вместо параметра, чтобы получить шаблон адреса.
+_SENTINEL = '2147483647'
+
+
+def format_pub_date(value):
+    """Дата публикации так же, как её выводит фильтр ``date`` шаблона."""
+    return formats.date_format(template_localtime(value), PUB_DATE_FORMAT)
+
+
+def url_builder(name, kwarg):
+    """Функция, строящая адрес маршрута ``name`` без вызова ``reverse``
+    для каждой строки.
+    """
+    prefix, suffix = reverse(name, kwargs={kwarg: _SENTINEL}).split(
+        _SENTINEL
+    )
+    return lambda value: f'{prefix}{value}{suffix}'
+
+
+class AuthorRow:
+    __slots__ = ('pk', 'username', 'full_name')
+
+    def __init__(self, pk, username, first_name, last_name):
+        self.pk = pk
+        self.username = username
+        self.full_name = f'{first_name} {last_name}'.strip()
+
+    def __str__(self):
+        return self.username
+
+    def get_full_name(self):
+        return self.full_name
+
+
+class GroupRow:
+    __slots__ = ('pk', 'slug', 'title', 'url')
+
+    def __init__(self, pk, slug, title, url):
+        self.pk = pk
+        self.slug = slug
+        self.title = title
+        self.url = url
+
+    def __str__(self):
+        return self.title
+
+    def get_absolute_url(self):
+        return self.url
+
+
+class PostRow:
+    __slots__ = ('pk', 'text', 'pub_date', 'pub_date_display', 'author',
+                 'group', 'url')
+
+    def __init__(self, pk, text, pub_date, author, group, url):
+        self.pk = pk
+        self.text = text
+        self.pub_date = pub_date
+        self.pub_date_display = format_pub_date(pub_date)
+        self.author = author
+        self.group = group
+        self.url = url
+
+    def __repr__(self):
+        return f'<PostRow {self.pk}>'
+
+    def __eq__(self, other):
+        # Как у моделей: строки одного поста равны.
+        if not isinstance(other, PostRow):
+            return NotImplemented
+        return self.pk == other.pk
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __str__(self):
+        return self.text[:15]
+
+    @property
+    def id(self):
+        return self.pk
+
+    def get_absolute_url(self):
+        return self.url
+
+
+def build_rows(values):
+    """Строки ``PostRow`` из словарей ``values(*FEED_FIELDS)``.
+
+    Автор и группа, встречающиеся на странице несколько раз, создаются
+    один раз.
+    """
+    post_url = url_builder('posts:post_detail', 'post_id')
+    group_url = url_builder('posts:group_list', 'slug')
+    authors, groups = {}, {}
+    rows = []
+    for data in values:
+        author = authors.get(data['author_id'])
+        if author is None:
+            author = authors[data['author_id']] = AuthorRow(
+                data['author_id'], data['author__username'],
+                data['author__first_name'], data['author__last_name'],
+            )
+        group = None
+        if data['group_id'] is not None:
+            group = groups.get(data['group_id'])
+            if group is None:
+                slug = data['group__slug']
+                group = groups[data['group_id']] = GroupRow(
+                    data['group_id'], slug, data['group__title'],
+                    group_url(slug),
+                )
+        rows.append(PostRow(
+            data['id'], data['text'], data['pub_date'], author, group,
+            post_url(data['id']),
+        ))
+    return rows
@@ -0,0 +1,189 @@
+import heapq
+import re
+from itertools import islice
+
+from django.db import connection, connections
+from django.db.models import prefetch_related_objects
+from django.db.models.expressions import RawSQL
+
+from . import sharding
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+
+INSTALL_SQL = [
+    f'''CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        text,
+        content='posts_post',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )''',
+    f'''CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai
+        AFTER INSERT ON posts_post BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END''',
+    f'''CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad
+        AFTER DELETE ON posts_post BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+            VALUES ('delete', old.id, old.text);
+        END''',
+    f'''CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+        AFTER UPDATE OF text ON posts_post BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+            VALUES ('delete', old.id, old.text);
+            INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END''',
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+UNINSTALL_SQL = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+
+def install(schema_editor):
+    """Создаёт индекс FTS5 и триггеры синхронизации с таблицей постов.
+
+    SQLite при изменении полей Post пересоздаёт таблицу и теряет триггеры,
+    поэтому миграции, меняющие Post, должны вызывать эту функцию повторно.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in INSTALL_SQL:
+        schema_editor.execute(sql)
+
+
+def uninstall(schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in UNINSTALL_SQL:
+        schema_editor.execute(sql)
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def build_match(query):
+    """Превращает пользовательский запрос в безопасное выражение MATCH.
+
+    Все слова должны встретиться в тексте, последнее - как префикс.
+    """
+    words = re.findall(r'\w+', query)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+class MatchedIds(RawSQL):
+    """Подзапрос для ``pk__in``: скобки вокруг него ставит сам lookup.
+
+    ``RawSQL`` добавил бы вторые, и ``IN ((SELECT ...))`` сравнивал бы
+    только с первой найденной строкой.
+    """
+
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+def filter_posts(queryset, query):
+    """Оставляет в выборке только посты, найденные по индексу.
+
+    Условие - подзапрос к индексу той же базы, поэтому подходит и для
+    queryset шарда, и для ``sharding.feed``.
+    """
+    match = build_match(query)
+    if match is None:
+        return queryset.filter(pk__in=[])
+    if not is_available():
+        for word in re.findall(r'\w+', query):
+            queryset = queryset.filter(text__icontains=word)
+        return queryset
+    return queryset.filter(pk__in=MatchedIds(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        [match]
+    ))
+
+
+class SearchResults:
+    """Результаты поиска по релевантности для ``Paginator``.
+
+    Считает и нарезает совпадения прямо в индексе, а посты загружает
+    только для запрошенной страницы. У каждого шарда свой индекс: первые
+    совпадения шардов сливаются по ``rank``, и посты читаются из шарда,
+    который их нашёл.
+    """
+
+    def __init__(self, query):
+        self.match = build_match(query)
+        self.query = query
+
+    def count(self):
+        if self.match is None:
+            return 0
+        if not is_available():
+            return filter_posts(
+                sharding.feed(Post.objects.all()), self.query
+            ).count()
+        total = 0
+        for alias in sharding.get_shards():
+            with connections[alias].cursor() as cursor:
+                cursor.execute(
+                    f'SELECT COUNT(*) FROM {FTS_TABLE} '
+                    f'WHERE {FTS_TABLE} MATCH %s',
+                    [self.match]
+                )
+                total += cursor.fetchone()[0]
+        return total
+
+    def __len__(self):
+        return self.count()
+
+    def hits(self, alias, limit):
+        """Первые ``limit`` совпадений шарда: (rank, id, шард)."""
+        with connections[alias].cursor() as cursor:
+            cursor.execute(
+                f'SELECT rank, rowid FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s '
+                'ORDER BY rank LIMIT %s',
+                [self.match, limit]
+            )
+            return [(rank, pk, alias) for rank, pk in cursor.fetchall()]
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        if self.match is None:
+            return []
+        start = index.start or 0
+        if not is_available():
+            posts = sharding.feed(
+                Post.objects.select_related('author', 'group')
+                .order_by('-pub_date', '-id')
+            )
+            return list(filter_posts(posts, self.query)[start:index.stop])
+        merged = heapq.merge(*(
+            self.hits(alias, index.stop) for alias in sharding.get_shards()
+        ))
+        hits = list(islice(merged, start, index.stop))
+        found = {}
+        for alias in {alias for _, _, alias in hits}:
+            ids = [pk for _, pk, shard in hits if shard == alias]
+            posts = Post.objects.using(alias)
+            if not sharding.is_sharded():
+                posts = posts.select_related('author', 'group')
+            found.update(
+                ((alias, pk), post) for pk, post in posts.in_bulk(ids).items()
+            )
+        rows = [
+            found[alias, pk] for _, pk, alias in hits if (alias, pk) in found
+        ]
+        if sharding.is_sharded():
+            # Авторы и группы есть только в основной базе.
+            prefetch_related_objects(rows, 'author', 'group')
+        return rows
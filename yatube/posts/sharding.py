@@ -0,0 +1,248 @@
+"""
+Шардирование постов по автору.
+
+Посты автора хранятся в одной из баз ``POST_SHARDS``, выбранной
+рандеву-хешированием (HRW) по ``author_id``: при добавлении шарда
+переезжает лишь его доля авторов. Пользователи, группы и счётчики
+остаются в ``default``.
+
+Лента автора читается с одного шарда. Главная и ленты групп собираются
+слиянием уже упорядоченных по (pub_date, id) выборок всех шардов, каждая
+из которых ограничена размером страницы. Связанные автор и группа
+подгружаются из основной базы одним запросом на страницу, потому что
+в шардах их таблицы пусты.
+
+id постов выдаёт общий счётчик ``PostIdSequence`` в ``default``, поэтому
+они уникальны во всех шардах и не меняются при переезде.
+
+Пустой ``POST_SHARDS`` отключает шардирование: все функции возвращают
+исходные querysets.
+"""
+import hashlib
+import heapq
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import F, Max, prefetch_related_objects
+
+from core.replicas import get_read_alias
+
+from .models import Post, PostIdSequence, User
+from .paginators import row_key
+
+
+def is_sharded():
+    return bool(settings.POST_SHARDS)
+
+
+def get_shards():
+    return list(settings.POST_SHARDS) or [DEFAULT_DB_ALIAS]
+
+
+def shard_for(author_id, shards=None):
+    """База с постами автора: шард с наибольшим весом ``md5(шард:автор)``."""
+    shards = shards or get_shards()
+    if len(shards) == 1:
+        return shards[0]
+    return max(
+        shards,
+        key=lambda alias: hashlib.md5(f'{alias}:{author_id}'.encode()).digest()
+    )
+
+
+def allocate_ids(count):
+    """Резервирует ``count`` подряд идущих id постов."""
+    manager = PostIdSequence.objects.db_manager(DEFAULT_DB_ALIAS)
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        if not manager.filter(pk=1).update(last_id=F('last_id') + count):
+            # Первое выделение: продолжаем нумерацию уже существующих постов.
+            start = max(
+                Post.objects.using(alias).aggregate(last=Max('id'))['last']
+                or 0
+                for alias in get_shards()
+            )
+            try:
+                with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                    manager.create(pk=1, last_id=start + count)
+            except IntegrityError:
+                manager.filter(pk=1).update(last_id=F('last_id') + count)
+        last_id = manager.values_list('last_id', flat=True).get(pk=1)
+    return range(last_id - count + 1, last_id + 1)
+
+
+def related_lookups(queryset):
+    """Пути ``select_related`` queryset'а для ``prefetch_related``."""
+    def walk(tree, prefix=''):
+        for name, subtree in tree.items():
+            yield prefix + name
+            yield from walk(subtree, f'{prefix}{name}__')
+
+    select_related = queryset.query.select_related
+    if not isinstance(select_related, dict):
+        return ()
+    return tuple(
+        lookup for lookup in walk(select_related)
+        if not any(other.startswith(lookup + '__')
+                   for other in walk(select_related))
+    )
+
+
+class ShardedFeed:
+    """Посты нескольких шардов с интерфейсом, нужным паджинаторам.
+
+    Поддерживает ``filter``, ``order_by``, ``values``, ``count``,
+    ``get``, ``first`` и срезы. Срез ``[a:b]`` запрашивает у каждого шарда
+    первые ``b`` строк и сливает их (k-way merge) по ключу сортировки.
+    """
+
+    def __init__(self, queryset, shards, related=(), joined=None):
+        self.queryset = queryset
+        self.shards = shards
+        self.related = related
+        self.joined = joined or {}
+        self.model = queryset.model
+
+    def _clone(self, queryset, **kwargs):
+        options = {'related': self.related, 'joined': self.joined, **kwargs}
+        return ShardedFeed(queryset, self.shards, **options)
+
+    def filter(self, *args, **kwargs):
+        return self._clone(self.queryset.filter(*args, **kwargs))
+
+    def order_by(self, *fields):
+        return self._clone(self.queryset.order_by(*fields))
+
+    def values(self, *fields):
+        """Как ``values()``, но поля связей вида ``author__username``
+        подставляются запросом к основной базе.
+        """
+        local, joined = set(), {}
+        for field in fields:
+            relation, _, attr = field.partition('__')
+            if attr:
+                joined[field] = (relation, attr)
+                local.add(f'{relation}_id')
+            else:
+                local.add(field)
+        return self._clone(
+            self.queryset.values(*local), related=(), joined=joined
+        )
+
+    def count(self):
+        return sum(
+            self.queryset.using(alias).count() for alias in self.shards
+        )
+
+    def _attach(self, rows):
+        if self.related:
+            prefetch_related_objects(rows, *self.related)
+        # Одна выборка на связь, сколько бы её полей ни запросили.
+        relations = defaultdict(list)
+        for field, (relation, attr) in self.joined.items():
+            relations[relation].append((field, attr))
+        for relation, fields in relations.items():
+            model = self.model._meta.get_field(relation).related_model
+            ids = {row[f'{relation}_id'] for row in rows} - {None}
+            found = {
+                values[0]: values[1:]
+                for values in model._default_manager.filter(pk__in=ids)
+                .values_list('pk', *(attr for _, attr in fields))
+            }
+            missing = (None,) * len(fields)
+            for row in rows:
+                values = found.get(row[f'{relation}_id'], missing)
+                for (field, _), value in zip(fields, values):
+                    row[field] = value
+        return rows
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return self[key:key + 1][0]
+        start, stop = key.start or 0, key.stop
+        ordering = self.queryset.query.order_by
+        descending = bool(ordering) and ordering[0].startswith('-')
+        merged = heapq.merge(
+            *(self.queryset.using(alias)[:stop] for alias in self.shards),
+            key=row_key, reverse=descending
+        )
+        return self._attach(list(islice(merged, start, stop)))
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __len__(self):
+        return len(self[:])
+
+    def first(self):
+        for alias in self.shards:
+            row = self.queryset.using(alias).first()
+            if row is not None:
+                return self._attach([row])[0]
+        return None
+
+    def get(self, **kwargs):
+        row = self.filter(**kwargs).first()
+        if row is None:
+            raise self.model.DoesNotExist(
+                f'{self.model._meta.object_name} matching query does not '
+                f'exist.'
+            )
+        return row
+
+
+def feed(queryset, author_id=None):
+    """Queryset постов, учитывающий шардирование.
+
+    Для ленты автора читается только его шард, иначе - все шарды.
+    Без шардирования queryset возвращается как есть.
+    """
+    if not is_sharded():
+        return queryset
+    shards = get_shards() if author_id is None else [shard_for(author_id)]
+    return ShardedFeed(
+        queryset.select_related(None), shards, related_lookups(queryset)
+    )
+
+
+class ShardRouter:
+    """Направляет посты в шард автора, остальные модели - в основную базу.
+
+    Запросы к связанным с постом объектам (автору, группе) Django по
+    умолчанию отправил бы в базу поста; здесь они уходят в ``default``
+    или реплику, выбранную ``core.replicas``.
+    """
+
+    def _post_shard(self, hints):
+        instance = hints.get('instance')
+        if isinstance(instance, Post):
+            return instance._state.db or shard_for(instance.author_id)
+        if isinstance(instance, User):
+            return shard_for(instance.pk)
+        return None
+
+    def db_for_read(self, model, **hints):
+        if not is_sharded():
+            return None
+        if model is Post:
+            return self._post_shard(hints)
+        if isinstance(hints.get('instance'), Post):
+            return get_read_alias() or DEFAULT_DB_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        if not is_sharded():
+            return None
+        if model is Post:
+            return self._post_shard(hints)
+        if isinstance(hints.get('instance'), Post):
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if not is_sharded():
+            return None
+        if isinstance(obj1, Post) or isinstance(obj2, Post):
+            return True
+        return None
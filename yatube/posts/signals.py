@@ -0,0 +1,279 @@
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from core import caching
+from core.replicas import record_write
+from core.surrogate import request_purge
+
+from .counters import change_author_count, change_group_count
+from .feeds import (GROUPS_FEED, INDEX_FEED, author_feed, feeds_for_post,
+                    group_feed, touch)
+from .models import Group, Post, User
+from .page_cache import lookup_key, missing_key
+from .sharding import get_shards, is_sharded, shard_for
+from .surrogate_keys import author_key, group_key, post_purge_keys
+from .timeline import fan_out, retract
+
+
+@receiver(pre_save, sender=Post)
+def remember_old_group(sender, instance, raw, **kwargs):
+    """Запоминает группу поста до сохранения, чтобы перенести счётчик."""
+    instance._old_group_id = None
+    if raw or instance._state.adding:
+        return
+    instance._old_group_id = (
+        Post.objects.using(instance._state.db).filter(pk=instance.pk)
+        .values_list('group_id', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    if created:
+        change_author_count(instance.author_id, 1)
+        change_group_count(instance.group_id, 1)
+        return
+    if instance._old_group_id != instance.group_id:
+        change_group_count(instance._old_group_id, -1)
+        change_group_count(instance.group_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    change_author_count(instance.author_id, -1)
+    change_group_count(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_feeds(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    changed = feeds_for_post(
+        instance, getattr(instance, '_old_group_id', None)
+    )
+    touch(changed)
+    # Повторно после коммита: иначе параллельный запрос мог успеть
+    # закешировать ленту по старым данным под новой версией.
+    transaction.on_commit(lambda: touch(changed), using=instance._state.db)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw, **kwargs):
+    """Раскладывает новый пост по лентам подписчиков после коммита."""
+    if raw:
+        return
+    if created:
+        transaction.on_commit(
+            lambda: fan_out(instance), using=instance._state.db
+        )
+    elif instance._old_group_id != instance.group_id:
+        # Подписчики прежней группы поста больше не должны его видеть.
+        def refresh():
+            retract(instance.pk)
+            fan_out(instance)
+        transaction.on_commit(refresh, using=instance._state.db)
+
+
+@receiver(post_delete, sender=Post)
+def retract_post(sender, instance, **kwargs):
+    post_id = instance.pk
+    transaction.on_commit(
+        lambda: retract(post_id), using=instance._state.db
+    )
+
+
+@receiver(post_save, sender=Post)
+def purge_saved_post(sender, instance, created, raw, using, **kwargs):
+    """Очищает страницы поста в прокси; правка текста - только их."""
+    if raw:
+        return
+    request_purge(
+        post_purge_keys(instance, created, instance._old_group_id),
+        using=using
+    )
+
+
+@receiver(post_delete, sender=Post)
+def purge_deleted_post(sender, instance, using, **kwargs):
+    request_purge(post_purge_keys(instance, changed_feeds=True), using=using)
+
+
+def author_group_feeds(author_id):
+    """Ленты групп, в которых есть посты автора."""
+    group_ids = (
+        Post.objects.using(shard_for(author_id)).filter(author_id=author_id)
+        .values_list('group_id', flat=True).distinct()
+    )
+    return {group_feed(pk) for pk in group_ids if pk is not None}
+
+
+def group_author_feeds(group_id):
+    """Ленты авторов, у которых есть посты в группе."""
+    return {
+        author_feed(pk)
+        for alias in get_shards()
+        for pk in Post.objects.using(alias).filter(group_id=group_id)
+        .values_list('author_id', flat=True).distinct()
+    }
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_feeds(sender, instance, created, update_fields,
+                            raw=False, **kwargs):
+    """Имя автора выводится в лентах; вход на сайт их не меняет."""
+    if raw or set(update_fields or ()) == {'last_login'}:
+        return
+    if created:
+        touch({author_feed(instance.pk)})
+        return
+    touch({INDEX_FEED, author_feed(instance.pk)}
+          | author_group_feeds(instance.pk))
+
+
+@receiver(pre_delete, sender=Group)
+def remember_group_authors(sender, instance, **kwargs):
+    # После удаления посты уже отвязаны от группы.
+    instance._author_feeds = group_author_feeds(instance.pk)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_feeds(sender, instance, created=False, raw=False,
+                           **kwargs):
+    """Название группы выводится и в лентах авторов её постов."""
+    if raw:
+        return
+    if created:
+        touch({group_feed(instance.pk)})
+        return
+    author_feeds = getattr(instance, '_author_feeds', None)
+    if author_feeds is None:
+        author_feeds = group_author_feeds(instance.pk)
+    touch({INDEX_FEED, GROUPS_FEED, group_feed(instance.pk)} | author_feeds)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_save, sender=User)
+def forget_missing(sender, instance, raw, using, **kwargs):
+    """Страница появившегося объекта больше не отвечает 404 из кеша."""
+    if raw:
+        return
+    if sender is Post:
+        key = missing_key('post', instance.pk)
+    elif sender is Group:
+        key = missing_key('group', instance.slug)
+    else:
+        key = missing_key('author', instance.username)
+    caching.forget([key])
+    # До коммита другие запросы ещё не видят объект и могут снова
+    # запомнить его отсутствие.
+    transaction.on_commit(lambda: caching.forget([key]), using=using)
+
+
+@receiver(pre_save, sender=User)
+def remember_old_username(sender, instance, raw, update_fields, **kwargs):
+    instance._old_username = None
+    if (raw or instance._state.adding
+            or set(update_fields or ()) == {'last_login'}):
+        return
+    instance._old_username = (
+        User.objects.using(instance._state.db).filter(pk=instance.pk)
+        .values_list('username', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Post)
+def forget_lookups(sender, instance, raw=False, **kwargs):
+    """Сбрасывает id группы по slug, автора по имени и автора удалённого
+    поста в общем кеше.
+    """
+    if raw:
+        return
+    if sender is Post:
+        kind, names = 'post', (instance.pk,)
+    elif sender is Group:
+        kind, names = 'group', (instance.slug,
+                                getattr(instance, '_old_slug', None))
+    else:
+        kind, names = 'author', (instance.username,
+                                 getattr(instance, '_old_username', None))
+    caching.forget(
+        lookup_key(kind, name) for name in names if name is not None
+    )
+
+
+@receiver(pre_save, sender=Group)
+def remember_old_slug(sender, instance, raw, **kwargs):
+    instance._old_slug = None
+    if raw or instance._state.adding:
+        return
+    instance._old_slug = (
+        Group.objects.using(instance._state.db).filter(pk=instance.pk)
+        .values_list('slug', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def purge_group(sender, instance, using, created=False, raw=False,
+                **kwargs):
+    """Название группы выводится на страницах всех её постов."""
+    if raw or created:
+        return
+    slugs = {instance.slug, getattr(instance, '_old_slug', None)} - {None}
+    # Прежний slug уже очищен: при удалении группы он не нужен.
+    instance._old_slug = None
+    request_purge({group_key(slug) for slug in slugs}, using=using)
+
+
+@receiver(post_save, sender=User)
+def purge_author(sender, instance, created, raw, using, update_fields,
+                 **kwargs):
+    """Имя автора выводится на страницах всех его постов."""
+    if raw or created or set(update_fields or ()) == {'last_login'}:
+        return
+    usernames = {
+        instance.username, getattr(instance, '_old_username', None)
+    } - {None}
+    request_purge({author_key(name) for name in usernames}, using=using)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def mark_replication_write(sender, instance, using, raw=False, **kwargs):
+    """Отметка для проверки отставания реплик, читающих ленты."""
+    if not raw:
+        record_write(using)
+
+
+@receiver(pre_delete, sender=User)
+def delete_sharded_posts(sender, instance, using, **kwargs):
+    """Каскадное удаление Django видит только посты в базе пользователя."""
+    if not is_sharded():
+        return
+    for alias in get_shards():
+        if alias != using:
+            Post.objects.using(alias).filter(author_id=instance.pk).delete()
+
+
+@receiver(pre_delete, sender=Group)
+def detach_sharded_posts(sender, instance, using, **kwargs):
+    if not is_sharded():
+        return
+    for alias in get_shards():
+        if alias != using:
+            Post.objects.using(alias).filter(group_id=instance.pk).update(
+                group=None
+            )
@@ -0,0 +1,79 @@
+"""
+Суррогатные ключи страниц постов, см. core/surrogate.py.
+
+Страница ленты помечается ключом ленты и ключами всех показанных на ней
+постов, их авторов и групп; страница поста - ключами поста, автора и
+группы. Поэтому правка текста очищает только ключ поста, а новый или
+удалённый пост - ещё и ключи лент, в которых сдвинулись страницы.
+"""
+from urllib.parse import quote
+
+from .models import Group, User
+
+INDEX_KEY = 'feed-index'
+
+
+def post_key(post_id):
+    return f'post-{post_id}'
+
+
+def group_key(slug):
+    # Заголовок передаётся в latin-1, а ключи разделяются пробелами.
+    return f'group-{quote(slug)}'
+
+
+def author_key(username):
+    return f'author-{quote(username)}'
+
+
+def post_keys(post):
+    """Ключи поста для страницы, на которой он выводится."""
+    keys = {post_key(post.pk), author_key(post.author.username)}
+    if post.group is not None:
+        keys.add(group_key(post.group.slug))
+    return keys
+
+
+def page_keys(page_obj):
+    keys = set()
+    for post in page_obj:
+        keys |= post_keys(post)
+    return keys
+
+
+def feed_purge_keys(author_ids, group_ids):
+    """Ключи лент, в которых появились или пропали посты авторов и групп."""
+    keys = {INDEX_KEY}
+    keys.update(
+        author_key(username) for username in User.objects.filter(
+            pk__in=author_ids
+        ).values_list('username', flat=True)
+    )
+    keys.update(
+        group_key(slug) for slug in Group.objects.filter(
+            pk__in=group_ids
+        ).values_list('slug', flat=True)
+    )
+    return keys
+
+
+def post_purge_keys(post, changed_feeds=False, old_group_id=None):
+    """Ключи страниц, устаревших после изменения поста.
+
+    ``changed_feeds`` - пост создан или удалён, и страницы его лент
+    сдвинулись.
+    """
+    keys = {post_key(post.pk)}
+    if changed_feeds:
+        return keys | feed_purge_keys([post.author_id], [post.group_id])
+    group_ids = set()
+    if old_group_id != post.group_id:
+        group_ids.update((old_group_id, post.group_id))
+    group_ids.discard(None)
+    if group_ids:
+        keys.update(
+            group_key(slug) for slug in Group.objects.filter(
+                pk__in=group_ids
+            ).values_list('slug', flat=True)
+        )
+    return keys
@@ -0,0 +1,50 @@
+import time
+
+from django import template
+
+from posts import feeds
+
+register = template.Library()
+
+
+class FeedCacheNode(template.Node):
+
+    def __init__(self, nodelist, name, feed, page):
+        self.nodelist = nodelist
+        self.name = name
+        self.feed = feed
+        self.page = page
+
+    def render(self, context):
+        start = time.perf_counter()
+        key = feeds.fragment_key(
+            self.name.resolve(context),
+            self.feed.resolve(context),
+            self.page.resolve(context),
+        )
+        content = feeds.get_fragment(key)
+        hit = content is not None
+        if not hit:
+            content = self.nodelist.render(context)
+            feeds.set_fragment(key, content)
+        feeds.record(hit, time.perf_counter() - start)
+        return content
+
+
+@register.tag
+def feedcache(parser, token):
+    """Кеширует фрагмент ленты до изменения одного из её постов.
+
+    Использование::
+
+        {% feedcache 'index' feed page_obj %} ... {% endfeedcache %}
+    """
+    bits = token.split_contents()
+    if len(bits) != 4:
+        raise template.TemplateSyntaxError(
+            f'{bits[0]} принимает имя фрагмента, ленту и страницу'
+        )
+    nodelist = parser.parse(('endfeedcache',))
+    parser.delete_first_token()
+    name, feed, page = (parser.compile_filter(bit) for bit in bits[1:])
+    return FeedCacheNode(nodelist, name, feed, page)
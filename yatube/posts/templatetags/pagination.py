@@ -0,0 +1,20 @@
+from django import template
+
+from posts.paginators import ELLIPSIS, elided_page_range
+
+register = template.Library()
+
+
+@register.simple_tag
+def page_range(page_obj, on_each_side=3, on_ends=2):
+    """Номера страниц для навигации: окно вокруг текущей и края.
+
+    Пропущенные номера заменяются многоточием, поэтому навигация не
+    растёт вместе с числом страниц.
+    """
+    return [
+        {'number': number, 'gap': number == ELLIPSIS}
+        for number in elided_page_range(
+            page_obj.paginator, page_obj.number, on_each_side, on_ends
+        )
+    ]
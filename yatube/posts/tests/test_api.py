@@ -0,0 +1,127 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Group, Post
+
+
+User = get_user_model()
+
+
+class FeedApiTests(TestCase):
+    '''JSON API лент, поста и профиля.'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        Post.objects.bulk_create([
+            Post(author=cls.author, text=f'Пост №{i}',
+                 group=cls.group if i % 2 else None)
+            for i in range(15)
+        ])
+        cls.post = Post.objects.create(
+            author=cls.author, text='Последний пост', group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_index_cursor_pagination(self):
+        url = reverse('posts:api_index')
+        first = self.client.get(url, {'limit': 10}).json()
+        self.assertEqual(len(first['results']), 10)
+        self.assertIsNone(first['previous'])
+        self.assertEqual(first['results'][0]['text'], 'Последний пост')
+        self.assertEqual(first['results'][0]['author'], 'author')
+
+        second = self.client.get(first['next']).json()
+        self.assertEqual(len(second['results']), 6)
+        self.assertIsNone(second['next'])
+        ids = [row['id'] for row in first['results'] + second['results']]
+        self.assertEqual(len(set(ids)), 16)
+
+        back = self.client.get(second['previous']).json()
+        self.assertEqual(back['results'], first['results'])
+
+    def test_fields_selection(self):
+        response = self.client.get(
+            reverse('posts:api_group_posts', kwargs={'slug': 'test-slug'}),
+            {'fields': 'id,group'}
+        )
+        rows = response.json()['results']
+        self.assertEqual(len(rows), 8)
+        self.assertEqual(set(rows[0]), {'id', 'group'})
+        self.assertTrue(all(row['group'] == 'test-slug' for row in rows))
+
+    def test_unknown_field_is_400(self):
+        response = self.client.get(reverse('posts:api_index'),
+                                   {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['error'])
+
+    def test_profile_and_detail(self):
+        profile = self.client.get(
+            reverse('posts:api_profile', kwargs={'username': 'author'})
+        ).json()
+        self.assertEqual(profile['posts_count'], 1)
+        self.assertEqual(profile['last_name'], 'Толстой')
+        posts = self.client.get(
+            reverse('posts:api_profile_posts', kwargs={'username': 'author'})
+        ).json()
+        self.assertEqual(len(posts['results']), 10)
+
+        detail = self.client.get(
+            reverse('posts:api_post_detail',
+                    kwargs={'post_id': self.post.pk})
+        ).json()
+        self.assertEqual(detail['text'], 'Последний пост')
+        self.assertEqual(detail['group'], 'test-slug')
+
+    def test_missing_objects_are_404(self):
+        urls = [
+            reverse('posts:api_post_detail', kwargs={'post_id': 10 ** 6}),
+            reverse('posts:api_group_posts', kwargs={'slug': 'nope'}),
+            reverse('posts:api_profile', kwargs={'username': 'nobody'}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_conditional_get_needs_no_queries(self):
+        urls = [
+            reverse('posts:api_index'),
+            reverse('posts:api_group_posts', kwargs={'slug': 'test-slug'}),
+            reverse('posts:api_profile', kwargs={'username': 'author'}),
+            reverse('posts:api_profile_posts',
+                    kwargs={'username': 'author'}),
+            reverse('posts:api_post_detail',
+                    kwargs={'post_id': self.post.pk}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                with self.assertNumQueries(0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_conditional_get(self):
+        url = reverse('posts:api_index')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Post.objects.create(author=self.author, text='Новый пост')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['text'], 'Новый пост')
@@ -0,0 +1,204 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import feeds
+from ..models import Group, Post
+
+
+User = get_user_model()
+
+
+class FeedFragmentCacheTests(TestCase):
+    '''Кеширование ленты и её инвалидация при изменении постов.'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='first',
+            description='Тестовое описание'
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='second',
+            description='Тестовое описание'
+        )
+
+    def setUp(self):
+        cache.clear()
+        feeds.reset_stats()
+        # Анонимам страницы отдаются из кеша целиком, поэтому фрагменты
+        # проверяем на авторизованном клиенте.
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+        self.post = Post.objects.create(
+            author=self.author, text='Первый текст', group=self.group
+        )
+        self.other_post = Post.objects.create(
+            author=User.objects.create_user(username='other'),
+            text='Чужой пост',
+            group=self.other_group
+        )
+
+    def group_url(self, group):
+        return reverse('posts:group_list', kwargs={'slug': group.slug})
+
+    def test_second_render_is_a_hit(self):
+        self.authorized_client.get(reverse('posts:index'))
+        self.authorized_client.get(reverse('posts:index'))
+        stats = feeds.get_stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'], 1)
+
+    def test_edit_invalidates_only_related_feeds(self):
+        urls = [
+            reverse('posts:index'),
+            self.group_url(self.group),
+            self.group_url(self.other_group),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+        ]
+        for url in urls:
+            self.authorized_client.get(url)
+        feeds.reset_stats()
+
+        self.post.text = 'Новый текст'
+        self.post.save()
+        for url in urls:
+            response = self.authorized_client.get(url)
+            if url != self.group_url(self.other_group):
+                self.assertContains(response, 'Новый текст')
+        stats = feeds.get_stats()
+        self.assertEqual(stats['misses'], 3)
+        self.assertEqual(stats['hits'], 1)
+
+    def test_group_change_invalidates_old_group(self):
+        self.authorized_client.get(self.group_url(self.group))
+        self.post.group = self.other_group
+        self.post.save()
+        response = self.authorized_client.get(self.group_url(self.group))
+        self.assertNotContains(response, 'Первый текст')
+        response = self.authorized_client.get(
+            self.group_url(self.other_group)
+        )
+        self.assertContains(response, 'Первый текст')
+
+    def test_delete_invalidates_feed(self):
+        self.authorized_client.get(reverse('posts:index'))
+        self.post.delete()
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Первый текст')
+
+
+class AnonymousPageCacheTests(TestCase):
+    '''Кеш страниц целиком и условные запросы для анонимов.'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='first',
+            description='Тестовое описание'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.post = Post.objects.create(
+            author=self.author, text='Первый текст', group=self.group
+        )
+        self.urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ]
+
+    def test_repeated_request_skips_templates(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.guest_client.get(url)
+                second = self.guest_client.get(url)
+                self.assertIsNone(second.context)
+                self.assertEqual(first.content, second.content)
+                self.assertEqual(first['ETag'], second['ETag'])
+                self.assertIn('Last-Modified', second)
+
+    def test_if_none_match_returns_304(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+
+    def test_if_none_match_needs_no_queries(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                with self.assertNumQueries(0):
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(response.status_code, 304)
+
+    def test_deleted_post_lookup_forgotten(self):
+        url = self.urls[3]
+        etag = self.guest_client.get(url)['ETag']
+        self.post.delete()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 404)
+
+    def test_post_edit_changes_etag(self):
+        etags = {url: self.guest_client.get(url)['ETag'] for url in self.urls}
+        self.post.text = 'Новый текст'
+        self.post.save()
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, 'Новый текст')
+
+    def assert_etag_changed(self, url, etag, text=None):
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        if text is not None:
+            self.assertContains(response, text)
+
+    def test_author_change_invalidates_group_pages(self):
+        url = self.urls[1]
+        etag = self.guest_client.get(url)['ETag']
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = 'Лев'
+        author.last_name = 'Толстой'
+        author.save()
+        self.assert_etag_changed(url, etag, 'Лев Толстой')
+
+    def test_group_change_invalidates_author_pages(self):
+        url = self.urls[2]
+        etag = self.guest_client.get(url)['ETag']
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'renamed'
+        group.save()
+        self.assert_etag_changed(url, etag, '/group/renamed/')
+
+        etag = self.guest_client.get(url)['ETag']
+        group.delete()
+        self.assert_etag_changed(url, etag)
+
+    def test_logged_in_user_is_not_served_from_cache(self):
+        self.guest_client.get(self.urls[0])
+        self.guest_client.force_login(self.author)
+        response = self.guest_client.get(self.urls[0])
+        self.assertIsNotNone(response.context)
+        self.assertNotIn('ETag', response)
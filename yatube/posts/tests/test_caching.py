@@ -0,0 +1,190 @@
+import threading
+import time
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.http import Http404
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import caching
+
+from ..models import Group, Post
+from ..page_cache import missing_key
+
+
+User = get_user_model()
+
+
+class GetOrComputeTests(TestCase):
+    '''Кеш с защитой от лавины пересчётов.'''
+
+    def setUp(self):
+        cache.clear()
+        caching.reset_stats()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return self.calls
+
+    def test_value_computed_once(self):
+        for _ in range(3):
+            self.assertEqual(
+                caching.get_or_compute('key', self.compute, 60, beta=0), 1
+            )
+        stats = caching.get_stats()
+        self.assertEqual(stats['recomputes'], 1)
+        self.assertEqual(stats['hits'], 2)
+
+    def test_concurrent_misses_share_one_computation(self):
+        started = threading.Event()
+
+        def slow():
+            started.set()
+            time.sleep(0.3)
+            return self.compute()
+
+        results = []
+        owner = threading.Thread(
+            target=lambda: results.append(
+                caching.get_or_compute('key', slow, 60)
+            )
+        )
+        owner.start()
+        started.wait()
+        waiters = [
+            threading.Thread(target=lambda: results.append(
+                caching.get_or_compute('key', slow, 60)
+            ))
+            for _ in range(4)
+        ]
+        for thread in waiters:
+            thread.start()
+        for thread in [owner, *waiters]:
+            thread.join()
+        self.assertEqual(results, [1] * 5)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(caching.get_stats()['lock_waits'], 4)
+
+    def test_expired_value_served_stale_while_locked(self):
+        with mock.patch('core.caching.time.time', return_value=1000):
+            caching.get_or_compute('key', self.compute, 10, stale=60)
+        cache.add(caching.LOCK_KEY.format('key'), 'other', 10)
+        with mock.patch('core.caching.time.time', return_value=1020):
+            value = caching.get_or_compute('key', self.compute, 10, stale=60)
+        self.assertEqual(value, 1)
+        self.assertEqual(caching.get_stats()['stale_hits'], 1)
+
+        cache.delete(caching.LOCK_KEY.format('key'))
+        with mock.patch('core.caching.time.time', return_value=1020):
+            value = caching.get_or_compute('key', self.compute, 10, stale=60)
+        self.assertEqual(value, 2)
+
+    def test_early_refresh_before_expiry(self):
+        # Значение считалось 2 секунды и истекает в 1010.
+        cache.set('key', caching.Entry(0, 1010, 2.0), 60)
+        with mock.patch('core.caching.time.time', return_value=1005):
+            with mock.patch('core.caching.random.random', return_value=0):
+                self.assertEqual(
+                    caching.get_or_compute('key', self.compute, 10), 0
+                )
+            with mock.patch('core.caching.random.random', return_value=0.99):
+                self.assertEqual(
+                    caching.get_or_compute('key', self.compute, 10), 1
+                )
+        self.assertEqual(caching.get_stats()['early_refreshes'], 1)
+
+    def test_none_not_cached(self):
+        caching.get_or_compute('key', lambda: None, 60)
+        self.assertIsNone(cache.get('key'))
+
+    def test_negative_result_cached(self):
+        def missing():
+            self.calls += 1
+            raise Http404('Нет')
+
+        for _ in range(2):
+            with self.assertRaises(Http404):
+                caching.get_or_compute('key', missing, 60,
+                                       negative=(Http404,))
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(caching.get_stats()['negative_hits'], 1)
+
+    @override_settings(CACHING_STATS_FLUSH_INTERVAL=60)
+    def test_stats_flushed_in_batches(self):
+        for _ in range(3):
+            caching.get_or_compute('key', self.compute, 60, beta=0)
+        self.assertIsNone(cache.get(caching.STATS_KEY.format('hits')))
+        self.assertEqual(caching.get_stats()['hits'], 2)
+        self.assertEqual(cache.get(caching.STATS_KEY.format('hits')), 2)
+
+    def test_stats_command(self):
+        caching.get_or_compute('key', self.compute, 60)
+        out = StringIO()
+        call_command('cache_stats', '--reset', stdout=out)
+        self.assertIn('пересчётов: 1', out.getvalue())
+        self.assertEqual(caching.get_stats()['recomputes'], 0)
+
+
+@override_settings(CACHING_NEGATIVE_TIMEOUT=60)
+class NegativeLookupTests(TestCase):
+    '''404 групп, авторов и постов запоминаются до их появления.'''
+
+    def setUp(self):
+        cache.clear()
+
+    def assert_cached_404(self, url):
+        self.assertEqual(Client().get(url).status_code, 404)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(Client().get(url).status_code, 404)
+        self.assertEqual(len(queries), 0)
+
+    def test_missing_pages_cached(self):
+        self.assert_cached_404(
+            reverse('posts:group_list', kwargs={'slug': 'missing'})
+        )
+        self.assert_cached_404(
+            reverse('posts:profile', kwargs={'username': 'nobody'})
+        )
+        self.assert_cached_404(
+            reverse('posts:post_detail', kwargs={'post_id': 12345})
+        )
+
+    def test_created_objects_forget_404(self):
+        group_url = reverse('posts:group_list', kwargs={'slug': 'new'})
+        profile_url = reverse('posts:profile', kwargs={'username': 'new'})
+        self.assert_cached_404(group_url)
+        self.assert_cached_404(profile_url)
+
+        Group.objects.create(title='Новая', slug='new', description='')
+        author = User.objects.create_user(username='new')
+        self.assertEqual(Client().get(group_url).status_code, 200)
+        self.assertEqual(Client().get(profile_url).status_code, 200)
+
+        post_url = reverse('posts:post_detail',
+                           kwargs={'post_id': author.pk + 100})
+        self.assert_cached_404(post_url)
+        Post.objects.create(id=author.pk + 100, author=author, text='Пост')
+        self.assertEqual(Client().get(post_url).status_code, 200)
+
+
+class MissingOnCommitTests(TransactionTestCase):
+    '''Отсутствие объекта забывается и после коммита его создания.'''
+
+    def setUp(self):
+        cache.clear()
+
+    def test_404_remembered_before_commit_is_forgotten(self):
+        key = missing_key('group', 'new')
+        with transaction.atomic():
+            Group.objects.create(title='Новая', slug='new', description='')
+            # Запрос, не видящий незакоммиченную группу.
+            caching.remember_missing(key, Http404())
+        self.assertFalse(caching.is_missing(key))
@@ -0,0 +1,225 @@
+import datetime
+import html
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..counters import get_posts_count
+from ..loadtest import percentile
+from ..models import Group, Post
+from ..search import SearchResults
+from ..warmup import NEXT_LINK, reverse_urls
+
+
+User = get_user_model()
+
+
+class ImportPostsCommandTests(TestCase):
+    '''Пакетный импорт постов командой import_posts.'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+
+    def write_source(self, suffix, content):
+        handle, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(handle, 'w', encoding='utf-8') as source:
+            source.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def run_import(self, path, *args):
+        out, err = StringIO(), StringIO()
+        call_command('import_posts', path, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_import_jsonl(self):
+        rows = [
+            {'text': 'Старый пост', 'author': 'author', 'group': 'test-slug',
+             'pub_date': '2015-03-01T10:00:00'},
+            {'text': 'Без группы', 'author': 'author'},
+            {'text': 'Чужая группа', 'author': 'author', 'group': 'nope'},
+            {'text': 'Неизвестный автор', 'author': 'ghost'},
+            {'author': 'author'},
+        ]
+        path = self.write_source(
+            '.jsonl', '\n'.join(json.dumps(row) for row in rows) + '\nbad\n'
+        )
+        out, err = self.run_import(path, '--transaction-size', '2',
+                                   '--batch-size', '1')
+
+        self.assertIn('Импортировано постов: 3', out)
+        self.assertIn('пропущено: 3', out)
+        self.assertIn('неизвестного slug: 1', out)
+        self.assertIn('Строка 4 пропущена', err)
+        old = Post.objects.get(text='Старый пост')
+        self.assertEqual(
+            old.pub_date,
+            datetime.datetime(2015, 3, 1, 10, tzinfo=timezone.utc)
+        )
+        self.assertEqual(old.group, self.group)
+        self.assertEqual(get_posts_count(User.objects.get(username='author')),
+                         3)
+        self.assertEqual(Group.objects.get(pk=self.group.pk).posts_count, 1)
+        self.assertEqual(SearchResults('группы').count(), 1)
+        self.assertTrue(Post._meta.get_field('pub_date').auto_now_add)
+
+    def test_import_skips_non_objects(self):
+        path = self.write_source(
+            '.jsonl', '[1, 2]\n"текст"\n{"text": "Пост", "author": "author"}\n'
+        )
+        out, err = self.run_import(path)
+        self.assertIn('Импортировано постов: 1', out)
+        self.assertIn('пропущено: 2', out)
+        self.assertIn('Строка 2 пропущена: ожидался объект JSON', err)
+
+    def test_import_csv_creates_authors(self):
+        path = self.write_source(
+            '.csv', 'text,author,group\nПервый,newbie,test-slug\n'
+        )
+        out, _ = self.run_import(path, '--create-authors')
+        self.assertIn('Импортировано постов: 1', out)
+        newbie = User.objects.get(username='newbie')
+        self.assertFalse(newbie.has_usable_password())
+        self.assertEqual(newbie.posts.get().text, 'Первый')
+
+
+class ExportPostsCommandTests(TestCase):
+    '''Выгрузка постов командой export_posts.'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.bulk_create([
+            Post(author=cls.author, text=f'Пост №{i}') for i in range(5)
+        ])
+
+    def test_export_to_stdout(self):
+        out = StringIO()
+        call_command('export_posts', '--author', 'author', '--format',
+                     'jsonl', '--chunk-size', '2', stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([row['text'] for row in rows],
+                         [f'Пост №{i}' for i in range(5)])
+
+    def test_unknown_author(self):
+        with self.assertRaises(CommandError):
+            call_command('export_posts', '--author', 'ghost')
+
+
+class BenchCommandsTests(TestCase):
+    '''Генерация данных seed_bench и нагрузочный прогон loadtest.'''
+
+    def test_seed_bench_and_loadtest(self):
+        call_command('seed_bench', users=5, groups=2, posts=40, seed=1,
+                     stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(Group.objects.count(), 2)
+        self.assertEqual(Post.objects.count(), 40)
+        self.assertEqual(
+            sum(get_posts_count(user) for user in User.objects.all()), 40
+        )
+        self.assertEqual(
+            sum(Group.objects.values_list('posts_count', flat=True)),
+            Post.objects.filter(group__isnull=False).count()
+        )
+
+        out = StringIO()
+        call_command('loadtest', requests=30, seed=1, authenticated=0.3,
+                     json=True, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['total']['requests'], 30)
+        self.assertEqual(report['total']['errors'], 0)
+        for route in report['routes'].values():
+            self.assertLessEqual(route['p50_ms'], route['p99_ms'])
+
+    def test_bench_rows(self):
+        call_command('seed_bench', users=3, groups=2, posts=30, seed=1,
+                     stdout=StringIO(), stderr=StringIO())
+        out = StringIO()
+        call_command('bench_rows', pages=2, json=True, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['models']['rows'], 10)
+        self.assertEqual(report['rows']['rows'], 10)
+        self.assertLess(report['rows']['retained_kb'],
+                        report['models']['retained_kb'])
+
+    def test_percentile_nearest_rank(self):
+        self.assertEqual(percentile(list(range(1, 7)), 0.50), 3)
+        self.assertEqual(percentile(list(range(1, 101)), 0.95), 95)
+        self.assertEqual(percentile(list(range(1, 101)), 0.99), 99)
+        self.assertEqual(percentile([7], 0.99), 7)
+        self.assertEqual(percentile([], 0.5), 0)
+
+    def test_loadtest_unknown_route(self):
+        with self.assertRaises(CommandError):
+            call_command('loadtest', mix='posts:nope=1', stdout=StringIO())
+
+
+class WarmupCommandTests(TestCase):
+    '''Прогрев шаблонов, адресов и лент командой warmup.'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        for i in range(25):
+            Post.objects.create(author=cls.author, text=f'Пост {i}',
+                                group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_warmup_fills_page_cache(self):
+        out, err = StringIO(), StringIO()
+        call_command('warmup', stdout=out, stderr=err)
+        self.assertNotIn('Ошибка шаблона', err.getvalue())
+        self.assertNotIn('Не удалось прогреть', err.getvalue())
+        self.assertIn('Лент прогрето: 6', out.getvalue())
+
+        # Из кеша отдаётся готовая страница, а id ленты - из кеша
+        # поисков групп и авторов.
+        urls = {
+            reverse('posts:index'): 0,
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}): 0,
+            reverse('posts:profile', kwargs={'username': 'author'}): 0,
+        }
+        for url, queries in urls.items():
+            with self.subTest(url=url), self.assertNumQueries(queries):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+        # Следующие страницы главной прогреты по курсорным ссылкам.
+        url = reverse('posts:index')
+        for page in range(2, 4):
+            content = self.client.get(url).content.decode()
+            url = reverse('posts:index') + '?' + html.unescape(
+                NEXT_LINK.search(content).group(1)
+            )
+            with self.subTest(page=page), self.assertNumQueries(0):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_reverse_urls_covers_named_routes(self):
+        reversed_count, skipped = reverse_urls()
+        self.assertGreater(reversed_count, 0)
+        self.assertNotIn('posts:post_detail', skipped)
+        self.assertNotIn('users:password_reset_confirm', skipped)
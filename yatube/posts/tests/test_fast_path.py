@@ -0,0 +1,101 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Group, Post
+
+
+User = get_user_model()
+
+
+class AnonymousFastPathTests(TestCase):
+    '''Публичные страницы для анонимов без сессий и кук.'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        cls.post = Post.objects.create(author=cls.author, text='Пост',
+                                       group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+
+    def public_urls(self):
+        return [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:search') + '?q=Пост',
+            reverse('posts:api_index'),
+            reverse('about:author'),
+        ]
+
+    def assert_shareable(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.cookies)
+        self.assertNotIn('Cookie', response.get('Vary', ''))
+        cache_control = response['Cache-Control']
+        self.assertIn('public', cache_control)
+        self.assertIn('max-age=', cache_control)
+        self.assertIn('stale-while-revalidate=', cache_control)
+        self.assertEqual(response['X-Frame-Options'], 'SAMEORIGIN')
+
+    def test_public_pages_are_shareable(self):
+        for url in self.public_urls():
+            with self.subTest(url=url):
+                self.assert_shareable(Client().get(url))
+
+    def test_index_runs_only_feed_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = Client().get(reverse('posts:index'))
+        self.assert_shareable(response)
+        self.assertEqual(len(queries), 1, queries.captured_queries)
+        self.assertIn('posts_post', queries[0]['sql'])
+
+        with self.assertNumQueries(0):
+            self.assert_shareable(Client().get(reverse('posts:index')))
+
+    def test_no_session_or_user_queries(self):
+        for url in self.public_urls():
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    Client().get(url)
+                self.assertFalse([
+                    query for query in queries.captured_queries
+                    if 'django_session' in query['sql']
+                ])
+
+    def test_authenticated_pages_are_private(self):
+        client = Client()
+        client.force_login(self.author)
+        response = client.get(reverse('posts:index'))
+        self.assertIn('private', response['Cache-Control'])
+        self.assertContains(response, 'Новая запись')
+
+    def test_unsafe_methods_and_private_views_use_full_chain(self):
+        response = Client().get(reverse('users:login'))
+        self.assertNotIn('public', response.get('Cache-Control', ''))
+        self.assertIn(settings.CSRF_COOKIE_NAME, response.cookies)
+
+    def test_disallowed_host_uses_full_chain(self):
+        response = Client(HTTP_HOST='evil.example').get(
+            reverse('posts:index')
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('public', response.get('Cache-Control', ''))
+
+    @override_settings(ANONYMOUS_FAST_PATH=False)
+    def test_fast_path_can_be_disabled(self):
+        response = Client().get(reverse('posts:index'))
+        self.assertNotIn('Cache-Control', response)
@@ -1,8 +1,12 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
 
-from ..models import Group, Post
+from ..counters import get_posts_count
+from ..models import AuthorStats, Group, Post
 
 
 User = get_user_model()
@@ -35,3 +39,79 @@ class PostModelTest(TestCase):
             act, PostModelTest.group.title,
             'Метод __str__ модели Group работает неправильно'
         )
+
+
+class PostCountersTest(TestCase):
+    '''Счётчики постов автора и группы.'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='first',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='second',
+            description='Тестовое описание',
+        )
+
+    def assertCounters(self, author, group, other_group):
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual(get_posts_count(user), author)
+        self.assertEqual(
+            Group.objects.get(pk=self.group.pk).posts_count, group
+        )
+        self.assertEqual(
+            Group.objects.get(pk=self.other_group.pk).posts_count,
+            other_group
+        )
+
+    def test_user_without_posts(self):
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual(get_posts_count(user), 0)
+
+    def test_create_move_and_delete(self):
+        post = Post.objects.create(
+            author=self.user, text='Тестовый пост', group=self.group
+        )
+        Post.objects.create(author=self.user, text='Без группы')
+        self.assertCounters(2, 1, 0)
+
+        post.group = self.other_group
+        post.save()
+        self.assertCounters(2, 0, 1)
+
+        post.text = 'Изменённый текст'
+        post.save()
+        self.assertCounters(2, 0, 1)
+
+        post.delete()
+        self.assertCounters(1, 0, 0)
+
+        Post.objects.all().delete()
+        self.assertCounters(0, 0, 0)
+
+    def test_group_deletion_keeps_author_counter(self):
+        Post.objects.create(
+            author=self.user, text='Тестовый пост', group=self.group
+        )
+        Group.objects.filter(pk=self.group.pk).delete()
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual(get_posts_count(user), 1)
+        self.assertIsNone(Post.objects.get().group)
+
+    def test_recount_command_repairs_counters(self):
+        Post.objects.create(
+            author=self.user, text='Тестовый пост', group=self.group
+        )
+        AuthorStats.objects.filter(user=self.user).update(posts_count=10)
+        Group.objects.filter(pk=self.other_group.pk).update(posts_count=3)
+
+        out = StringIO()
+        call_command('recount_posts', stdout=out)
+        self.assertIn('авторов - 1, групп - 1', out.getvalue())
+        self.assertCounters(1, 1, 0)
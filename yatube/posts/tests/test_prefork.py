@@ -0,0 +1,52 @@
+import gc
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import (Client, SimpleTestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from yatube.prefork import memory_usage, preload
+
+from ..models import Post
+
+
+User = get_user_model()
+
+
+class PreforkTests(SimpleTestCase):
+    '''Предзагрузка перед fork и отчёт о памяти процессов.'''
+
+    def test_memory_usage(self):
+        usage = memory_usage(os.getpid())
+        self.assertGreater(usage['rss'], 0)
+        self.assertLessEqual(usage['shared'], usage['rss'])
+        self.assertEqual(usage['shared'] + usage['private'], usage['rss'])
+
+    @override_settings(PRELOAD_WARM_FEEDS=False)
+    def test_preload_freezes_heap(self):
+        self.addCleanup(gc.unfreeze)
+        handler = WSGIHandler()
+        self.assertIs(preload(handler), handler)
+        self.assertGreater(gc.get_freeze_count(), 0)
+
+
+class PreloadWarmupTests(TransactionTestCase):
+    '''Ленты прогреваются в мастере до запуска worker'ов.'''
+
+    # preload закрывает соединения с базой, что в TestCase прервало бы
+    # транзакцию теста.
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(gc.unfreeze)
+
+    def test_preload_warms_feeds(self):
+        author = User.objects.create_user(username='author')
+        Post.objects.create(author=author, text='Пост')
+        preload(WSGIHandler())
+        with self.assertNumQueries(0):
+            response = Client().get(reverse('posts:index'))
+        self.assertEqual(response.status_code, 200)
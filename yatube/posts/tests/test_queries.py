@@ -0,0 +1,137 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Group, Post
+
+
+User = get_user_model()
+
+
+class QueryBudgetMixin:
+    '''Проверка, что число запросов страницы не зависит от числа постов.
+
+    Класс-наследник задаёт ``budgets`` - словарь «адрес: число запросов»,
+    а посты добавляются методом ``seed_posts``.
+    '''
+
+    budgets = {}
+
+    def seed_posts(self, number):
+        authors = [
+            User.objects.create_user(username=f'seed-{number}-{i}',
+                                     first_name='Имя', last_name='Фамилия')
+            for i in range(3)
+        ]
+        Post.objects.bulk_create([
+            Post(text=f'Пост №{i}', author=authors[i % len(authors)],
+                 group=self.group if i % 2 else None)
+            for i in range(number)
+        ])
+        Post.objects.bulk_create([
+            Post(text=f'Пост автора №{i}', author=self.author,
+                 group=self.group)
+            for i in range(number)
+        ])
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertIn(response.status_code, (200, 302), url)
+        return len(queries)
+
+    def assertQueryBudgets(self):
+        self.seed_posts(2)
+        few = {url: self.count_queries(url) for url in self.budgets}
+        self.seed_posts(30)
+        for url, budget in self.budgets.items():
+            with self.subTest(url=url):
+                many = self.count_queries(url)
+                self.assertEqual(
+                    few[url], many,
+                    f'Число запросов {url} растёт вместе с числом постов'
+                )
+                self.assertLessEqual(many, budget)
+
+
+class ViewsQueryBudgetTests(QueryBudgetMixin, TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, text='Тестовый пост', group=cls.group
+        )
+
+    def urls(self):
+        """Адреса posts/urls.py и users/urls.py с бюджетами запросов.
+
+        Для каждого адреса указано число запросов анонима и автора.
+        Автору добавляются запросы сессии и пользователя; анониму
+        не нужны формы, закрытые авторизацией.
+        """
+        return {
+            reverse('posts:index'): (1, 3),
+            reverse('posts:group_list',
+                    kwargs={'slug': self.group.slug}): (3, 4),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}): (3, 4),
+            reverse('posts:post_detail',
+                    kwargs={'post_id': self.post.pk}): (2, 3),
+            reverse('posts:group_export',
+                    kwargs={'slug': self.group.slug}): (2, 4),
+            reverse('posts:profile_export',
+                    kwargs={'username': self.author.username}): (2, 4),
+            reverse('posts:search') + '?q=Пост': (3, 5),
+            reverse('posts:api_index'): (1, 3),
+            reverse('posts:api_group_posts',
+                    kwargs={'slug': self.group.slug}): (3, 5),
+            reverse('posts:api_profile',
+                    kwargs={'username': self.author.username}): (2, 4),
+            reverse('posts:api_profile_posts',
+                    kwargs={'username': self.author.username}): (3, 5),
+            reverse('posts:api_post_detail',
+                    kwargs={'post_id': self.post.pk}): (2, 4),
+            reverse('posts:post_create'): (0, 3),
+            reverse('posts:post_edit',
+                    kwargs={'post_id': self.post.pk}): (0, 4),
+            reverse('users:signup'): (0, 2),
+            reverse('users:login'): (0, 2),
+            reverse('users:password_change'): (0, 2),
+            reverse('users:password_change_done'): (0, 2),
+            reverse('users:password_reset'): (0, 2),
+            reverse('users:password_reset_done'): (0, 2),
+            reverse('users:password_reset_confirm',
+                    kwargs={'uidb64': 'MQ', 'token': 'set-password'}): (1, 3),
+            reverse('users:password_reset_complete'): (0, 2),
+            reverse('users:logout'): (0, None),
+        }
+
+    def test_guest_query_budgets(self):
+        self.client = Client()
+        self.budgets = {
+            url: guest for url, (guest, _) in self.urls().items()
+        }
+        self.assertQueryBudgets()
+
+    def test_author_query_budgets(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+        # Выход из аккаунта сбросил бы сессию для следующих адресов.
+        self.budgets = {
+            url: author for url, (_, author) in self.urls().items()
+            if author is not None
+        }
+        self.assertQueryBudgets()
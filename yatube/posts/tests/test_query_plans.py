@@ -0,0 +1,82 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Group, Post
+
+
+User = get_user_model()
+
+POSTS_NUMBER = 30
+
+
+class FeedQueryPlanTests(TestCase):
+    '''Запросы лент не должны читать таблицу целиком или сортировать её.'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='planner')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        Post.objects.bulk_create([
+            Post(text=f'Тестовый пост №{i}', author=cls.author,
+                 group=cls.group if i % 2 else None)
+            for i in range(POSTS_NUMBER)
+        ])
+        cls.post = Post.objects.first()
+        # ANALYZE здесь не запускаем: без статистики планировщик SQLite
+        # считает таблицы большими, как на боевой базе.
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def feed_urls(self):
+        feeds = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+        ]
+        urls = [reverse('posts:post_detail',
+                        kwargs={'post_id': self.post.id})]
+        for feed in feeds:
+            first_page = self.guest_client.get(feed).context['page_obj']
+            after = self.guest_client.get(
+                feed, {'after': first_page.next_cursor}
+            ).context['page_obj']
+            urls += [
+                feed,
+                f'{feed}?after={first_page.next_cursor}',
+                f'{feed}?before={after.previous_cursor}',
+                f'{feed}?page=2',
+            ]
+        return urls
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def test_feed_queries_use_indexes(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN QUERY PLAN есть только у SQLite')
+        for url in self.feed_urls():
+            with CaptureQueriesContext(connection) as queries:
+                self.guest_client.get(url)
+            for query in queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT'):
+                    continue
+                for step in self.explain(sql):
+                    with self.subTest(url=url, step=step):
+                        self.assertNotIn('TEMP B-TREE', step, sql)
+                        self.assertFalse(
+                            step.startswith('SCAN') and 'USING' not in step,
+                            f'Полный просмотр таблицы: {sql}'
+                        )
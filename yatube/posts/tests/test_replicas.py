@@ -0,0 +1,117 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import Client, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import caching, replicas
+from core.models import ReplicationHeartbeat
+
+from .. import feeds
+from ..models import Group, Post
+from ..page_cache import missing_key
+
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_MAX_LAG=5,
+                   REPLICA_LAG_CHECK_INTERVAL=0)
+class ReplicaRouterTests(TransactionTestCase):
+    '''Чтение лент с реплики и возврат на основную базу.'''
+
+    # Реплика в тестах - зеркало основной базы со своим соединением.
+    # TestCase держал бы данные в незакоммиченной транзакции основного
+    # соединения, поэтому здесь TransactionTestCase.
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        feeds.reset_stats()
+        self.author = User.objects.create_user(username='author')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        replicas._heartbeats.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.post = Post.objects.create(author=self.author, text='Пост',
+                                        group=self.group)
+
+    def get_with_queries(self, client, url):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = client.get(url)
+        return response, len(primary), len(replica)
+
+    def feed_urls(self):
+        return [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ]
+
+    def test_feeds_are_read_from_replica(self):
+        for url in self.feed_urls():
+            with self.subTest(url=url):
+                response, _, replica = self.get_with_queries(
+                    self.author_client, url
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertGreater(replica, 0)
+
+    def test_cached_pages_rendered_from_primary(self):
+        # Страница ушла бы в кеш под версией, которую создала запись,
+        # ещё не дошедшая до реплики.
+        for url in self.feed_urls():
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connections['replica']) as replica:
+                    response = Client().get(url)
+                self.assertEqual(response.status_code, 200)
+                tables = ' '.join(query['sql'] for query in replica)
+                self.assertNotIn('"posts_post"."text"', tables)
+
+    def test_fragments_from_replica_not_cached(self):
+        url = reverse('posts:index')
+        self.author_client.get(url)
+        self.author_client.get(url)
+        stats = feeds.get_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (0, 2))
+
+    def test_missing_on_replica_not_remembered(self):
+        url = reverse('posts:group_list', kwargs={'slug': 'new'})
+        response = self.author_client.get(url)
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(caching.is_missing(missing_key('group', 'new')))
+
+    def test_writes_record_heartbeat(self):
+        heartbeat = ReplicationHeartbeat.objects.get(pk=1)
+        self.assertAlmostEqual(heartbeat.updated.timestamp(), time.time(),
+                               delta=5)
+
+    def test_author_reads_primary_after_write(self):
+        response = self.author_client.post(
+            reverse('posts:post_create'), {'text': 'Новый пост'}
+        )
+        self.assertIn(replicas.settings.REPLICA_PIN_COOKIE, response.cookies)
+        for url in self.feed_urls():
+            with self.subTest(url=url):
+                _, _, replica = self.get_with_queries(self.author_client, url)
+                self.assertEqual(replica, 0)
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        cache.set(replicas.LAST_WRITE_KEY, time.time() + 60, None)
+        for url in self.feed_urls():
+            with self.subTest(url=url):
+                response, primary, replica = self.get_with_queries(
+                    Client(), url
+                )
+                self.assertEqual(response.status_code, 200)
+                # Только чтение отметки репликации.
+                self.assertEqual(replica, 1)
@@ -0,0 +1,69 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Post
+from ..search import SearchResults, build_match
+
+
+User = get_user_model()
+
+
+class PostSearchTests(TestCase):
+    '''Полнотекстовый поиск по постам.'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.tea = Post.objects.create(
+            author=cls.user, text='Рецепт чая с мятой'
+        )
+        cls.coffee = Post.objects.create(
+            author=cls.user, text='Кофе, кофе и ещё раз кофе без чая'
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.admin_client = Client()
+        self.admin_client.force_login(self.user)
+
+    def found(self, query):
+        return list(SearchResults(query)[0:10])
+
+    def test_build_match_escapes_syntax(self):
+        self.assertEqual(build_match('кофе OR "чай'), '"кофе" "OR" "чай"*')
+        self.assertIsNone(build_match('  *** '))
+
+    def test_search_ranks_results(self):
+        self.assertEqual(self.found('кофе'), [self.coffee])
+        self.assertEqual(set(self.found('чая')), {self.tea, self.coffee})
+        self.assertEqual(SearchResults('чая').count(), 2)
+        self.assertEqual(self.found('мят'), [self.tea])
+
+    def test_index_follows_edits_and_deletes(self):
+        post = Post.objects.create(author=self.user, text='Свежий пирог')
+        self.assertEqual(self.found('пирог'), [post])
+        post.text = 'Вчерашний хлеб'
+        post.save()
+        self.assertEqual(self.found('пирог'), [])
+        self.assertEqual(self.found('хлеб'), [post])
+        post.delete()
+        self.assertEqual(self.found('хлеб'), [])
+
+    def test_search_view(self):
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': 'мятой'}
+        )
+        self.assertTemplateUsed(response, 'posts/search.html')
+        self.assertEqual(list(response.context['page_obj']), [self.tea])
+
+    def test_admin_search_uses_index(self):
+        response = self.admin_client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'мятой'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.tea]
+        )
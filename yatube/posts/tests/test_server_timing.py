@@ -0,0 +1,65 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Post
+
+
+User = get_user_model()
+
+
+def parse_server_timing(header):
+    metrics = {}
+    for item in header.split(','):
+        name, *params = [part.strip() for part in item.split(';')]
+        metrics[name] = dict(param.split('=', 1) for param in params)
+    return metrics
+
+
+@override_settings(SERVER_TIMING_ENABLED=True)
+class ServerTimingTests(TestCase):
+    '''Замеры запроса в заголовке Server-Timing.'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.create(author=cls.author, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+
+    def test_header_contains_metrics(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(reverse('posts:index'))
+        metrics = parse_server_timing(response['Server-Timing'])
+        self.assertEqual(set(metrics), {'total', 'view', 'db', 'tpl'})
+        self.assertEqual(metrics['db']['desc'],
+                         f'"{len(queries)} queries"')
+        self.assertGreater(float(metrics['tpl']['dur']), 0)
+        self.assertLessEqual(float(metrics['tpl']['dur']),
+                             float(metrics['view']['dur']))
+        self.assertLessEqual(float(metrics['view']['dur']),
+                             float(metrics['total']['dur']))
+
+    @override_settings(SERVER_TIMING_LOG_SAMPLE_RATE=1.0)
+    def test_sampled_requests_are_logged(self):
+        with self.assertLogs('yatube.timing', 'INFO') as logs:
+            Client().get(reverse('posts:index'))
+        data = json.loads(logs.records[0].getMessage())
+        self.assertEqual(data['path'], reverse('posts:index'))
+        self.assertEqual(data['status'], 200)
+        self.assertEqual(data['view'], 'posts.views.index')
+        self.assertGreater(data['db_queries'], 0)
+
+    @override_settings(SERVER_TIMING_ENABLED=False)
+    def test_disabled_middleware_is_skipped(self):
+        response = Client().get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
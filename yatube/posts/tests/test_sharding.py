@@ -0,0 +1,212 @@
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..counters import get_posts_count
+from ..models import Group, Post
+from ..sharding import shard_for
+
+
+User = get_user_model()
+
+SHARDS = ['default', 'shard1']
+
+
+def create_author(shard, prefix):
+    """Создаёт автора, посты которого попадают в шард ``shard``."""
+    for i in range(100):
+        user = User.objects.create_user(username=f'{prefix}{i}')
+        if shard_for(user.pk, SHARDS) == shard:
+            return user
+        user.delete()
+    raise AssertionError(f'Не нашлось автора для шарда {shard}')
+
+
+@override_settings(POST_SHARDS=SHARDS)
+class ShardingTests(TestCase):
+    '''Посты распределены по шардам авторов.'''
+
+    databases = {'default', 'shard1'}
+
+    def setUp(self):
+        cache.clear()
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        self.local = create_author('default', 'local')
+        self.remote = create_author('shard1', 'remote')
+        self.posts = []
+        for i in range(6):
+            author = self.remote if i % 2 else self.local
+            self.posts.append(Post.objects.create(
+                author=author, text=f'Пост {i}', group=self.group
+            ))
+
+    def test_posts_stored_in_author_shard(self):
+        self.assertEqual(
+            set(Post.objects.using('shard1').values_list('author', flat=True)),
+            {self.remote.pk}
+        )
+        self.assertEqual(
+            set(Post.objects.using('default').values_list('author',
+                                                          flat=True)),
+            {self.local.pk}
+        )
+        ids = [post.pk for post in self.posts]
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertEqual(get_posts_count(
+            User.objects.get(pk=self.remote.pk)), 3)
+        self.assertEqual(Group.objects.get(pk=self.group.pk).posts_count, 6)
+
+    def test_index_merges_shards(self):
+        response = Client().get(reverse('posts:index'))
+        texts = [post.text for post in response.context['page_obj']]
+        self.assertEqual(texts, [f'Пост {i}' for i in reversed(range(6))])
+        self.assertEqual(
+            response.context['page_obj'][0].author.username,
+            self.remote.username
+        )
+
+        page = Client().get(
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            {'page': 1}
+        ).context['page_obj']
+        self.assertEqual(page.paginator.count, 6)
+
+    def test_index_cursor_pages(self):
+        url = reverse('posts:api_index')
+        first = Client().get(url, {'limit': 4}).json()
+        second = Client().get(first['next']).json()
+        self.assertEqual(
+            [row['text'] for row in first['results'] + second['results']],
+            [f'Пост {i}' for i in reversed(range(6))]
+        )
+        self.assertEqual(first['results'][0]['author'],
+                         self.remote.username)
+        self.assertEqual(first['results'][0]['group'], 'test-slug')
+
+    def test_profile_reads_one_shard(self):
+        url = reverse('posts:profile',
+                      kwargs={'username': self.remote.username})
+        with CaptureQueriesContext(connections['default']) as default, \
+                CaptureQueriesContext(connections['shard1']) as shard:
+            response = Client().get(url)
+        self.assertEqual(len(response.context['page_obj']), 3)
+        self.assertTrue(shard.captured_queries)
+        self.assertFalse([
+            query for query in default.captured_queries
+            if 'posts_post' in query['sql']
+        ])
+
+    def test_post_detail_and_edit_on_shard(self):
+        post = self.posts[1]
+        response = Client().get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+        self.assertEqual(response.context['post'], post)
+        self.assertEqual(response.context['posts_count'], 3)
+
+        client = Client()
+        client.force_login(self.remote)
+        client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+            {'text': 'Изменённый пост'}
+        )
+        self.assertEqual(
+            Post.objects.using('shard1').get(pk=post.pk).text,
+            'Изменённый пост'
+        )
+        self.assertEqual(Group.objects.get(pk=self.group.pk).posts_count, 5)
+
+    def test_exports_read_all_shards(self):
+        response = Client().get(
+            reverse('posts:group_export', kwargs={'slug': 'test-slug'}),
+            {'format': 'jsonl'}
+        )
+        rows = [json.loads(line) for line in
+                b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['text'] for row in rows],
+                         [f'Пост {i}' for i in range(6)])
+        self.assertEqual(rows[1]['author'], self.remote.username)
+        self.assertEqual(rows[1]['group'], 'test-slug')
+
+        out = StringIO()
+        call_command('export_posts', '--author', self.remote.username,
+                     '--format', 'jsonl', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 3)
+
+    def test_search_reads_every_shard(self):
+        response = Client().get(reverse('posts:search'), {'q': 'Пост 3'})
+        page = response.context['page_obj']
+        self.assertEqual([post.text for post in page], ['Пост 3'])
+        self.assertEqual(page[0].author.username, self.remote.username)
+
+        page = Client().get(
+            reverse('posts:search'), {'q': 'Пост'}
+        ).context['page_obj']
+        self.assertEqual(page.paginator.count, 6)
+        self.assertEqual(
+            {post.text for post in page}, {f'Пост {i}' for i in range(6)}
+        )
+
+    def test_admin_lists_selected_shard(self):
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        client = Client()
+        client.force_login(admin)
+        url = reverse('admin:posts_post_changelist')
+        response = client.get(url, {'shard': 'shard1', 'q': 'Пост'})
+        self.assertEqual(
+            {post.text for post in response.context['cl'].result_list},
+            {'Пост 1', 'Пост 3', 'Пост 5'}
+        )
+        response = client.get(
+            reverse('admin:posts_post_change', args=[self.posts[1].pk])
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['original'], self.posts[1])
+
+    def test_author_delete_removes_sharded_posts(self):
+        User.objects.get(pk=self.remote.pk).delete()
+        self.assertFalse(Post.objects.using('shard1').exists())
+
+
+class ReshardCommandTests(TestCase):
+    '''Перенос постов командой reshard.'''
+
+    databases = {'default', 'shard1'}
+
+    def test_reshard_moves_posts(self):
+        remote = create_author('shard1', 'remote')
+        local = create_author('default', 'local')
+        for author in (remote, local, remote):
+            Post.objects.create(author=author, text='Пост')
+
+        out = StringIO()
+        call_command('reshard', shards='default,shard1', dry_run=True,
+                     stdout=out)
+        self.assertIn('Нужно перенести default -> shard1: 2', out.getvalue())
+        self.assertEqual(Post.objects.using('shard1').count(), 0)
+
+        call_command('reshard', shards='default,shard1', stdout=StringIO())
+        self.assertEqual(
+            set(Post.objects.using('shard1').values_list('author',
+                                                         flat=True)),
+            {remote.pk}
+        )
+        self.assertEqual(Post.objects.using('default').count(), 1)
+        self.assertEqual(get_posts_count(User.objects.get(pk=remote.pk)), 2)
+
+        out = StringIO()
+        call_command('reshard', shards='default,shard1', stdout=out)
+        self.assertIn('Перенесено постов: 0', out.getvalue())
@@ -0,0 +1,192 @@
+import multiprocessing
+import os
+import tempfile
+import threading
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import Client, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.shared_cache import (HEADER_SIZE, SLOT, SharedMemory,
+                               SharedMemoryCache)
+
+from ..models import Group
+
+
+User = get_user_model()
+
+
+def make_cache(location='', **options):
+    return SharedMemoryCache(location, {'OPTIONS': {
+        'MAX_ENTRIES': 16, 'WAYS': 4, 'MAX_VALUE_SIZE': 1024, **options
+    }})
+
+
+def increment(location, times):
+    shared = make_cache(location)
+    for _ in range(times):
+        shared.incr('counter')
+
+
+class SharedMemoryCacheTests(SimpleTestCase):
+    '''Кеш в разделяемой памяти.'''
+
+    def setUp(self):
+        self.cache = make_cache()
+        self.cache.clear()
+
+    def test_basic_operations(self):
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+        self.assertFalse(self.cache.add('key', 2))
+        self.assertTrue(self.cache.add('other', 2))
+        self.assertEqual(self.cache.incr('other', 5), 7)
+        self.assertEqual(self.cache.decr('other'), 6)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+        self.cache.clear()
+        self.assertIsNone(self.cache.get('other'))
+
+    def test_expiry(self):
+        with mock.patch('core.shared_cache.time.time', return_value=1000), \
+                mock.patch('django.core.cache.backends.base.time.time',
+                           return_value=1000):
+            self.cache.set('key', 'value', 10)
+            self.cache.set('forever', 'value', None)
+        with mock.patch('core.shared_cache.time.time', return_value=1011):
+            self.assertIsNone(self.cache.get('key'))
+            self.assertEqual(self.cache.get('forever'), 'value')
+
+    def test_least_recently_used_evicted(self):
+        shared = make_cache(MAX_ENTRIES=2, WAYS=2)
+        shared.clear()
+        shared.set('a', 1)
+        shared.set('b', 2)
+        shared.get('a')
+        shared.set('c', 3)
+        self.assertEqual(shared.get('a'), 1)
+        self.assertIsNone(shared.get('b'))
+        self.assertEqual(shared.get('c'), 3)
+
+    def test_oversized_value_not_cached(self):
+        self.cache.set('key', 'short')
+        self.cache.set('key', 'x' * 2048)
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_forked_workers_share_memory(self):
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        workers = [
+            context.Process(target=increment, args=('', 200))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('counter'), 800)
+
+    def test_threads_wait_only_on_their_set(self):
+        memory = self.cache._memory
+
+        def first_slot(key):
+            return memory.locked_set(self.cache._digest(key, None))[0]
+
+        busy = first_slot('key')
+        other = next(
+            key for key in (f'key{i}' for i in range(100))
+            if first_slot(key) != busy
+        )
+        with memory.set_locks[busy // memory.ways]:
+            writer = threading.Thread(target=self.cache.set, args=(other, 1))
+            writer.start()
+            writer.join(5)
+            self.assertFalse(writer.is_alive())
+        self.assertEqual(self.cache.get(other), 1)
+
+    def test_file_shared_between_independent_openings(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'shared.cache')
+            first = SharedMemory(path, 16, 4, 1024)
+            second = SharedMemory(path, 16, 4, 1024)
+            with mock.patch('core.shared_cache.get_memory',
+                            side_effect=[first, second]):
+                writer, reader = make_cache(path), make_cache(path)
+            writer.set('key', 'value')
+            self.assertEqual(reader.get('key'), 'value')
+            # Другие настройки - файл пересоздаётся пустым.
+            SharedMemory(path, 32, 4, 1024)
+            self.assertEqual(os.path.getsize(path),
+                             HEADER_SIZE + 32 * (SLOT.size + 1024))
+
+    def test_unsafe_file_refused(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'private', 'shared.cache')
+            SharedMemory(path, 16, 4, 1024)
+            self.assertEqual(os.stat(os.path.dirname(path)).st_mode & 0o777,
+                             0o700)
+            os.chmod(path, 0o644)
+            with self.assertRaises(ImproperlyConfigured):
+                SharedMemory(path, 16, 4, 1024)
+
+            os.remove(path)
+            target = os.path.join(directory, 'target')
+            open(target, 'w').close()
+            os.symlink(target, path)
+            with self.assertRaises(ImproperlyConfigured):
+                SharedMemory(path, 16, 4, 1024)
+
+            shared = os.path.join(directory, 'shared')
+            os.mkdir(shared, 0o700)
+            os.chmod(shared, 0o777)
+            with self.assertRaises(ImproperlyConfigured):
+                SharedMemory(os.path.join(shared, 'shared.cache'),
+                             16, 4, 1024)
+
+
+class LookupCacheTests(TestCase):
+    '''id групп и авторов берутся из общего кеша.'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_pages_need_no_queries(self):
+        urls = [
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+        ]
+        for url in urls:
+            Client().get(url)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(Client().get(url).status_code, 200)
+            self.assertEqual(len(queries), 0, url)
+
+    def test_renamed_group_and_author_forgotten(self):
+        Client().get(reverse('posts:group_list', kwargs={'slug': 'test-slug'}))
+        Client().get(reverse('posts:profile', kwargs={'username': 'author'}))
+        self.group.slug = 'renamed'
+        self.group.save()
+        self.author.username = 'renamed'
+        self.author.save()
+        for url in (
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+        ):
+            self.assertEqual(Client().get(url).status_code, 404)
@@ -0,0 +1,63 @@
+import os
+import tempfile
+
+from django.db import OperationalError, connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from core.sqlite import serialized_writes, write_queue
+
+
+@override_settings(SQLITE_PRODUCTION_MODE=True)
+class SqliteProductionModeTests(TestCase):
+    '''Прагмы соединения и очередь записи боевого режима SQLite.'''
+
+    def test_pragmas_applied_to_new_connections(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        wrapper = DatabaseWrapper(
+            {**connection.settings_dict,
+             'NAME': os.path.join(directory.name, 'db.sqlite3')},
+            alias='pragmas'
+        )
+        self.addCleanup(wrapper.close)
+        with wrapper.cursor() as cursor:
+            pragmas = {}
+            for name in ('journal_mode', 'synchronous', 'busy_timeout'):
+                cursor.execute(f'PRAGMA {name}')
+                pragmas[name] = cursor.fetchone()[0]
+        self.assertEqual(pragmas, {
+            'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 5000
+        })
+
+    def test_locked_write_is_retried(self):
+        calls = []
+
+        @serialized_writes
+        def view(request):
+            calls.append(request)
+            if len(calls) == 1:
+                raise OperationalError('database is locked')
+            return HttpResponse('ok')
+
+        response = view(RequestFactory().post('/'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(calls), 2)
+
+    def test_other_errors_are_not_retried(self):
+        @serialized_writes
+        def view(request):
+            raise OperationalError('no such table: posts_post')
+
+        with self.assertRaises(OperationalError):
+            view(RequestFactory().post('/'))
+
+    @override_settings(SQLITE_WRITE_QUEUE_TIMEOUT=0.01)
+    def test_busy_queue_returns_503(self):
+        view = serialized_writes(lambda request: HttpResponse('ok'))
+        with write_queue.slot(timeout=1):
+            response = view(RequestFactory().post('/'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(view(RequestFactory().post('/')).status_code, 200)
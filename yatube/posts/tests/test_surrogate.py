@@ -0,0 +1,219 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from core.models import Task
+from core.tasks import run_pending
+
+from ..bulk import PostImporter
+from ..models import Group, Post
+
+
+User = get_user_model()
+
+
+class PurgeHandler(BaseHTTPRequestHandler):
+    """Заглушка API очистки прокси: запоминает тела запросов."""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.requests.append(
+            (self.headers['Fastly-Key'], json.loads(body))
+        )
+        self.send_response(self.server.status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class SurrogateKeyHeaderTests(TestCase):
+    '''Заголовок Surrogate-Key страниц лент и поста.'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        cls.post = Post.objects.create(author=cls.author, text='Пост',
+                                       group=cls.group)
+        cls.other = Post.objects.create(author=cls.author, text='Без группы')
+
+    def setUp(self):
+        cache.clear()
+
+    def keys(self, url):
+        response = Client().get(url)
+        self.assertEqual(response.status_code, 200)
+        return response['Surrogate-Key'].split()
+
+    def test_pages_tagged(self):
+        post_keys = [f'post-{self.post.pk}', f'post-{self.other.pk}']
+        pages = {
+            reverse('posts:index'): [
+                'feed-index', 'author-author', 'group-test-slug', *post_keys
+            ],
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}): [
+                'group-test-slug', 'author-author', f'post-{self.post.pk}'
+            ],
+            reverse('posts:profile', kwargs={'username': 'author'}): [
+                'author-author', 'group-test-slug', *post_keys
+            ],
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}): [
+                f'post-{self.post.pk}', 'author-author', 'group-test-slug'
+            ],
+        }
+        for url, expected in pages.items():
+            with self.subTest(url=url):
+                self.assertEqual(self.keys(url), sorted(expected))
+
+    def test_non_ascii_username_quoted(self):
+        User.objects.create_user(username='Вася')
+        url = reverse('posts:profile', kwargs={'username': 'Вася'})
+        self.assertEqual(self.keys(url), ['author-%D0%92%D0%B0%D1%81%D1%8F'])
+
+    def test_cached_page_keeps_keys(self):
+        url = reverse('posts:index')
+        first = self.keys(url)
+        self.assertEqual(self.keys(url), first)
+
+
+@override_settings(SURROGATE_PURGE_BATCH_SIZE=3,
+                   SURROGATE_PURGE_HEADERS={'Fastly-Key': 'secret'})
+class SurrogatePurgeTests(TransactionTestCase):
+    '''Пакетная очистка прокси при изменении постов и групп.'''
+
+    # Очистка ставится в очередь в transaction.on_commit, который
+    # в TestCase не выполняется.
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), PurgeHandler)
+        self.server.requests = []
+        self.server.status = 200
+        thread = threading.Thread(target=self.server.serve_forever,
+                                  daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        url = f'http://127.0.0.1:{self.server.server_port}/purge'
+        settings = override_settings(SURROGATE_PURGE_URL=url)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.author = User.objects.create_user(username='author')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+
+    def purged(self):
+        """Ключи каждого запроса очистки в порядке отправки."""
+        return [body['surrogate_keys'] for _, body in self.server.requests]
+
+    def test_changes_coalesced_into_batches(self):
+        first = Post.objects.create(author=self.author, text='Первый',
+                                    group=self.group)
+        second = Post.objects.create(author=self.author, text='Второй')
+        first.text = 'Правка'
+        first.save()
+        self.assertEqual(Task.objects.filter(queue='purge').count(), 3)
+
+        run_pending(threads=1)
+        batches = self.purged()
+        self.assertEqual([len(batch) for batch in batches], [3, 2])
+        keys = [key for batch in batches for key in batch]
+        self.assertEqual(keys, sorted({
+            'feed-index', 'author-author', 'group-test-slug',
+            f'post-{first.pk}', f'post-{second.pk}',
+        }))
+        self.assertEqual(
+            {header for header, _ in self.server.requests}, {'secret'}
+        )
+        self.assertFalse(Task.objects.exists())
+
+    def test_edit_purges_only_post(self):
+        post = Post.objects.create(author=self.author, text='Пост')
+        run_pending(threads=1)
+        self.server.requests.clear()
+
+        post.text = 'Правка'
+        post.save()
+        run_pending(threads=1)
+        self.assertEqual(self.purged(), [[f'post-{post.pk}']])
+
+    def test_group_change_purges_both_groups(self):
+        other = Group.objects.create(title='Другая', slug='other',
+                                     description='Описание')
+        post = Post.objects.create(author=self.author, text='Пост',
+                                   group=self.group)
+        run_pending(threads=1)
+        self.server.requests.clear()
+
+        post.group = other
+        post.save()
+        run_pending(threads=1)
+        self.assertEqual(self.purged(), [
+            ['group-other', 'group-test-slug', f'post-{post.pk}']
+        ])
+
+    def test_group_rename_and_delete(self):
+        self.group.slug = 'renamed'
+        self.group.save()
+        run_pending(threads=1)
+        self.assertEqual(self.purged(), [['group-renamed', 'group-test-slug']])
+
+        self.server.requests.clear()
+        self.group.delete()
+        run_pending(threads=1)
+        self.assertEqual(self.purged(), [['group-renamed']])
+
+    def test_author_rename(self):
+        self.author.username = 'renamed'
+        self.author.save()
+        run_pending(threads=1)
+        self.assertEqual(self.purged(),
+                         [['author-author', 'author-renamed']])
+
+        self.server.requests.clear()
+        self.author.save(update_fields=['last_login'])
+        run_pending(threads=1)
+        self.assertEqual(self.purged(), [])
+
+    def test_bulk_import_purges_feeds(self):
+        other = User.objects.create_user(username='other')
+        with PostImporter() as importer:
+            importer.add(self.author.pk, 'Первый', self.group.pk)
+            importer.add(other.pk, 'Второй')
+        self.assertEqual(Task.objects.filter(queue='purge').count(), 1)
+
+        run_pending(threads=1)
+        keys = [key for batch in self.purged() for key in batch]
+        self.assertEqual(keys, [
+            'author-author', 'author-other', 'feed-index', 'group-test-slug'
+        ])
+
+    def test_failed_purge_is_retried(self):
+        self.server.status = 503
+        post = Post.objects.create(author=self.author, text='Пост')
+        run_pending(threads=1)
+        task = Task.objects.get(queue='purge')
+        self.assertEqual(task.attempts, 1)
+        self.assertEqual(task.status, Task.PENDING)
+        self.assertIn(f'post-{post.pk}', task.payload)
+
+    @override_settings(SURROGATE_PURGE_URL='')
+    def test_disabled_without_url(self):
+        Post.objects.create(author=self.author, text='Пост')
+        self.assertFalse(Task.objects.exists())
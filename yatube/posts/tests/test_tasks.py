@@ -0,0 +1,184 @@
+import datetime
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Task
+from core.tasks import claim, finish, run_pending, task
+
+
+User = get_user_model()
+
+calls = []
+batches = []
+failing = set()
+
+
+@task
+def remember(value):
+    calls.append(value)
+
+
+@task
+def broken():
+    raise RuntimeError('сбой')
+
+
+class BatchRecordingBackend(EmailBackend):
+    """Запоминает, сколько писем отправлено через каждое соединение.
+
+    Письма адресатам из ``failing`` не отправляются.
+    """
+
+    def open(self):
+        batches.append(0)
+        return super().open()
+
+    def send_messages(self, messages):
+        for message in messages:
+            if failing & set(message.recipients()):
+                raise ConnectionError('адресат недоступен')
+        batches[-1] += len(messages)
+        return super().send_messages(messages)
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+    QUEUED_EMAIL_BACKEND='posts.tests.test_tasks.BatchRecordingBackend',
+    TASKS_MAX_ATTEMPTS=2,
+)
+class TaskQueueTests(TestCase):
+    '''Очередь фоновых задач и отложенная отправка почты.'''
+
+    def setUp(self):
+        calls.clear()
+        batches.clear()
+        failing.clear()
+
+    def test_password_reset_mail_is_queued(self):
+        User.objects.create_user(username='user', email='user@example.com',
+                                 password='password')
+        response = Client().post(reverse('users:password_reset'),
+                                 {'email': 'user@example.com'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(mail.outbox, [])
+        self.assertTrue(Task.objects.filter(queue='email').exists())
+
+        self.assertEqual(run_pending(threads=1), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['user@example.com'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_messages_sent_in_one_batch(self):
+        for i in range(3):
+            mail.send_mail(f'Тема {i}', 'Текст', 'from@example.com',
+                           [f'to{i}@example.com'])
+        self.assertEqual(Task.objects.count(), 3)
+        run_pending(threads=2)
+        self.assertEqual(batches, [3])
+        self.assertEqual(
+            sorted(message.subject for message in mail.outbox),
+            ['Тема 0', 'Тема 1', 'Тема 2']
+        )
+
+    def test_only_unsent_messages_retried(self):
+        mail.send_mass_mail([
+            (f'Тема {i}', 'Текст', 'from@example.com', [f'to{i}@example.com'])
+            for i in range(3)
+        ])
+        mail.send_mail('Отдельно', 'Текст', 'from@example.com',
+                       ['single@example.com'])
+        failing.add('to1@example.com')
+        run_pending(threads=1)
+        self.assertEqual(
+            sorted(message.subject for message in mail.outbox),
+            ['Отдельно', 'Тема 0', 'Тема 2']
+        )
+        item = Task.objects.get()
+        self.assertEqual(item.attempts, 1)
+        self.assertIn('адресат недоступен', item.last_error)
+        self.assertEqual(
+            [data['to'] for data in json.loads(item.payload)['messages']],
+            [['to1@example.com']]
+        )
+
+        failing.clear()
+        Task.objects.update(run_at=timezone.now())
+        run_pending(threads=1)
+        self.assertEqual(
+            sorted(message.subject for message in mail.outbox),
+            ['Отдельно', 'Тема 0', 'Тема 1', 'Тема 2']
+        )
+        self.assertFalse(Task.objects.exists())
+
+    def test_attachments_and_alternatives_survive_queue(self):
+        message = mail.EmailMultiAlternatives(
+            'Тема', 'Текст', 'from@example.com', ['to@example.com']
+        )
+        message.attach_alternative('<p>Текст</p>', 'text/html')
+        message.attach('data.bin', b'\x00\xff', 'application/octet-stream')
+        message.send()
+        run_pending(threads=1)
+        sent = mail.outbox[0]
+        self.assertEqual(sent.alternatives, [('<p>Текст</p>', 'text/html')])
+        self.assertEqual(sent.attachments[0][1], b'\x00\xff')
+
+    def test_failed_task_retried_then_marked_failed(self):
+        broken.delay()
+        run_pending(threads=1)
+        item = Task.objects.get()
+        self.assertEqual(item.status, Task.PENDING)
+        self.assertEqual(item.attempts, 1)
+        self.assertIn('сбой', item.last_error)
+        self.assertGreater(item.run_at, timezone.now())
+        self.assertEqual(run_pending(threads=1), 0)
+
+        Task.objects.update(run_at=timezone.now())
+        with self.assertLogs('yatube.tasks', 'ERROR'):
+            run_pending(threads=1)
+        self.assertEqual(Task.objects.get().status, Task.FAILED)
+        self.assertEqual(run_pending(threads=1), 0)
+
+    def test_expired_lease_is_reclaimed(self):
+        remember.delay(value=1)
+        Task.objects.update(
+            status=Task.RUNNING, lock_token='lost',
+            locked_until=timezone.now() - datetime.timedelta(seconds=1)
+        )
+        run_pending(threads=1)
+        self.assertEqual(calls, [1])
+
+    def test_lost_lease_left_to_new_owner(self):
+        remember.delay(value=1)
+        tasks = claim()
+        # Срок захвата истёк, и задачу забрал другой worker.
+        Task.objects.update(lock_token='other')
+        with self.assertLogs('yatube.tasks', 'WARNING'):
+            finish(tasks)
+        with self.assertLogs('yatube.tasks', 'WARNING'):
+            finish(tasks, RuntimeError('сбой'))
+        item = Task.objects.get()
+        self.assertEqual(item.lock_token, 'other')
+        self.assertEqual(item.status, Task.RUNNING)
+        self.assertEqual(item.attempts, 0)
+
+    def test_delayed_task_waits(self):
+        remember.delay(
+            run_at=timezone.now() + datetime.timedelta(hours=1), value=1
+        )
+        self.assertEqual(run_pending(threads=1), 0)
+
+    def test_run_tasks_command(self):
+        for value in range(3):
+            remember.delay(value=value)
+        out = StringIO()
+        call_command('run_tasks', once=True, threads=2, stdout=out)
+        self.assertEqual(sorted(calls), [0, 1, 2])
+        self.assertIn('Всего задач: 3', out.getvalue())
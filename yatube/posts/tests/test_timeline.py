@@ -0,0 +1,158 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from ..bulk import PostImporter
+from ..models import Follow, Group, GroupFollow, Post, TimelineEntry
+from ..timeline import HomeTimeline
+
+
+User = get_user_model()
+
+
+class TimelineTests(TransactionTestCase):
+    '''Подписки и домашняя лента.'''
+
+    # Раскладка идёт в transaction.on_commit, который в TestCase
+    # не выполняется.
+
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username='reader')
+        self.author = User.objects.create_user(username='author')
+        self.other = User.objects.create_user(username='other')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def follow(self, username):
+        return self.client.post(
+            reverse('posts:profile_follow', kwargs={'username': username})
+        )
+
+    def feed_texts(self, **params):
+        response = self.client.get(reverse('posts:follow_index'), params)
+        return [post.text for post in response.context['page_obj']]
+
+    def test_follow_and_unfollow(self):
+        response = self.follow('author')
+        self.assertRedirects(
+            response,
+            reverse('posts:profile', kwargs={'username': 'author'})
+        )
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=self.author).exists())
+        self.follow('reader')
+        self.assertFalse(Follow.objects.filter(author=self.reader).exists())
+
+        self.client.post(
+            reverse('posts:profile_unfollow', kwargs={'username': 'author'})
+        )
+        self.assertFalse(Follow.objects.exists())
+
+    def test_profile_and_group_show_subscription(self):
+        self.follow('author')
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': 'author'})
+        )
+        self.assertTrue(response.context['following'])
+        self.assertContains(response, 'Отписаться')
+        response = self.client.get(
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'})
+        )
+        self.assertFalse(response.context['following'])
+        self.assertContains(response, 'Подписаться на группу')
+
+    def test_follow_requires_post(self):
+        response = self.client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'author'})
+        )
+        self.assertEqual(response.status_code, 405)
+
+    def test_new_post_fanned_out_to_followers(self):
+        self.follow('author')
+        Post.objects.create(author=self.author, text='Пост автора')
+        Post.objects.create(author=self.other, text='Чужой пост')
+        self.assertEqual(self.feed_texts(), ['Пост автора'])
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 1
+        )
+
+    def test_imported_posts_fanned_out(self):
+        self.follow('author')
+        self.client.post(
+            reverse('posts:group_follow', kwargs={'slug': 'test-slug'})
+        )
+        with PostImporter(batch_size=2, transaction_size=2) as importer:
+            importer.add(self.author.pk, 'Импорт 1')
+            importer.add(self.other.pk, 'Импорт 2', group_id=self.group.pk)
+            importer.add(self.other.pk, 'Импорт 3')
+        self.assertEqual(self.feed_texts(), ['Импорт 2', 'Импорт 1'])
+
+    def test_follow_backfills_and_unfollow_removes(self):
+        Post.objects.create(author=self.author, text='Старый пост')
+        self.follow('author')
+        self.assertEqual(self.feed_texts(), ['Старый пост'])
+        self.client.post(
+            reverse('posts:profile_unfollow', kwargs={'username': 'author'})
+        )
+        self.assertEqual(self.feed_texts(), [])
+
+    def test_group_follow(self):
+        self.client.post(
+            reverse('posts:group_follow', kwargs={'slug': 'test-slug'})
+        )
+        self.assertTrue(GroupFollow.objects.filter(user=self.reader).exists())
+        post = Post.objects.create(author=self.other, text='Пост в группе',
+                                   group=self.group)
+        self.assertEqual(self.feed_texts(), ['Пост в группе'])
+
+        post.group = None
+        post.save()
+        self.assertEqual(self.feed_texts(), [])
+
+    def test_deleted_post_leaves_timeline(self):
+        self.follow('author')
+        post = Post.objects.create(author=self.author, text='Пост')
+        post.delete()
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    def test_timeline_cursor_pages(self):
+        self.follow('author')
+        for i in range(12):
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+        response = self.client.get(reverse('posts:follow_index'))
+        page = response.context['page_obj']
+        self.assertEqual(len(page), 10)
+        second = self.feed_texts(after=page.next_cursor)
+        self.assertEqual(second, ['Пост 1', 'Пост 0'])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_popular_author_read_on_fan_in(self):
+        Follow.objects.create(user=self.other, author=self.author)
+        self.follow('author')
+        GroupFollow.objects.create(user=self.reader, group=self.group)
+        Post.objects.create(author=self.author, text='Популярный пост')
+        Post.objects.create(author=self.other, text='Пост в группе',
+                            group=self.group)
+        Post.objects.create(author=self.author, text='Оба источника',
+                            group=self.group)
+
+        # Посты автора раскладываются только по подписке на группу.
+        self.assertEqual(
+            TimelineEntry.objects.filter(author_id=self.author.pk).count(), 1
+        )
+        self.assertEqual(
+            self.feed_texts(),
+            ['Оба источника', 'Пост в группе', 'Популярный пост']
+        )
+        self.assertEqual(HomeTimeline.for_user(self.reader).count(), 3)
+
+    def test_anonymous_redirected_to_login(self):
+        response = Client().get(reverse('posts:follow_index'))
+        self.assertEqual(response.status_code, 302)
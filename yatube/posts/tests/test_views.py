@@ -1,7 +1,14 @@
+import csv
+import json
+
+from django.db import connection
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.urls import reverse
 from ..forms import PostForm
+from ..paginators import ELLIPSIS, CursorPaginator
 
 
 from ..models import Group, Post
@@ -89,6 +96,22 @@ class PostsPagesTests(TestCase):
         self.assertEqual(response.context['post_id'],
                          int(PostsPagesTests.post.id))
 
+    def test_posts_count_without_aggregate_queries(self):
+        '''Профиль и пост берут число постов из счётчика, без COUNT(*).'''
+        urls = [
+            reverse('posts:profile',
+                    kwargs={'username': PostsPagesTests.user.username}),
+            reverse('posts:post_detail',
+                    kwargs={'post_id': PostsPagesTests.post.id}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.authorized_client.get(url)
+                self.assertEqual(response.context['posts_count'], 1)
+                for query in queries:
+                    self.assertNotIn('COUNT(', query['sql'])
+
     def test_post_edit_correct_context(self):
 
         response = self.authorized_client.get(reverse(
@@ -129,6 +152,7 @@ class PaginatorViewsTest(TestCase):
         Post.objects.bulk_create(cls.posts)
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.user = User.objects.create_user(username='username')
         self.authorized_client = Client()
@@ -167,3 +191,140 @@ class PaginatorViewsTest(TestCase):
             self.assertEqual(
                 len(response.context.get('page_obj').object_list), 3
             )
+
+    def test_cursor_pages_follow_each_other(self):
+        '''Курсоры ведут на соседние страницы без пропусков и повторов.'''
+        url = reverse('posts:index')
+        first_page = self.client.get(url).context['page_obj']
+        self.assertFalse(first_page.has_previous())
+        self.assertTrue(first_page.has_next())
+
+        second_page = self.client.get(
+            url, {'after': first_page.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(len(second_page.object_list), 3)
+        self.assertFalse(second_page.has_next())
+        self.assertTrue(second_page.has_previous())
+        self.assertFalse(
+            set(first_page.object_list) & set(second_page.object_list)
+        )
+
+        back_page = self.client.get(
+            url, {'before': second_page.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(back_page.object_list),
+                         list(first_page.object_list))
+
+    def test_cursor_page_does_not_count_posts(self):
+        '''Курсорная страница не выполняет COUNT(*) по ленте.'''
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        with self.assertNumQueries(1):
+            page = paginator.cursor_page()
+            self.assertEqual(len(page.object_list), 10)
+
+    def test_elided_page_range(self):
+        '''В навигации только окно вокруг текущей страницы и края.'''
+        paginator = CursorPaginator(Post.objects.all(), 1)
+        self.assertEqual(
+            list(paginator.get_elided_page_range(7, on_each_side=1,
+                                                 on_ends=1)),
+            [1, ELLIPSIS, 6, 7, 8, ELLIPSIS, 13]
+        )
+        self.assertEqual(
+            list(paginator.get_elided_page_range(2, on_each_side=1,
+                                                 on_ends=1)),
+            [1, 2, 3, ELLIPSIS, 13]
+        )
+
+    def test_page_count_is_cached_until_feed_changes(self):
+        '''COUNT(*) выполняется один раз на версию ленты.'''
+        url = reverse('posts:index') + '?page=2'
+
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.authorized_client.get(url)
+            counts = [q for q in queries if 'COUNT(' in q['sql']]
+            return response, len(counts)
+
+        response, counts = count_queries()
+        self.assertEqual(counts, 1)
+        response, counts = count_queries()
+        self.assertEqual(counts, 0)
+        self.assertEqual(response.context['page_obj'].paginator.count, 13)
+
+        Post.objects.create(text='Новый пост', author=self.author)
+        response, counts = count_queries()
+        self.assertEqual(counts, 1)
+        self.assertEqual(response.context['page_obj'].paginator.count, 14)
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        response = self.client.get(reverse('posts:index'),
+                                   {'after': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['page_obj'].has_previous())
+
+
+class ExportViewsTest(TestCase):
+    '''Потоковая выгрузка постов автора и группы.'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание')
+        Post.objects.create(author=cls.author, text='Первый, "с кавычками"',
+                            group=cls.group)
+        Post.objects.create(author=cls.author, text='Второй')
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def get_export(self, url, **params):
+        response = self.guest_client.get(url, params)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_profile_export_csv(self):
+        response, content = self.get_export(reverse(
+            'posts:profile_export', kwargs={'username': 'author'}
+        ))
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('posts-author.csv', response['Content-Disposition'])
+        rows = list(csv.reader(content.splitlines()))
+        self.assertEqual(rows[0], ['id', 'text', 'pub_date', 'author',
+                                   'group'])
+        self.assertEqual([row[1] for row in rows[1:]],
+                         ['Первый, "с кавычками"', 'Второй'])
+        self.assertEqual(rows[1][3:], ['author', 'test-slug'])
+        self.assertEqual(rows[2][3:], ['author', ''])
+
+    def test_group_export_jsonl(self):
+        response, content = self.get_export(
+            reverse('posts:group_export', kwargs={'slug': 'test-slug'}),
+            format='jsonl'
+        )
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['group'], 'test-slug')
+        self.assertEqual(rows[0]['author'], 'author')
+
+    def test_non_ascii_export_filename(self):
+        User.objects.create_user(username='лев')
+        response = self.guest_client.get(
+            reverse('posts:profile_export', kwargs={'username': 'лев'})
+        )
+        self.assertEqual(
+            response['Content-Disposition'],
+            'attachment; filename="posts-___.csv"; '
+            "filename*=UTF-8''posts-%D0%BB%D0%B5%D0%B2.csv"
+        )
+
+    def test_unknown_format_is_404(self):
+        response = self.guest_client.get(
+            reverse('posts:profile_export', kwargs={'username': 'author'}),
+            {'format': 'xml'}
+        )
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,267 @@
+"""
+Домашняя лента подписок.
+
+Лента не собирается запросом ``author IN (...) OR group IN (...)`` по всей
+таблице постов. Новый пост при создании раскладывается в таблицу
+``TimelineEntry`` каждому подписчику автора и группы (fan-out on write),
+и лента читается по индексу (user, pub_date, post_id).
+
+Авторы и группы, у которых подписчиков больше ``TIMELINE_FANOUT_LIMIT``,
+не раскладываются: запись тысяч строк на каждый пост дороже, чем чтение.
+Их посты подмешиваются в ленту при чтении (fan-in) отдельным запросом
+к постам и сливаются с разложенными по ключу (pub_date, id).
+"""
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Count, Q
+
+from . import sharding
+from .models import Follow, GroupFollow, Post, TimelineEntry
+from .paginators import row_key
+
+FANOUT_BATCH_SIZE = 500
+
+
+def follower_counts(model, field, ids):
+    """Число подписчиков для каждого id автора или группы."""
+    return dict(
+        model.objects.filter(**{f'{field}__in': ids}).order_by()
+        .values_list(field).annotate(total=Count('id'))
+    )
+
+
+def is_fan_in(model, field, pk):
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    return model.objects.filter(**{field: pk})[limit:limit + 1].exists()
+
+
+def recipients(post):
+    """Подписчики, которым пост раскладывается при записи."""
+    users = set()
+    if not is_fan_in(Follow, 'author', post.author_id):
+        users.update(
+            Follow.objects.filter(author_id=post.author_id)
+            .values_list('user_id', flat=True)
+        )
+    if post.group_id is not None and not is_fan_in(
+            GroupFollow, 'group', post.group_id):
+        users.update(
+            GroupFollow.objects.filter(group_id=post.group_id)
+            .values_list('user_id', flat=True)
+        )
+    return users
+
+
+def entries_for(post, users):
+    return [
+        TimelineEntry(user_id=user_id, post_id=post.pk,
+                      pub_date=post.pub_date, author_id=post.author_id,
+                      group_id=post.group_id)
+        for user_id in users
+    ]
+
+
+def fan_out(post):
+    """Раскладывает пост в ленты подписчиков; повторный вызов безопасен."""
+    TimelineEntry.objects.bulk_create(
+        entries_for(post, recipients(post)),
+        batch_size=FANOUT_BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def fan_out_many(posts):
+    """Раскладывает пачку постов, например из ``PostImporter``.
+
+    Подписчики ищутся один раз на пару автор - группа.
+    """
+    users_for = {}
+    entries = []
+    for post in posts:
+        key = (post.author_id, post.group_id)
+        if key not in users_for:
+            users_for[key] = recipients(post)
+        entries.extend(entries_for(post, users_for[key]))
+        if len(entries) >= FANOUT_BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(
+                entries, batch_size=FANOUT_BATCH_SIZE, ignore_conflicts=True
+            )
+            entries = []
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=FANOUT_BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def retract(post_id):
+    TimelineEntry.objects.filter(post_id=post_id).delete()
+
+
+def backfill(user, posts):
+    """Добавляет в ленту ``user`` последние посты новой подписки."""
+    limit = settings.TIMELINE_BACKFILL
+    rows = [
+        entry
+        for post in posts.order_by('-pub_date', '-id')[:limit]
+        for entry in entries_for(post, [user.pk])
+    ]
+    TimelineEntry.objects.bulk_create(
+        rows, batch_size=FANOUT_BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def follow_author(user, author):
+    _, created = Follow.objects.get_or_create(user=user, author=author)
+    if created and not is_fan_in(Follow, 'author', author.pk):
+        backfill(user, sharding.feed(
+            Post.objects.filter(author=author), author_id=author.pk
+        ))
+
+
+def follow_group(user, group):
+    _, created = GroupFollow.objects.get_or_create(user=user, group=group)
+    if created and not is_fan_in(GroupFollow, 'group', group.pk):
+        backfill(user, sharding.feed(Post.objects.filter(group=group)))
+
+
+def unfollow_author(user, author):
+    Follow.objects.filter(user=user, author=author).delete()
+    # Посты остаются в ленте, если пользователь подписан на их группу.
+    TimelineEntry.objects.filter(user=user, author_id=author.pk).exclude(
+        group_id__in=user.group_follows.values('group_id')
+    ).delete()
+
+
+def unfollow_group(user, group):
+    GroupFollow.objects.filter(user=user, group=group).delete()
+    TimelineEntry.objects.filter(user=user, group_id=group.pk).exclude(
+        author_id__in=user.follower.values('author_id')
+    ).delete()
+
+
+def rename_lookups(q, renames):
+    """Копия ``Q`` с полями постов, заменёнными на поля ``TimelineEntry``."""
+    clone = Q()
+    clone.connector, clone.negated = q.connector, q.negated
+    for child in q.children:
+        if isinstance(child, Q):
+            clone.children.append(rename_lookups(child, renames))
+            continue
+        lookup, value = child
+        field, sep, rest = lookup.partition('__')
+        clone.children.append((renames.get(field, field) + sep + rest, value))
+    return clone
+
+
+class HomeTimeline:
+    """Лента подписок с интерфейсом, нужным ``CursorPaginator``.
+
+    Разложенные записи и посты fan-in-подписок - два источника,
+    упорядоченных по (pub_date, id); срез сливает их и загружает посты
+    одной выборкой.
+    """
+
+    renames = {'pk': 'post_id', 'id': 'post_id'}
+
+    def __init__(self, entries, fan_in=None):
+        self.entries = entries
+        self.fan_in = fan_in
+        self.model = Post
+
+    @classmethod
+    def for_user(cls, user):
+        entries = TimelineEntry.objects.filter(user=user)
+        limit = settings.TIMELINE_FANOUT_LIMIT
+        authors = follower_counts(
+            Follow, 'author', user.follower.values('author_id')
+        )
+        groups = follower_counts(
+            GroupFollow, 'group', user.group_follows.values('group_id')
+        )
+        fan_in_authors = [pk for pk, total in authors.items() if total > limit]
+        fan_in_groups = [pk for pk, total in groups.items() if total > limit]
+        if not fan_in_authors and not fan_in_groups:
+            return cls(entries)
+        # Посты, уже разложенные по другой подписке, не повторяются.
+        fan_in = Post.objects.select_related('author', 'group').filter(
+            Q(author_id__in=fan_in_authors) | Q(group_id__in=fan_in_groups)
+        ).exclude(
+            author_id__in=authors.keys() - set(fan_in_authors)
+        ).exclude(
+            group_id__in=groups.keys() - set(fan_in_groups)
+        )
+        return cls(entries, sharding.feed(fan_in))
+
+    def _clone(self, entries, fan_in):
+        return HomeTimeline(entries, fan_in)
+
+    def filter(self, *args, **kwargs):
+        q = Q(*args, **kwargs)
+        return self._clone(
+            self.entries.filter(rename_lookups(q, self.renames)),
+            self.fan_in.filter(q) if self.fan_in is not None else None
+        )
+
+    def order_by(self, *fields):
+        entry_fields = []
+        for field in fields:
+            prefix, name = ('-', field[1:]) if field[0] == '-' else ('', field)
+            entry_fields.append(prefix + self.renames.get(name, name))
+        return self._clone(
+            self.entries.order_by(*entry_fields),
+            self.fan_in.order_by(*fields) if self.fan_in is not None
+            else None
+        )
+
+    def count(self):
+        total = self.entries.count()
+        if self.fan_in is not None:
+            total += self.fan_in.count()
+        return total
+
+    def _rows(self, stop):
+        entries = [
+            {'pub_date': pub_date, 'id': post_id}
+            for pub_date, post_id in self.entries.values_list(
+                'pub_date', 'post_id'
+            )[:stop]
+        ]
+        if self.fan_in is None:
+            return entries
+        ordering = self.entries.query.order_by
+        descending = bool(ordering) and ordering[0].startswith('-')
+        merged = heapq.merge(
+            entries, self.fan_in[:stop], key=row_key, reverse=descending
+        )
+        # Пост мог попасть в оба источника, если число подписчиков
+        # перешло порог уже после его раскладки.
+        previous = None
+        rows = []
+        for row in merged:
+            if row_key(row) != previous:
+                rows.append(row)
+            previous = row_key(row)
+        return rows
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return self[key:key + 1][0]
+        rows = list(islice(self._rows(key.stop), key.start or 0, key.stop))
+        missing = [row['id'] for row in rows if isinstance(row, dict)]
+        if missing:
+            posts = sharding.feed(
+                Post.objects.select_related('author', 'group')
+            ).filter(pk__in=missing)
+            found = {post.pk: post for post in posts}
+            # Удалённый пост мог ещё не пропасть из ленты.
+            rows = [
+                found.get(row['id']) if isinstance(row, dict) else row
+                for row in rows
+            ]
+        return [row for row in rows if row is not None]
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __len__(self):
+        return len(self[:])
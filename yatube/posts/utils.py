@@ -0,0 +1,37 @@
+from django.conf import settings
+
+from .paginators import CursorPaginator, InvalidCursor
+from .rows import FEED_FIELDS, build_rows
+
+POSTS_PER_PAGE = 10
+
+
+def paginate(request, queryset, per_page=POSTS_PER_PAGE, feed=None,
+             project=False):
+    """Возвращает страницу ленты по параметрам запроса.
+
+    По умолчанию используется курсорная навигация ``?after=``/``?before=``;
+    старые ссылки вида ``?page=N`` обслуживаются обычной паджинацией
+    с числом постов из кеша ленты ``feed``.
+
+    С ``project=True`` при включённом ``FEED_PROJECTION`` выбираются
+    только нужные ленте колонки, а страница состоит из лёгких строк
+    ``posts.rows.PostRow`` вместо моделей.
+    """
+    project = project and settings.FEED_PROJECTION
+    paginator = CursorPaginator(
+        queryset.values(*FEED_FIELDS) if project else queryset, per_page,
+        feed=feed, count_source=queryset
+    )
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    if 'page' in request.GET and not (after or before):
+        page = paginator.get_page(request.GET.get('page'))
+    else:
+        try:
+            page = paginator.cursor_page(after=after, before=before)
+        except InvalidCursor:
+            page = paginator.cursor_page()
+    if project:
+        page.object_list = build_rows(page.object_list)
+    return page
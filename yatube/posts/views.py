@@ -1,64 +1,132 @@
 from django.core.paginator import Paginator
+from django.db.models import Exists, OuterRef
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
-from .models import Post, Group
+from django.utils.http import urlencode
+from django.views.decorators.http import require_POST
+from .models import Follow, GroupFollow, Post, Group
 from django.contrib.auth import get_user_model
+from .counters import get_posts_count
+from .export import (CONTENT_TYPES, content_disposition, export_lines,
+                     owner_posts)
+from .feeds import INDEX_FEED, author_feed, group_feed
 from .forms import PostForm
+from .page_cache import (cache_anonymous_page, group_list_feeds, index_feeds,
+                         missing_key, post_detail_feeds, profile_feeds)
+from . import sharding, timeline
+from .search import SearchResults
+from .surrogate_keys import (INDEX_KEY, author_key, group_key, page_keys,
+                             post_keys)
+from .utils import POSTS_PER_PAGE, paginate
 from django.contrib.auth.decorators import login_required
+from core import caching
+from core.middleware.anonymous import public_page
+from core.replicas import pin_primary_after_write, read_from_replica
+from core.sqlite import serialized_writes
+from core.surrogate import add_surrogate_keys
 
 
 User = get_user_model()
 
 
+def with_following(queryset, user, follow_model, field):
+    """Добавляет признак подписки ``user`` тем же запросом."""
+    if not user.is_authenticated:
+        return queryset
+    return queryset.annotate(is_following=Exists(
+        follow_model.objects.filter(user=user, **{field: OuterRef('pk')})
+    ))
+
+
 # Create your views here.
+@public_page
+@read_from_replica
+@cache_anonymous_page(index_feeds)
 def index(request):
     template = 'posts/index.html'
-    posts = Post.objects.select_related('group').all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = sharding.feed(Post.objects.select_related('group', 'author'))
+    page_obj = paginate(request, posts, feed=INDEX_FEED, project=True)
     context = {
+        'feed': INDEX_FEED,
         'page_obj': page_obj,
         'posts': posts
     }
-    return render(request, template, context)
+    return add_surrogate_keys(
+        render(request, template, context),
+        {INDEX_KEY} | page_keys(page_obj)
+    )
 
 
+@public_page
+@read_from_replica
+@cache_anonymous_page(group_list_feeds)
 def group_list(request, slug):
     template = 'posts/group_list.html'
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.select_related('author').all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    group = caching.get_object_or_404(
+        with_following(Group.objects.all(), request.user, GroupFollow,
+                       'group'),
+        missing_key('group', slug), slug=slug
+    )
+    posts = sharding.feed(group.posts.select_related('author'))
+    feed = group_feed(group.pk)
+    page_obj = paginate(request, posts, feed=feed, project=True)
     context = {
+        'feed': feed,
         'group': group,
+        'following': getattr(group, 'is_following', False),
         'page_obj': page_obj
     }
-    return render(request, template, context)
+    return add_surrogate_keys(
+        render(request, template, context),
+        {group_key(group.slug)} | page_keys(page_obj)
+    )
 
 
+@public_page
+@read_from_replica
+@cache_anonymous_page(profile_feeds)
 def profile(request, username):
     template = 'posts/profile.html'
-    user_name = get_object_or_404(User, username=username)
-    author_posts = user_name.posts.select_related('group', 'author')
-    posts_count = author_posts.count()
-    paginator = Paginator(author_posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    user_name = caching.get_object_or_404(
+        with_following(User.objects.select_related('post_stats'),
+                       request.user, Follow, 'author'),
+        missing_key('author', username), username=username
+    )
+    author_posts = sharding.feed(
+        user_name.posts.select_related('group', 'author'),
+        author_id=user_name.pk
+    )
+    posts_count = get_posts_count(user_name)
+    feed = author_feed(user_name.pk)
+    page_obj = paginate(request, author_posts, feed=feed,
+                        project=True)
     context = {
+        'feed': feed,
         'author': user_name,
         'author_posts': author_posts,
+        'following': getattr(user_name, 'is_following', False),
         'page_obj': page_obj,
         'posts_count': posts_count
     }
-    return render(request, template, context)
+    return add_surrogate_keys(
+        render(request, template, context),
+        {author_key(user_name.username)} | page_keys(page_obj)
+    )
 
 
+@public_page
+@read_from_replica
+@cache_anonymous_page(post_detail_feeds)
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, pk=post_id)
+    post = caching.get_object_or_404(
+        sharding.feed(
+            Post.objects.select_related('author__post_stats', 'group')
+        ),
+        missing_key('post', post_id), pk=post_id
+    )
     first_30 = post.text[:30]
-    posts_count = post.author.posts.count()
+    posts_count = get_posts_count(post.author)
     is_author = post.author == request.user
 
     context = {
@@ -68,10 +136,52 @@ def post_detail(request, post_id):
         'posts_count': posts_count,
         'is_author': is_author
     }
+    return add_surrogate_keys(
+        render(request, template, context), post_keys(post)
+    )
+
+
+def export_response(request, queryset, name):
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in CONTENT_TYPES:
+        raise Http404('Неизвестный формат выгрузки')
+    response = StreamingHttpResponse(
+        export_lines(queryset, export_format),
+        content_type=CONTENT_TYPES[export_format]
+    )
+    response['Content-Disposition'] = content_disposition(
+        f'{name}.{export_format}'
+    )
+    return response
+
+
+def profile_export(request, username):
+    author = get_object_or_404(User, username=username)
+    return export_response(request, owner_posts(author), f'posts-{username}')
+
+
+def group_export(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return export_response(request, owner_posts(group), f'group-{slug}')
+
+
+@public_page
+def search(request):
+    template = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+    paginator = Paginator(SearchResults(query), POSTS_PER_PAGE)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'page_params': urlencode({'q': query}) + '&'
+    }
     return render(request, template, context)
 
 
 @login_required
+@pin_primary_after_write
+@serialized_writes
 def post_create(request):
     template = 'posts/create_post.html'
     form = PostForm(request.POST or None)
@@ -89,11 +199,13 @@ def post_create(request):
 
 
 @login_required
+@pin_primary_after_write
+@serialized_writes
 def post_edit(request, post_id):
     template = 'posts/create_post.html'
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(sharding.feed(Post.objects.all()), pk=post_id)
 
-    if request.user != post.author:
+    if request.user.pk != post.author_id:
         return redirect('posts:post_detail', post_id=post.id)
 
     form = PostForm(request.POST or None, instance=post)
@@ -110,3 +222,56 @@ def post_edit(request, post_id):
         return redirect('posts:post_detail', post_id=post.id)
 
     return render(request, template, context)
+
+
+@read_from_replica
+@login_required
+def follow_index(request):
+    template = 'posts/follow.html'
+    posts = timeline.HomeTimeline.for_user(request.user)
+    page_obj = paginate(request, posts)
+    context = {
+        'page_obj': page_obj
+    }
+    return render(request, template, context)
+
+
+@login_required
+@require_POST
+@pin_primary_after_write
+@serialized_writes
+def profile_follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user:
+        timeline.follow_author(request.user, author)
+    return redirect('posts:profile', username)
+
+
+@login_required
+@require_POST
+@pin_primary_after_write
+@serialized_writes
+def profile_unfollow(request, username):
+    author = get_object_or_404(User, username=username)
+    timeline.unfollow_author(request.user, author)
+    return redirect('posts:profile', username)
+
+
+@login_required
+@require_POST
+@pin_primary_after_write
+@serialized_writes
+def group_follow(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    timeline.follow_group(request.user, group)
+    return redirect('posts:group_list', slug)
+
+
+@login_required
+@require_POST
+@pin_primary_after_write
+@serialized_writes
+def group_unfollow(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    timeline.unfollow_group(request.user, group)
+    return redirect('posts:group_list', slug)
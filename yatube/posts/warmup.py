@@ -0,0 +1,134 @@
+import html
+import os
+import re
+import uuid
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.template import TemplateSyntaxError, engines
+from django.urls import (NoReverseMatch, URLResolver, converters,
+                         get_resolver, reverse)
+
+from .loadtest import wsgi_get, wsgi_request
+from .models import AuthorStats, Group
+
+# Значения для параметров маршрутов при проверке reverse().
+SAMPLE_VALUES = {
+    converters.IntConverter: 1,
+    converters.StringConverter: 'warmup',
+    converters.SlugConverter: 'warmup',
+    converters.PathConverter: 'warmup',
+    converters.UUIDConverter: uuid.UUID(int=0),
+}
+# Ссылка «Следующая» курсорной страницы, см. posts/includes/paginator.html.
+NEXT_LINK = re.compile(r'href="\?(after=[^"]+)"')
+
+
+def compile_templates():
+    """Компилирует все шаблоны из каталогов ``DIRS`` движков Django.
+
+    С кеширующим загрузчиком скомпилированные шаблоны остаются в памяти
+    процесса. Возвращает число шаблонов и список ошибок.
+    """
+    compiled, errors = 0, []
+    for engine in engines.all():
+        for directory in engine.engine.dirs:
+            for root, _, files in os.walk(directory):
+                for filename in sorted(files):
+                    name = os.path.relpath(
+                        os.path.join(root, filename), directory
+                    ).replace(os.sep, '/')
+                    try:
+                        engine.get_template(name)
+                    except TemplateSyntaxError as error:
+                        errors.append(f'{name}: {error}')
+                    else:
+                        compiled += 1
+    return compiled, errors
+
+
+def named_patterns(patterns, namespace=''):
+    """Имена маршрутов с пространствами имён и их параметры."""
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            prefix = namespace
+            if pattern.namespace:
+                prefix = f'{namespace}{pattern.namespace}:'
+            yield from named_patterns(pattern.url_patterns, prefix)
+        elif pattern.name:
+            yield f'{namespace}{pattern.name}', pattern.pattern
+
+
+def sample_kwargs(pattern):
+    route_converters = getattr(pattern, 'converters', {})
+    names = route_converters or pattern.regex.groupindex
+    return {
+        name: SAMPLE_VALUES.get(type(route_converters.get(name)), '1')
+        for name in names
+    }
+
+
+def reverse_urls():
+    """Строит все именованные адреса, заполняя кеши резолвера.
+
+    Возвращает число построенных адресов и имена, которые не удалось
+    построить с подставными параметрами.
+    """
+    reversed_count, skipped = 0, []
+    for name, pattern in named_patterns(get_resolver().url_patterns):
+        try:
+            reverse(name, kwargs=sample_kwargs(pattern) or None)
+        except NoReverseMatch:
+            skipped.append(name)
+        else:
+            reversed_count += 1
+    return reversed_count, skipped
+
+
+def feed_urls(groups=20, authors=20):
+    """Адреса первых страниц популярных лент, кроме главной: API главной,
+    крупнейших групп и самых пишущих авторов.
+    """
+    urls = [(reverse('posts:api_index'), '')]
+    for slug in Group.objects.order_by('-posts_count').values_list(
+            'slug', flat=True)[:groups]:
+        urls.append((reverse('posts:group_list', kwargs={'slug': slug}), ''))
+    for username in AuthorStats.objects.order_by('-posts_count').values_list(
+            'user__username', flat=True)[:authors]:
+        urls.append(
+            (reverse('posts:profile', kwargs={'username': username}), '')
+        )
+    return urls
+
+
+def display_url(path, query_string):
+    return f'{path}?{query_string}' if query_string else path
+
+
+def warm_index(handler, pages):
+    """Запрашивает первые ``pages`` страниц главной, переходя по ссылке
+    «Следующая»: так прогреваются курсорные адреса, которые открывают
+    посетители. Возвращает число адресов и адреса с ошибками.
+    """
+    path, query_string = reverse('posts:index'), ''
+    for page in range(pages):
+        status, body = wsgi_request(handler, path, query_string)
+        if status >= 400:
+            return page + 1, [display_url(path, query_string)]
+        link = NEXT_LINK.search(body.decode())
+        if link is None:
+            return page + 1, []
+        query_string = html.unescape(link.group(1))
+    return pages, []
+
+
+def warm_feeds(pages=3, groups=20, authors=20, handler=None):
+    """Запрашивает ленты анонимно, заполняя кеши страниц, фрагментов и
+    счётчиков. Возвращает число адресов и адреса с ошибками.
+    """
+    handler = handler or WSGIHandler()
+    warmed, failed = warm_index(handler, pages)
+    urls = feed_urls(groups, authors)
+    for path, query_string in urls:
+        if wsgi_get(handler, path, query_string) >= 400:
+            failed.append(display_url(path, query_string))
+    return warmed + len(urls), failed
@@ -0,0 +1,198 @@
+"""
+Боевая точка входа WSGI с предзагрузкой перед fork.
+
+Процесс-мастер полностью загружает Django: приложения, URLconf со всеми
+представлениями, middleware и шаблоны, затем закрывает соединения с базой
+и замораживает сборщик мусора (``gc.freeze()``). Объекты, созданные до
+fork, попадают в постоянное поколение и больше не обходятся сборщиком,
+поэтому страницы памяти с ними не копируются в каждый worker и остаются
+общими (copy-on-write).
+
+Использование с внешним сервером, умеющим предзагрузку::
+
+    gunicorn --preload yatube.wsgi_preload:application
+
+или встроенный сервер: ``python manage.py serve --workers 4``.
+"""
+import gc
+import os
+import resource
+import signal
+import socket
+import sys
+import time
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+PAGE_SIZE = resource.getpagesize()
+
+
+def preload(handler):
+    """Прогревает всё, что можно разделить между worker-процессами."""
+    from django.conf import settings
+    from django.core.cache import caches
+    from django.db import connections
+    from posts.warmup import compile_templates, reverse_urls, warm_feeds
+
+    reverse_urls()
+    compile_templates()
+    # Общая память кеша открывается до fork, чтобы её делили worker'ы.
+    for alias in settings.CACHES:
+        caches[alias]
+    if settings.PRELOAD_WARM_FEEDS:
+        # Популярные ленты попадают в кеш до первого запроса к worker'ам.
+        warm_feeds(handler=handler)
+    # Открытое в мастере соединение нельзя делить между процессами.
+    connections.close_all()
+    # Без gc.collect(): освобождённые им места заполнятся новыми объектами
+    # уже в worker-процессах и вызовут копирование страниц.
+    gc.freeze()
+    return handler
+
+
+def memory_usage(pid):
+    """RSS, PSS и разделяемая память процесса в килобайтах.
+
+    Читает ``/proc/<pid>/smaps_rollup``, а на старых ядрах -
+    ``/proc/<pid>/statm`` (там нет PSS).
+    """
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as smaps:
+            values = {}
+            for line in smaps:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == 'kB':
+                    values[parts[0].rstrip(':')] = int(parts[1])
+        return {
+            'rss': values.get('Rss', 0),
+            'pss': values.get('Pss', 0),
+            'shared': (values.get('Shared_Clean', 0)
+                       + values.get('Shared_Dirty', 0)),
+            'private': (values.get('Private_Clean', 0)
+                        + values.get('Private_Dirty', 0)),
+        }
+    except FileNotFoundError:
+        pass
+    with open(f'/proc/{pid}/statm') as statm:
+        _, resident, shared = map(int, statm.read().split()[:3])
+    rss = resident * PAGE_SIZE // 1024
+    shared = shared * PAGE_SIZE // 1024
+    return {'rss': rss, 'pss': None, 'shared': shared,
+            'private': rss - shared}
+
+
+def format_usage(pid, usage):
+    pss = '-' if usage['pss'] is None else f'{usage["pss"] / 1024:.1f}'
+    return (
+        f'pid {pid}: RSS {usage["rss"] / 1024:.1f} МБ, PSS {pss} МБ, '
+        f'общая {usage["shared"] / 1024:.1f} МБ, '
+        f'собственная {usage["private"] / 1024:.1f} МБ'
+    )
+
+
+class QuietHandler(WSGIRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PreforkServer:
+    """Мастер, раздающий один слушающий сокет ``workers`` процессам."""
+
+    def __init__(self, application, host='127.0.0.1', port=8000, workers=2,
+                 access_log=True, stdout=sys.stdout):
+        self.application = application
+        self.workers = workers
+        self.access_log = access_log
+        self.stdout = stdout
+        self.children = set()
+        self.running = True
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind((host, port))
+        self.socket.listen(128)
+        self.address = self.socket.getsockname()
+
+    def spawn(self):
+        pid = os.fork()
+        if pid:
+            self.children.add(pid)
+            return
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGUSR1, signal.SIG_DFL)
+        server = WSGIServer(
+            self.address,
+            WSGIRequestHandler if self.access_log else QuietHandler,
+            bind_and_activate=False,
+        )
+        server.socket.close()
+        server.socket = self.socket
+        server.server_name, server.server_port = self.address[:2]
+        server.setup_environ()
+        server.set_app(self.application)
+        try:
+            server.serve_forever()
+        finally:
+            os._exit(0)
+
+    def report(self, *args):
+        self.stdout.write(format_usage(os.getpid(), memory_usage(os.getpid()))
+                          + ' (мастер)\n')
+        for pid in sorted(self.children):
+            try:
+                self.stdout.write(format_usage(pid, memory_usage(pid)) + '\n')
+            except OSError:
+                pass
+        self.stdout.flush()
+
+    def stop(self, *args):
+        self.running = False
+
+    def run(self, report_interval=None):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGUSR1, self.report)
+        for _ in range(self.workers):
+            self.spawn()
+        next_report = report_interval and time.monotonic() + report_interval
+        try:
+            while self.running:
+                self.reap()
+                while self.running and len(self.children) < self.workers:
+                    self.spawn()
+                if next_report and time.monotonic() >= next_report:
+                    self.report()
+                    next_report = time.monotonic() + report_interval
+                time.sleep(0.2)
+        finally:
+            self.shutdown()
+
+    def reap(self):
+        for pid in list(self.children):
+            try:
+                finished, _ = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                finished = pid
+            if finished:
+                self.children.discard(pid)
+
+    def shutdown(self):
+        for pid in self.children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in self.children:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        self.children.clear()
+        self.socket.close()
+
+
+def get_application():
+    from django.core.wsgi import get_wsgi_application
+    return preload(get_wsgi_application())
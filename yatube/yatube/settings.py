@@ -10,7 +10,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
+import hashlib
 import os
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -26,9 +28,23 @@ PASSWORD_RESET_URL = 'users:password_reset_form'
 PASSWORD_RESET_DONE = 'users:passwrod_reset_done'
 
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма ставятся в очередь задач и отправляются командой run_tasks
+# через QUEUED_EMAIL_BACKEND, см. core/mail.py.
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
+QUEUED_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+# Фоновые задачи, см. core/tasks.py.
+TASKS_THREADS = 4
+# Сколько задач worker забирает за один раз.
+TASKS_BATCH_SIZE = 50
+TASKS_MAX_ATTEMPTS = 5
+# Задержка первого повтора в секундах, дальше она удваивается.
+TASKS_RETRY_DELAY = 10
+# Через сколько секунд задача упавшего worker'а возвращается в очередь.
+TASKS_LEASE = 60 * 5
+TASKS_POLL_INTERVAL = 1
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
 
@@ -62,7 +78,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.server_timing.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.anonymous.AnonymousFastPathMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -74,12 +92,22 @@ MIDDLEWARE = [
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if not DEBUG:
+    # В боевом режиме шаблоны компилируются один раз на процесс;
+    # worker'ы получают их прогретыми от preload в yatube/prefork.py.
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -92,6 +120,8 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
+# preload перед fork ещё и запрашивает популярные ленты, заполняя кеш.
+PRELOAD_WARM_FEEDS = True
 
 
 # Database
@@ -101,9 +131,148 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+    },
+    # Копия основной базы, которую поддерживает внешняя репликация;
+    # в тестах она совпадает с основной.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.replica.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    },
+    # Дополнительный шард постов, см. POST_SHARDS.
+    'shard1': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.shard1.sqlite3'),
+    },
+}
+
+DATABASE_ROUTERS = [
+    'posts.sharding.ShardRouter',
+    'core.replicas.ReplicaRouter',
+]
+# Базы, по которым посты распределяются по автору, например
+# ['default', 'shard1']; пусто - все посты в default. После изменения
+# списка посты переносятся командой reshard. См. posts/sharding.py.
+POST_SHARDS = []
+# Реплики для чтения лент, например ['replica']; пусто - всё читается
+# с основной базы. См. core/replicas.py.
+DATABASE_REPLICAS = []
+# Сколько секунд после записи автор читает с основной базы.
+REPLICA_PIN_SECONDS = 10
+REPLICA_PIN_COOKIE = 'read_primary_until'
+# Реплика, отставшая сильнее, временно не используется.
+REPLICA_MAX_LAG = 5
+REPLICA_LAG_CHECK_INTERVAL = 1
+
+# Боевой режим SQLite: прагмы для каждого соединения и очередь записи
+# в post_create/post_edit, см. core/sqlite.py.
+SQLITE_PRODUCTION_MODE = not DEBUG
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    # Миллисекунды ожидания занятой базы.
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение - размер кеша в КиБ.
+    'cache_size': -64 * 1024,
+}
+SQLITE_WRITE_QUEUE_SIZE = 32
+SQLITE_WRITE_QUEUE_TIMEOUT = 10
+SQLITE_WRITE_RETRIES = 5
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+
+# Общий кеш в разделяемой памяти, см. core/shared_cache.py. Файл в
+# /dev/shm видят все процессы машины: worker'ы, run_tasks, runserver и
+# команды. Он лежит в закрытом каталоге пользователя SHARED_CACHE_DIR
+# (права 0700), а имя зависит от каталога проекта, чтобы копии проекта на
+# одной машине не делили кеш.
+SHARED_CACHE_DIR = os.path.join(
+    '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(),
+    f'yatube-{os.getuid()}'
+)
+CACHES = {
+    'default': {
+        'BACKEND': 'core.shared_cache.SharedMemoryCache',
+        'LOCATION': os.path.join(
+            SHARED_CACHE_DIR,
+            f'{hashlib.md5(BASE_DIR.encode()).hexdigest()[:12]}.cache'
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': 2048,
+            # Значения больше этого числа байт не кешируются.
+            'MAX_VALUE_SIZE': 64 * 1024,
+        },
     }
 }
 
+# Тесты не делят кеш с запущенным сайтом и прошлыми прогонами: test runner
+# (и conftest.py для pytest) подменяет CACHES на TEST_CACHES. Пустой
+# LOCATION - память только для процессов, порождённых fork от открывшего
+# кеш.
+TEST_CACHES = {
+    'default': {**CACHES['default'], 'LOCATION': ''},
+}
+TEST_RUNNER = 'core.testing.TestRunner'
+
+# Фрагменты лент инвалидируются при изменении постов,
+# таймаут лишь ограничивает время жизни забытых ключей.
+FEED_CACHE_TIMEOUT = 60 * 60
+# Страницы целиком для анонимных посетителей; ещё PAGE_CACHE_STALE
+# секунд после срока отдаётся прежняя, пока новую отрисовывает один
+# процесс.
+PAGE_CACHE_TIMEOUT = 60 * 10
+PAGE_CACHE_STALE = 60
+# Защита кеша от лавины пересчётов, см. core/caching.py. Сколько секунд
+# ждать значение, которое считает другой процесс; насколько рано
+# обновлять значения (0 - только по истечении); сколько помнить 404.
+CACHING_LOCK_TIMEOUT = 10
+CACHING_EARLY_REFRESH_BETA = 1.0
+CACHING_NEGATIVE_TIMEOUT = 60
+# Как часто процесс переносит свои счётчики попаданий в общий кеш.
+CACHING_STATS_FLUSH_INTERVAL = 5
+# id групп по slug и авторов по имени; сбрасываются при их изменении.
+LOOKUP_CACHE_TIMEOUT = 60 * 60
+# Число постов в ленте для номерной паджинации: 'exact' пересчитывается
+# после каждого нового или удалённого поста, 'approximate' - раз в
+# FEED_COUNT_TIMEOUT секунд.
+FEED_COUNT_MODE = 'exact'
+FEED_COUNT_TIMEOUT = 60 * 5
+# Ленты выбирают только нужные колонки в лёгкие строки вместо моделей,
+# см. posts/rows.py.
+FEED_PROJECTION = True
+# Посты авторов и групп, у которых подписчиков больше этого числа, не
+# раскладываются по лентам подписок, а подмешиваются при чтении.
+# См. posts/timeline.py.
+TIMELINE_FANOUT_LIMIT = 1000
+# Сколько последних постов попадает в ленту сразу после подписки.
+TIMELINE_BACKFILL = 50
+
+
+# Анонимные GET-запросы к публичным страницам обходят сессии, CSRF и
+# аутентификацию и отдаются без кук с Cache-Control: public, см.
+# core/middleware/anonymous.py. Время в секундах.
+ANONYMOUS_FAST_PATH = True
+ANONYMOUS_CACHE_MAX_AGE = 60
+ANONYMOUS_CACHE_STALE_WHILE_REVALIDATE = 60 * 10
+
+# Очистка страниц во внешнем кеширующем прокси по заголовку
+# Surrogate-Key, см. core/surrogate.py. Пустой адрес отключает очистку.
+SURROGATE_PURGE_URL = ''
+SURROGATE_PURGE_HEADERS = {}
+SURROGATE_PURGE_BATCH_SIZE = 256
+SURROGATE_PURGE_TIMEOUT = 5
+
+# Заголовок Server-Timing с замерами запроса; выключенная middleware
+# исключается из цепочки целиком. Включённая подменяет Template.render
+# и показывает любому клиенту время запросов к базе, поэтому по
+# умолчанию работает только в режиме отладки.
+SERVER_TIMING_ENABLED = DEBUG
+# Доля запросов, замеры которых пишутся в лог yatube.timing.
+SERVER_TIMING_LOG_SAMPLE_RATE = 0.0
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
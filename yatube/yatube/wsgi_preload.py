@@ -0,0 +1,8 @@
+"""
+Боевой WSGI-модуль: как ``yatube.wsgi``, но с предзагрузкой и
+``gc.freeze()`` перед fork, см. ``yatube.prefork``.
+"""
+
+from .prefork import get_application
+
+application = get_application()